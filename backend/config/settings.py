@@ -138,9 +138,27 @@ MEDIA_ROOT = BASE_DIR / "media"
 # --- DRF / JWT ---
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.CachedJWTAuthentication",
     ),
 }
+# Seconds a JWT -> user resolution is cached (0 disables); invalidated on user save/delete
+AUTH_USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL", 60))
+
+# Shared with all workers when Redis is available, so user invalidations reach every process
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
 from rest_framework.settings import api_settings  # noqa
 
 SIMPLE_JWT = {
@@ -163,29 +181,126 @@ else:
 # --- Channels / ASGI ---
 ASGI_APPLICATION = "config.asgi.application"
 
-# In-memory layer is perfect for dev; auto-switch to Redis if REDIS_URL is set
-if os.getenv("REDIS_URL"):
+# In-process layer for single-node/dev; auto-switch to Redis if REDIS_URL is set
+if os.getenv("REDIS_URL") and os.getenv("CHANNEL_LAYER", "hybrid") == "redis":
+    # Plain Redis layer, kept as an escape hatch (CHANNEL_LAYER=redis)
     CHANNEL_LAYERS = {
         "default": {
             "BACKEND": "channels_redis.core.RedisChannelLayer",
             "CONFIG": {"hosts": [os.getenv("REDIS_URL")]},
         }
     }
-else:
+elif os.getenv("REDIS_URL"):
+    # Rooms whose sockets all sit on this worker are delivered in-process; Redis only
+    # carries traffic for groups that span workers (one inbox channel per worker).
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "realtime.layers.RoomAffinityChannelLayer",
+            "CONFIG": {
+                "capacity": int(os.getenv("CHANNEL_LAYER_CAPACITY", 100)),
+                "backend": {
+                    "BACKEND": "channels_redis.core.RedisChannelLayer",
+                    "CONFIG": {
+                        "hosts": [os.getenv("REDIS_URL")],
+                        "channel_capacity": {"hybrid.worker.*": 10000},
+                    },
+                },
+            },
+        }
+    }
+elif os.getenv("CHANNEL_LAYER", "local") == "inmemory":
+    # Stock layer, kept as an escape hatch (CHANNEL_LAYER=inmemory)
     CHANNEL_LAYERS = {
         "default": {
             "BACKEND": "channels.layers.InMemoryChannelLayer",
         }
     }
+else:
+    # Single process: sets for groups, shared (uncopied) payloads, bounded queues
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "realtime.layers.LocalChannelLayer",
+            "CONFIG": {"capacity": int(os.getenv("CHANNEL_LAYER_CAPACITY", 100))},
+        }
+    }
 
 # --- Realtime caps (tunable via env vars) ---
 # Game (Minecraft-like)
 GAME_MAX_PLAYERS_PER_SESSION = int(os.getenv("GAME_MAX_PLAYERS_PER_SESSION", 8))
 GAME_MAX_CONN_PER_USER = int(os.getenv("GAME_MAX_CONN_PER_USER", 3))
+# Server tick: moves / block edits are folded and broadcast this many times per second
+GAME_TICK_HZ = float(os.getenv("GAME_TICK_HZ", 20))
+# Area of interest: players only get moves / block edits within this many 16x16 chunks
+GAME_AOI_RADIUS = int(os.getenv("GAME_AOI_RADIUS", 4))
+# Seconds between background writes of edited chunks (game.models.GameChunk)
+GAME_CHUNK_FLUSH_SECONDS = float(os.getenv("GAME_CHUNK_FLUSH_SECONDS", 5))
+# Server-side move checks: top speed in blocks per second (client sprint is 9), plus a
+# distance allowance for network jitter, in blocks
+GAME_MAX_MOVE_SPEED = float(os.getenv("GAME_MAX_MOVE_SPEED", 12))
+GAME_MOVE_SLACK = float(os.getenv("GAME_MOVE_SLACK", 3))
+# Most cells one place_blocks / remove_blocks message may cover
+GAME_MAX_BATCH_CELLS = int(os.getenv("GAME_MAX_BATCH_CELLS", 4096))
+# Game worlds are stored as region files here; set to "" to use the GameChunk table instead
+# (e.g. several hosts sharing one database)
+GAME_WORLD_DIR = os.getenv("GAME_WORLD_DIR", str(BASE_DIR / "worlds"))
+# Mostly-dead region files are compacted by the background flush at most this often (and on session stop)
+GAME_REGION_COMPACT_SECONDS = float(os.getenv("GAME_REGION_COMPACT_SECONDS", 300))
+# Session snapshots (tick counter, player positions) for restarts: written this often, on
+# SIGTERM / SIGINT, and read back when the session's first player reconnects; "" = off
+GAME_SNAPSHOT_DIR = os.getenv("GAME_SNAPSHOT_DIR", GAME_WORLD_DIR)
+GAME_SNAPSHOT_SECONDS = float(os.getenv("GAME_SNAPSHOT_SECONDS", 30))
 
 # Graph realtime rooms
 REALTIME_MAX_PEERS_PER_PROJECT = int(os.getenv("REALTIME_MAX_PEERS_PER_PROJECT", 10))
 REALTIME_MAX_CONN_PER_USER = int(os.getenv("REALTIME_MAX_CONN_PER_USER", 4))
+# Seconds a room's cached access list is trusted (project saves / sharing changes drop it early)
+REALTIME_ROOM_ACL_TTL = int(os.getenv("REALTIME_ROOM_ACL_TTL", 30))
+# Seconds the live shapes shared between workers (Django cache) outlive the room's last change
+REALTIME_SHAPES_SHARED_TTL = int(os.getenv("REALTIME_SHAPES_SHARED_TTL", 3600))
+# Spectators (read-only audience; outside the peer cap): per-room cap, stream rate (Hz), and
+# whether shared_with-only viewers always join as spectators
+REALTIME_MAX_SPECTATORS_PER_PROJECT = int(os.getenv("REALTIME_MAX_SPECTATORS_PER_PROJECT", 500))
+REALTIME_SPECTATOR_HZ = float(os.getenv("REALTIME_SPECTATOR_HZ", 10))
+REALTIME_VIEWERS_SPECTATE = os.getenv("REALTIME_VIEWERS_SPECTATE", "1") in ("1", "true", "yes")
+# Multiplexed socket (/ws/projects/mux/): project rooms one connection may join
+REALTIME_MUX_MAX_ROOMS = int(os.getenv("REALTIME_MUX_MAX_ROOMS", 16))
+# Resumable sessions: events kept per room for reconnects (count / seconds)
+REALTIME_REPLAY_BUFFER = int(os.getenv("REALTIME_REPLAY_BUFFER", 500))
+REALTIME_REPLAY_MAX_AGE = int(os.getenv("REALTIME_REPLAY_MAX_AGE", 120))
+# Per-socket outbound queue: disconnect (4408) past this many pending frames / seconds behind
+# (or one frame stuck that long in send()). Daphne never makes send() wait, so under daphne
+# these rarely trigger; see realtime/sendqueue.py
+REALTIME_SEND_QUEUE_MAX = int(os.getenv("REALTIME_SEND_QUEUE_MAX", 1000))
+REALTIME_SEND_LAG_SECONDS = float(os.getenv("REALTIME_SEND_LAG_SECONDS", 10))
+
+# Per-socket token buckets: {message type: (messages per second, burst)}; "*" = any other type.
+# Excess is dropped; past WARN_AFTER drops per WINDOW seconds the client is warned,
+# past CLOSE_AFTER it is disconnected (4429).
+REALTIME_RATE_LIMITS = {
+    "cursor": (30, 60),
+    "node_move": (60, 120),
+    "viewport": (20, 40),
+    "text_edit": (10, 20),
+    "shape_op": (30, 60),
+    "shape_ops": (10, 30),
+    "chat": (5, 10),
+    "*": (50, 100),
+}
+GAME_RATE_LIMITS = {
+    "move": (30, 60),
+    "place_block": (20, 40),
+    "remove_block": (20, 40),
+    "place_blocks": (2, 5),
+    "remove_blocks": (2, 5),
+    "chat": (3, 6),
+    "*": (20, 40),
+}
+REALTIME_RATE_LIMIT_WINDOW = float(os.getenv("REALTIME_RATE_LIMIT_WINDOW", 10))
+REALTIME_RATE_LIMIT_WARN_AFTER = int(os.getenv("REALTIME_RATE_LIMIT_WARN_AFTER", 50))
+REALTIME_RATE_LIMIT_CLOSE_AFTER = int(os.getenv("REALTIME_RATE_LIMIT_CLOSE_AFTER", 200))
+
+# Prometheus endpoint /api/realtime/metrics/: bearer token required when set, else DEBUG-only
+REALTIME_METRICS_TOKEN = os.getenv("REALTIME_METRICS_TOKEN", "")
 
 # Django 3.2+ default primary key type
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
@@ -11,6 +11,7 @@ urlpatterns = [
     path("api/auth/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("api/projects/", include("projects.urls")),
     path("api/osint/", include("osint.urls")),  # <-- add this line
+    path("api/realtime/", include("realtime.urls")),  # websocket tier metrics
 ]
 
 if settings.DEBUG:
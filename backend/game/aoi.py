@@ -0,0 +1,133 @@
+# /backend/game/aoi.py
+"""
+Area of interest for one game socket.
+
+The world is cut into CHUNK_SIZE x CHUNK_SIZE columns (the same grid as the frontend's
+lib/chunks.ts). A socket only receives moves and block edits from chunks within
+GAME_AOI_RADIUS of its own player's chunk (a square window, y ignored).
+
+Every player position from the session tick is recorded in a chunk -> players spatial
+hash, visible or not, so when a player (or the socket's own player) crosses a chunk
+border only the chunks sliding in or out of the window are looked at. Players crossing
+the window edge come back as `entered` / `left` so the consumer can tell its client.
+Until the socket's own player has moved, it sees everything.
+"""
+import math
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+CHUNK_SIZE = 16
+
+Chunk = Tuple[int, int]
+Pos = Tuple[Any, Any, Any]
+
+
+def chunk_of(x, z) -> Optional[Chunk]:
+    try:
+        return math.floor(float(x)) // CHUNK_SIZE, math.floor(float(z)) // CHUNK_SIZE
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+class InterestArea:
+    def __init__(self, self_id: str, radius: int):
+        self.self_id = self_id
+        self.radius = max(0, int(radius))
+        self.center: Optional[Chunk] = None
+        self.positions: Dict[str, Pos] = {}
+        self._chunk_of: Dict[str, Chunk] = {}
+        self._grid: Dict[Chunk, Set[str]] = {}
+        self.visible: Set[str] = set()
+
+    def _near(self, chunk: Optional[Chunk]) -> bool:
+        if self.center is None:
+            return True
+        if chunk is None:
+            return False
+        return abs(chunk[0] - self.center[0]) <= self.radius and abs(chunk[1] - self.center[1]) <= self.radius
+
+    def window(self, center: Chunk) -> Iterable[Chunk]:
+        r = self.radius
+        return ((center[0] + dx, center[1] + dz) for dx in range(-r, r + 1) for dz in range(-r, r + 1))
+
+    def sees_block(self, x, z) -> bool:
+        return self._near(chunk_of(x, z))
+
+    def sees_box(self, x0: int, z0: int, x1: int, z1: int) -> bool:
+        """Whether any column of the block area (x0 <= x1, z0 <= z1) is in the window."""
+        if self.center is None:
+            return True
+        cx, cz, r = self.center[0], self.center[1], self.radius
+        return (x0 // CHUNK_SIZE <= cx + r and x1 // CHUNK_SIZE >= cx - r
+                and z0 // CHUNK_SIZE <= cz + r and z1 // CHUNK_SIZE >= cz - r)
+
+    def _place(self, player_id: str, chunk: Optional[Chunk]):
+        old = self._chunk_of.get(player_id)
+        if old == chunk:
+            return
+        if old is not None:
+            members = self._grid.get(old)
+            if members is not None:
+                members.discard(player_id)
+                if not members:
+                    del self._grid[old]
+        if chunk is None:
+            self._chunk_of.pop(player_id, None)
+        else:
+            self._chunk_of[player_id] = chunk
+            self._grid.setdefault(chunk, set()).add(player_id)
+
+    def forget(self, player_id: str):
+        self._place(player_id, None)
+        self.positions.pop(player_id, None)
+        self.visible.discard(player_id)
+
+    def apply_moves(self, moves: List[List[Any]]) -> Tuple[List[List[Any]], List[str], List[str]]:
+        """
+        Feed one tick's [player_id, x, y, z] rows. Returns (rows to send, players that entered
+        the area, players that left it); entering players' rows carry their current position.
+        """
+        own = None
+        for row in moves:
+            player_id, x, y, z = row
+            if player_id == self.self_id:
+                own = chunk_of(x, z)
+                continue
+            self.positions[player_id] = (x, y, z)
+            self._place(player_id, chunk_of(x, z))
+
+        entered: Set[str] = set()
+        left: Set[str] = set()
+        if own is not None and own != self.center:
+            old_center, self.center = self.center, own
+            if old_center is None or (2 * self.radius + 1) ** 2 > len(self.positions):
+                candidates: Iterable[str] = list(self.positions)
+            else:
+                # Only chunks sliding into / out of the window can change visibility
+                old_w, new_w = set(self.window(old_center)), set(self.window(own))
+                candidates = [p for c in old_w ^ new_w for p in self._grid.get(c, ())]
+            for player_id in candidates:
+                near = self._near(self._chunk_of.get(player_id))
+                if near and player_id not in self.visible:
+                    entered.add(player_id)
+                elif not near and player_id in self.visible:
+                    left.add(player_id)
+
+        out: List[List[Any]] = []
+        for row in moves:
+            player_id = row[0]
+            if player_id == self.self_id or player_id in entered:
+                continue
+            near = self._near(self._chunk_of.get(player_id))
+            if near:
+                if player_id not in self.visible:
+                    entered.add(player_id)
+                    continue
+                out.append(row)
+            elif player_id in self.visible:
+                left.add(player_id)
+
+        for player_id in entered:
+            self.visible.add(player_id)
+            out.append([player_id, *self.positions[player_id]])
+        self.visible -= left
+        return out, sorted(entered), sorted(left)
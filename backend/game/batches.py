@@ -0,0 +1,107 @@
+# /backend/game/batches.py
+"""
+Batched block edits: one message for a whole area instead of one per voxel.
+
+    {type: "place_blocks", block: kind,
+     boxes: [[x0, y0, z0, x1, y1, z1], ...],    # inclusive corners, in any order
+     runs:  [[x, y, z, n], ...]}                # n cells from (x, y, z) along +x
+    {type: "remove_blocks", boxes: [...], runs: [...]}
+
+Runs are folded into boxes (a run is a 1x1 box), so a batch travels and is stored as
+[player_id, kind, [[x0, y0, z0, x1, y1, z1], ...]] with min corner first.
+
+A batch is checked as a whole before anything is applied: one bad entry, or more than
+GAME_MAX_BATCH_CELLS cells in total, and none of it is applied.
+"""
+import math
+from typing import Any, Dict, Iterable, Iterator, List, Set, Tuple
+
+from .aoi import CHUNK_SIZE
+from .chunks import MAX_BLOCK_XZ, MAX_BLOCK_Y, valid_kind
+
+Box = List[int]
+
+
+class BatchError(ValueError):
+    def __init__(self, code: str, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+def _ints(values) -> List[int]:
+    out = []
+    for v in values:
+        if (isinstance(v, bool) or not isinstance(v, (int, float))
+                or (isinstance(v, float) and not math.isfinite(v)) or int(v) != v):
+            raise BatchError("bad_batch", "Block coordinates must be integers.")
+        out.append(int(v))
+    return out
+
+
+def _in_world(x: int, y: int, z: int) -> bool:
+    return abs(x) < MAX_BLOCK_XZ and abs(z) < MAX_BLOCK_XZ and abs(y) < MAX_BLOCK_Y
+
+
+def box_cells(box: Box) -> int:
+    x0, y0, z0, x1, y1, z1 = box
+    return (x1 - x0 + 1) * (y1 - y0 + 1) * (z1 - z0 + 1)
+
+
+def parse_batch(content: Dict[str, Any], place: bool, max_cells: int) -> Tuple[Any, List[Box]]:
+    """(kind, boxes) of a place_blocks / remove_blocks message; raises BatchError."""
+    kind = None
+    if place:
+        kind = content.get("block")
+        if kind is None or not valid_kind(kind):
+            raise BatchError("bad_batch", "place_blocks needs a valid block.")
+    boxes_in, runs_in = content.get("boxes") or [], content.get("runs") or []
+    if not isinstance(boxes_in, list) or not isinstance(runs_in, list):
+        raise BatchError("bad_batch", "boxes / runs must be lists.")
+
+    boxes: List[Box] = []
+    total = 0
+    for entry in boxes_in:
+        if not isinstance(entry, (list, tuple)) or len(entry) != 6:
+            raise BatchError("bad_batch", "A box is [x0, y0, z0, x1, y1, z1].")
+        ax, ay, az, bx, by, bz = _ints(entry)
+        boxes.append([min(ax, bx), min(ay, by), min(az, bz), max(ax, bx), max(ay, by), max(az, bz)])
+        total += box_cells(boxes[-1])
+        if total > max_cells:
+            break
+    for entry in runs_in:
+        if total > max_cells:
+            break
+        if not isinstance(entry, (list, tuple)) or len(entry) != 4:
+            raise BatchError("bad_batch", "A run is [x, y, z, n].")
+        x, y, z, n = _ints(entry)
+        if n < 1:
+            raise BatchError("bad_batch", "A run covers at least one cell.")
+        boxes.append([x, y, z, x + n - 1, y, z])
+        total += n
+
+    if total > max_cells:
+        raise BatchError("batch_too_large", f"A batch may cover at most {max_cells} cells.")
+    if not boxes:
+        raise BatchError("bad_batch", "Empty batch.")
+    for x0, y0, z0, x1, y1, z1 in boxes:
+        if not (_in_world(x0, y0, z0) and _in_world(x1, y1, z1)):
+            raise BatchError("bad_batch", "Block coordinates out of range.")
+    return kind, boxes
+
+
+def iter_cells(boxes: Iterable[Box]) -> Iterator[Tuple[int, int, int]]:
+    for x0, y0, z0, x1, y1, z1 in boxes:
+        for y in range(y0, y1 + 1):
+            for z in range(z0, z1 + 1):
+                for x in range(x0, x1 + 1):
+                    yield x, y, z
+
+
+def box_chunks(boxes: Iterable[Box]) -> Set[Tuple[int, int]]:
+    """Chunk columns the boxes touch."""
+    keys = set()
+    for x0, _, z0, x1, _, z1 in boxes:
+        for cx in range(x0 // CHUNK_SIZE, x1 // CHUNK_SIZE + 1):
+            for cz in range(z0 // CHUNK_SIZE, z1 // CHUNK_SIZE + 1):
+                keys.add((cx, cz))
+    return keys
@@ -0,0 +1,361 @@
+# /backend/game/chunks.py
+"""
+Server-side store of block edits, per 16x16 chunk column.
+
+Only edits are kept (terrain itself is generated by the client from the seed). A chunk is
+split into 16-high sections; each section that has edits holds:
+  - a palette: [<not edited>, kind, kind, ..., None]   (None = block removed)
+  - a bytearray of 4-bit palette indices, one per cell
+so an edited section costs 2 KiB however many edits it holds, and an unedited one nothing.
+Only the client's block ids (BLOCK_KINDS) and removals are stored, so a palette never
+outgrows the 16 entries 4 bits can index; an edit that would is refused (set() returns
+False), never raised.
+
+A session's WorldEdits loads chunks lazily (one read per batch), is written to by the
+session actor only, and flushes dirty chunks in the background. Chunks are stored in
+region files under GAME_WORLD_DIR (game/regions.py), or in the GameChunk table when
+GAME_WORLD_DIR is empty (several hosts sharing one database).
+Like SESSIONS, it is per worker: a session's world lives in the worker hosting it. The
+region files are locked per read / write / compaction, so a worker still flushing a session
+that another worker has since re-created cannot corrupt them or drop the other's chunks.
+Mostly-dead region files are compacted after a flush, every GAME_REGION_COMPACT_SECONDS.
+"""
+import asyncio
+import json
+import struct
+import time
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+
+from .aoi import CHUNK_SIZE
+from .regions import RegionStore
+
+Chunk = Tuple[int, int]
+
+SECTION_HEIGHT = 16
+SECTION_CELLS = CHUNK_SIZE * CHUNK_SIZE * SECTION_HEIGHT
+_MAGIC = b"GCK1"
+
+GAME_REGION_COMPACT_SECONDS = getattr(settings, "GAME_REGION_COMPACT_SECONDS", 300)
+
+_UNSET = object()  # palette slot 0: cell not edited
+
+# Block coordinates we accept (|x|, |z| / |y|)
+MAX_BLOCK_XZ = 1 << 24
+MAX_BLOCK_Y = 4096
+
+
+# Placeable block ids: keep in sync with BLOCKS in frontend/app/games/minecraft/lib/constants.ts
+BLOCK_KINDS = frozenset(range(1, 10))
+
+# Cells are 4-bit palette indices: at most 16 palette entries, index 0 included
+SECTION_BITS = 4
+MAX_PALETTE = 1 << SECTION_BITS
+
+
+def valid_kind(kind) -> bool:
+    """Block kinds we store: the client's block ids (None = removal)."""
+    if kind is None:
+        return True
+    return not isinstance(kind, bool) and isinstance(kind, int) and kind in BLOCK_KINDS
+
+
+def _cell(x: int, y: int, z: int) -> int:
+    return ((y % SECTION_HEIGHT) << 8) | ((z % CHUNK_SIZE) << 4) | (x % CHUNK_SIZE)
+
+
+class Section:
+    __slots__ = ("palette", "_index", "data", "count")
+
+    def __init__(self, palette: Optional[List[Any]] = None, data: Optional[bytes] = None):
+        self.palette: List[Any] = [_UNSET] + list(palette or [])
+        self._index: Dict[Any, int] = {v: i for i, v in enumerate(self.palette) if i}
+        self.data = bytearray(data) if data is not None else bytearray(SECTION_CELLS // 2)
+        self.count = sum(1 for _ in self.cells()) if data is not None else 0
+
+    def get(self, i: int) -> int:
+        b = self.data[i >> 1]
+        return (b >> 4) if i & 1 else (b & 0x0F)
+
+    def _put(self, i: int, idx: int):
+        data = self.data
+        if i & 1:
+            data[i >> 1] = (data[i >> 1] & 0x0F) | (idx << 4)
+        else:
+            data[i >> 1] = (data[i >> 1] & 0xF0) | idx
+
+    def set(self, i: int, kind) -> bool:
+        """Store kind at cell i; False (nothing changed) if the palette has no room left for it."""
+        idx = self._index.get(kind)
+        if idx is None:
+            idx = len(self.palette)
+            if idx >= MAX_PALETTE:
+                return False
+            self.palette.append(kind)
+            self._index[kind] = idx
+        if not self.get(i):
+            self.count += 1
+        self._put(i, idx)
+        return True
+
+    def palette_bytes(self) -> bytes:
+        return json.dumps(self.palette[1:], separators=(",", ":")).encode("utf-8")
+
+    def cells(self) -> Iterable[Tuple[int, Any]]:
+        """(cell index, kind) of every edited cell."""
+        palette = self.palette
+        for j, b in enumerate(self.data):
+            if b:
+                if b & 0x0F:
+                    yield 2 * j, palette[b & 0x0F]
+                if b >> 4:
+                    yield 2 * j + 1, palette[b >> 4]
+
+
+class ChunkEdits:
+    def __init__(self, cx: int, cz: int):
+        self.cx, self.cz = cx, cz
+        self.sections: Dict[int, Section] = {}
+        self.dirty = False
+
+    def __len__(self):
+        return sum(s.count for s in self.sections.values())
+
+    def set(self, x: int, y: int, z: int, kind) -> bool:
+        sy = y // SECTION_HEIGHT
+        section = self.sections.get(sy)
+        if section is None:
+            section = self.sections[sy] = Section()
+        if not section.set(_cell(x, y, z), kind):
+            return False
+        self.dirty = True
+        return True
+
+    def edits(self) -> List[List[Any]]:
+        """[[x, y, z, kind], ...] in world coordinates (kind None = removed)."""
+        x0, z0 = self.cx * CHUNK_SIZE, self.cz * CHUNK_SIZE
+        out = []
+        for sy, section in sorted(self.sections.items()):
+            y0 = sy * SECTION_HEIGHT
+            for i, kind in section.cells():
+                out.append([x0 + (i & 0x0F), y0 + (i >> 8), z0 + ((i >> 4) & 0x0F), kind])
+        return out
+
+    def to_bytes(self) -> bytes:
+        parts = [_MAGIC, struct.pack("<H", len(self.sections))]
+        for sy, section in sorted(self.sections.items()):
+            palette = section.palette_bytes()
+            parts.append(struct.pack("<iBH", sy, SECTION_BITS, len(palette)))
+            parts.append(palette)
+            parts.append(bytes(section.data))
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, cx: int, cz: int, raw: bytes) -> "ChunkEdits":
+        chunk = cls(cx, cz)
+        if raw[:4] != _MAGIC:
+            raise ValueError("not a chunk payload")
+        (n,) = struct.unpack_from("<H", raw, 4)
+        off = 6
+        for _ in range(n):
+            sy, bits, plen = struct.unpack_from("<iBH", raw, off)
+            if bits != SECTION_BITS:
+                raise ValueError(f"unsupported section width: {bits} bits")
+            off += 7
+            palette = json.loads(raw[off:off + plen].decode("utf-8"))
+            off += plen
+            size = SECTION_CELLS // 2
+            chunk.sections[sy] = Section(palette, raw[off:off + size])
+            off += size
+        return chunk
+
+
+# ---------- Persistence ----------
+class TableStore:
+    """Chunk payloads in the GameChunk table (one range query per load, one upsert per save)."""
+
+    def load(self, session_id: str, keys: List[Chunk]) -> Dict[Chunk, bytes]:
+        from .models import GameChunk
+
+        xs, zs = [k[0] for k in keys], [k[1] for k in keys]
+        wanted = set(keys)
+        rows = GameChunk.objects.filter(
+            session_id=session_id, cx__gte=min(xs), cx__lte=max(xs), cz__gte=min(zs), cz__lte=max(zs),
+        ).values_list("cx", "cz", "data")
+        return {(cx, cz): zlib.decompress(data) for cx, cz, data in rows if (cx, cz) in wanted}
+
+    def save(self, session_id: str, payloads: Dict[Chunk, bytes]):
+        from .models import GameChunk
+
+        GameChunk.objects.bulk_create(
+            [GameChunk(session_id=session_id, cx=cx, cz=cz, data=zlib.compress(raw))
+             for (cx, cz), raw in payloads.items()],
+            update_conflicts=True,
+            unique_fields=["session_id", "cx", "cz"],
+            update_fields=["data", "updated_at"],
+        )
+
+    def compact(self, session_id: str):
+        pass  # the database reuses the space of updated rows itself
+
+
+_STORE = None
+
+
+def chunk_store():
+    global _STORE
+    if _STORE is None:
+        root = getattr(settings, "GAME_WORLD_DIR", "")
+        _STORE = RegionStore(str(root)) if root else TableStore()
+    return _STORE
+
+
+# Store calls run on the database thread, like every other blocking call of the consumers
+@database_sync_to_async
+def _load_chunks(session_id: str, keys: List[Chunk]) -> Dict[Chunk, bytes]:
+    return chunk_store().load(session_id, keys)
+
+
+@database_sync_to_async
+def _save_chunks(session_id: str, payloads: Dict[Chunk, bytes]):
+    chunk_store().save(session_id, payloads)
+
+
+@database_sync_to_async
+def _compact_chunks(session_id: str):
+    chunk_store().compact(session_id)
+
+
+# session_id -> flush still running (a session re-created meanwhile waits for it before loading)
+FLUSHING: Dict[str, asyncio.Task] = {}
+
+
+class WorldEdits:
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.chunks: Dict[Chunk, ChunkEdits] = {}
+        self._loading: Dict[Chunk, asyncio.Future] = {}
+        self._compacted_at = time.monotonic()
+
+    async def ensure(self, keys: Iterable[Chunk]):
+        """Load the given chunks (one query for all of them) unless already in memory."""
+        keys = set(keys)
+        missing = [k for k in keys if k not in self.chunks and k not in self._loading]
+        if missing:
+            fut = asyncio.get_running_loop().create_future()
+            for k in missing:
+                self._loading[k] = fut
+            try:
+                pending = FLUSHING.get(self.session_id)
+                if pending is not None:
+                    await asyncio.shield(pending)
+                found = await _load_chunks(self.session_id, missing)
+                for k in missing:
+                    raw = found.get(k)
+                    self.chunks[k] = ChunkEdits.from_bytes(k[0], k[1], raw) if raw else ChunkEdits(*k)
+                fut.set_result(None)
+            except asyncio.CancelledError:
+                fut.cancel()
+                raise
+            except Exception as exc:
+                fut.set_exception(exc)
+                fut.exception()  # mark retrieved: waiters re-raise it themselves
+                raise
+            finally:
+                for k in missing:
+                    self._loading.pop(k, None)
+        waits = {id(f): f for k in keys if (f := self._loading.get(k)) is not None}
+        for fut in waits.values():
+            await fut
+
+    def apply(self, x: int, y: int, z: int, kind) -> bool:
+        """
+        Record an edit; the chunk must have been ensure()d first or its stored edits are lost.
+        False if the section refused it (palette full).
+        """
+        key = (x // CHUNK_SIZE, z // CHUNK_SIZE)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = self.chunks[key] = ChunkEdits(*key)
+        return chunk.set(x, y, z, kind)
+
+    def placed_at(self, x: int, y: int, z: int) -> bool:
+        """Whether a player placed a block at this cell (False for unloaded chunks)."""
+        chunk = self.chunks.get((x // CHUNK_SIZE, z // CHUNK_SIZE))
+        section = chunk.sections.get(y // SECTION_HEIGHT) if chunk is not None else None
+        if section is None:
+            return False
+        idx = section.get(_cell(x, y, z))
+        return bool(idx) and section.palette[idx] is not None
+
+    def near(self, keys: Iterable[Chunk]) -> List[Dict[str, Any]]:
+        """chunk_edits payload for the loaded, non-empty chunks among keys."""
+        out = []
+        for key in keys:
+            chunk = self.chunks.get(key)
+            if chunk is not None and chunk.sections:
+                out.append({"cx": key[0], "cz": key[1], "edits": chunk.edits()})
+        return out
+
+    def take_dirty(self) -> Dict[Chunk, bytes]:
+        """Payloads of the dirty chunks, marking them clean; a chunk that fails to serialize stays dirty."""
+        payloads = {}
+        for key, chunk in self.chunks.items():
+            if chunk.dirty:
+                try:
+                    payloads[key] = chunk.to_bytes()
+                except Exception:
+                    continue
+                chunk.dirty = False
+        return payloads
+
+    async def flush(self):
+        payloads = self.take_dirty()
+        if not payloads:
+            return
+        try:
+            await _save_chunks(self.session_id, payloads)
+        except Exception:
+            for key in payloads:
+                chunk = self.chunks.get(key)
+                if chunk is not None:
+                    chunk.dirty = True  # retried on the next flush
+            raise
+
+    def flush_in_background(self) -> Optional[asyncio.Task]:
+        running = FLUSHING.get(self.session_id)
+        if running is not None and not running.done():
+            return running
+        if not any(c.dirty for c in self.chunks.values()):
+            return None
+        task = FLUSHING[self.session_id] = asyncio.ensure_future(self._flush_quietly())
+        task.add_done_callback(lambda t: FLUSHING.pop(self.session_id, None) if FLUSHING.get(self.session_id) is t else None)
+        return task
+
+    async def close(self):
+        """Write out everything still dirty, after any flush already running (session stop, snapshots)."""
+        running = FLUSHING.get(self.session_id)
+        if running is not None and not running.done():
+            await asyncio.shield(running)
+        task = self.flush_in_background()
+        if task is not None:
+            await asyncio.shield(task)
+        await self._compact_quietly()
+
+    async def _flush_quietly(self):
+        try:
+            await self.flush()
+        except Exception:
+            pass  # chunks stay dirty; the next flush retries
+        if time.monotonic() - self._compacted_at >= GAME_REGION_COMPACT_SECONDS:
+            await self._compact_quietly()
+
+    async def _compact_quietly(self):
+        self._compacted_at = time.monotonic()
+        try:
+            await _compact_chunks(self.session_id)
+        except Exception:
+            pass  # retried once a later save finds the file still mostly dead
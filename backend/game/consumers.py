@@ -10,26 +10,86 @@ Lightweight realtime "session" server for your Minecraft-like page.
 Adds:
 - Per-session cap (GAME_MAX_PLAYERS_PER_SESSION)
 - Per-user concurrent-connection cap (GAME_MAX_CONN_PER_USER)
+- Per-socket, per-type inbound token buckets (GAME_RATE_LIMITS; excess dropped, abuse => 4429)
+- Per-socket outbound queue (player moves are latest-wins per player; see realtime/sendqueue.py)
+- Optional binary wire format (subprotocol "rt.msgpack.v1" / "rt.cbor.v1"; see realtime/codec.py):
+  moves and block edits become tagged arrays with fixed-point positions and epoch-ms times
+- Fixed server tick (GAME_TICK_HZ; see game/session.py): moves and block edits are folded by the
+  session's actor and broadcast as one "game.tick" frame per tick. Clients connecting with
+  ?tick=1 receive that frame as {type: "tick", ...}; others get it expanded into the usual
+  player_move / block_place / block_remove frames.
+- Compact moves (?moves=delta, implies ?tick=1; see game/moves.py): tick frames carry no time
+  string and no empty lists, and their move rows are int16 fixed-point deltas against the
+  last row sent (key rows with the player's 16x16x16 cell when it changes).
+- Batched block edits (game/batches.py): {type: "place_blocks" / "remove_blocks", boxes, runs} covering
+  up to GAME_MAX_BATCH_CELLS cells is validated as a whole (else one {type: "warning",
+  code: "bad_batch" / "batch_too_large"} frame and nothing applied), applied in a single tick and
+  broadcast once, in the tick frame's "batches" list (legacy clients: one blocks_place /
+  blocks_remove frame).
+- Area of interest (GAME_AOI_RADIUS chunks of 16x16; see game/aoi.py): each socket only gets moves
+  and block edits near its own player. Players crossing that boundary are announced in the tick
+  frame's "entered" / "left" lists (legacy clients: a player_move / an aoi_leave frame).
+- Block edits are stored server-side per chunk (game/chunks.py, persisted to GameChunk). From a
+  player's first move on, whenever their area of interest slides, the edits of the chunks that
+  came into it are sent as one {type: "chunk_edits", chunks: [{cx, cz, edits: [[x, y, z, kind]]}]}
+  frame (kind null = removed), so late joiners see what was built before them.
+- Session snapshots (game/snapshots.py): every GAME_SNAPSHOT_SECONDS and on SIGTERM / SIGINT the
+  session's tick counter and player positions are written next to its region files. After a
+  restart, the first connect reads them back: the welcome's "tick" carries on and a returning
+  signed-in player's "you" has their last "pos" (where the client should put them).
+- Server-side move checks (game/heightmap.py): positions must be finite numbers, y is clamped to
+  the generated ground (eye >= ground + player height, as on the client), and a move that is
+  faster than GAME_MAX_MOVE_SPEED (+ GAME_MOVE_SLACK blocks) or walks into a placed block is
+  not forwarded; the sender gets {type: "correction", reason, pos} with its last accepted position.
 - Close codes:
     4001 => room_full
     4002 => too_many_tabs
+    4408 => client too slow to keep up (may reconnect)
+    4429 => sustained message flooding
 """
 import asyncio
+import math
+import time
 from uuid import uuid4
 from datetime import datetime, timezone
 from typing import Dict, Any
+from urllib.parse import parse_qs
 
 from django.conf import settings
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 
+from realtime.sendqueue import OutboxMixin
+from realtime.ratelimit import RateLimitMixin
+from realtime.codec import CodecMixin
+from realtime import metrics
+
+from .aoi import InterestArea
+from .batches import BatchError, parse_batch
+from .chunks import MAX_BLOCK_XZ, MAX_BLOCK_Y, valid_kind
+from .heightmap import HEIGHTS, check_move, spawn_pos
+from .moves import MOVE_SCALE, MoveEncoder
+from .session import GameSession
+from .snapshots import install_shutdown_hook
+
 # -------- Tunables (override in Django settings) --------
 GAME_MAX_PLAYERS_PER_SESSION = getattr(settings, "GAME_MAX_PLAYERS_PER_SESSION", 8)
 GAME_MAX_CONN_PER_USER = getattr(settings, "GAME_MAX_CONN_PER_USER", 3)
+GAME_RATE_LIMITS = getattr(settings, "GAME_RATE_LIMITS", {"*": (20, 40)})
+GAME_TICK_HZ = getattr(settings, "GAME_TICK_HZ", 20)
+GAME_AOI_RADIUS = getattr(settings, "GAME_AOI_RADIUS", 4)
+GAME_CHUNK_FLUSH_SECONDS = getattr(settings, "GAME_CHUNK_FLUSH_SECONDS", 5)
+GAME_SNAPSHOT_SECONDS = getattr(settings, "GAME_SNAPSHOT_SECONDS", 30)
+
+GAME_MAX_BATCH_CELLS = getattr(settings, "GAME_MAX_BATCH_CELLS", 4096)
+GAME_MAX_MOVE_SPEED = getattr(settings, "GAME_MAX_MOVE_SPEED", 12.0)
+GAME_MOVE_SLACK = getattr(settings, "GAME_MOVE_SLACK", 3.0)
+
+# Longest gap between two moves that still earns walking distance (s)
+MAX_MOVE_GAP = 2.0
 
 # -------- In-memory session store (dev only) --------
-# { session_id: { "players": {player_id: {"username": str, "last_seen": iso}}, "locks": asyncio.Lock() } }
-SESSIONS: Dict[str, Dict[str, Any]] = {}
-STORE_LOCK = asyncio.Lock()
+# { session_id: GameSession }  (players: {player_id: {"username": str, "last_seen": iso}})
+SESSIONS: Dict[str, GameSession] = {}
 
 # Per-user concurrent connection counts (dev only).
 # In production across multiple workers, back this with Redis (e.g., INCR/DECR on user:{id}:conncount).
@@ -41,25 +101,82 @@ def _utcnow() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
-async def _get_session(session_id: str) -> Dict[str, Any]:
-    # Ensure session dict exists and has a lock
-    async with STORE_LOCK:
-        if session_id not in SESSIONS:
-            SESSIONS[session_id] = {"players": {}, "locks": asyncio.Lock()}
-        return SESSIONS[session_id]
+def _session_gauges():
+    return {("game",): sum(1 for s in list(SESSIONS.values()) if s.players)}
+
+
+def _player_gauges():
+    return {("game",): sum(len(s.players) for s in list(SESSIONS.values()))}
+
+
+metrics.ROOMS.set_function(_session_gauges)
+metrics.PEERS.set_function(_player_gauges)
+
+
+def _get_session(session_id: str, channel_layer) -> GameSession:
+    sess = SESSIONS.get(session_id)
+    if sess is None:
+        sess = SESSIONS[session_id] = GameSession(
+            session_id, channel_layer, GAME_TICK_HZ, GAME_CHUNK_FLUSH_SECONDS, GAME_SNAPSHOT_SECONDS,
+        )
+        install_shutdown_hook(lambda: list(SESSIONS.values()))
+    return sess
+
+
+def _block_xyz(content: Dict[str, Any]):
+    """Integer block cell from a place / remove message, or None if out of range / malformed."""
+    try:
+        x, y, z = (content.get(k) for k in ("x", "y", "z"))
+        if any(isinstance(v, bool) or int(v) != v for v in (x, y, z)):
+            return None
+        x, y, z = int(x), int(y), int(z)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    if abs(x) >= MAX_BLOCK_XZ or abs(z) >= MAX_BLOCK_XZ or abs(y) >= MAX_BLOCK_Y:
+        return None
+    return x, y, z
+
+
+def _move_xyz(content: Dict[str, Any]):
+    """Finite float position from a move message, or None."""
+    try:
+        xyz = tuple(float(content.get(k)) for k in ("x", "y", "z"))
+    except (TypeError, ValueError, OverflowError):
+        return None
+    if not all(math.isfinite(v) for v in xyz):
+        return None
+    if abs(xyz[0]) >= MAX_BLOCK_XZ or abs(xyz[2]) >= MAX_BLOCK_XZ or abs(xyz[1]) >= MAX_BLOCK_Y:
+        return None
+    return xyz
+
+
+def _query_param(scope, name: str, default: str = "") -> str:
+    qs = parse_qs(scope.get("query_string", b"").decode("utf-8"))
+    return qs.get(name, [default])[0]
 
 
-class GameConsumer(AsyncJsonWebsocketConsumer):
+def _want_tick_frames(scope) -> bool:
+    return _query_param(scope, "tick", "0") in ("1", "true", "yes")
+
+
+class GameConsumer(CodecMixin, RateLimitMixin, OutboxMixin, AsyncJsonWebsocketConsumer):
     """
     Events we accept from clients (JSON with at least a 'type'):
       - {type: "join", name?: "Display Name"}           -> acknowledge and broadcast player_join
-      - {type: "move", x: int, y: int, z: int}          -> broadcast player_move
-      - {type: "place_block", x:int,y:int,z:int, block:str} -> broadcast block_place
-      - {type: "remove_block", x:int,y:int,z:int}       -> broadcast block_remove
+      - {type: "move", x: int, y: int, z: int}          -> checked, then folded into the next tick
+      - {type: "place_block", x:int,y:int,z:int, block:int} -> folded into the next tick (unknown block: warning)
+      - {type: "remove_block", x:int,y:int,z:int}       -> folded into the next tick
+      - {type: "place_blocks", block, boxes?, runs?}    -> applied whole in the next tick
+      - {type: "remove_blocks", boxes?, runs?}          -> applied whole in the next tick
       - {type: "chat", message: str}                    -> broadcast chat
       - {type: "ping"}                                  -> reply with {type:"pong"}
     Server broadcasts (you should handle on the client):
-      - welcome, player_join, player_move, block_place, block_remove, chat, player_leave
+      - welcome, player_join, player_move, block_place, block_remove, chat, player_leave, chunk_edits
+      - correction (to the sender of a rejected move: go back to pos)
+      - warning (bad_block / bad_batch / batch_too_large / edit_refused: the edit was not applied)
+      - tick (instead of player_move / block_place / block_remove, with ?tick=1)
+      - aoi_leave (legacy clients: a player moved out of range)
+      - blocks_place / blocks_remove (legacy clients: a batch near you)
     """
     group_name: str
     session_id: str
@@ -71,6 +188,17 @@ class GameConsumer(AsyncJsonWebsocketConsumer):
     _joined_group: bool = False
     _conn_counted: bool = False
     _user_key: str = ""
+    tick_frames: bool = False
+    move_encoder = None
+    _chunks_center = None
+    _last_pos = None
+    _last_move_at = 0.0
+
+    rate_limits = GAME_RATE_LIMITS
+    metrics_label = "game"
+    message_types = frozenset({
+        "join", "move", "place_block", "remove_block", "place_blocks", "remove_blocks", "chat", "ping",
+    })
 
     async def connect(self):
         # URL kwarg from routing: re_path(... (?P<session_id>...))
@@ -88,39 +216,35 @@ class GameConsumer(AsyncJsonWebsocketConsumer):
             self.username = "guest"
             uid = None
 
+        self.aoi = InterestArea(self.player_id, GAME_AOI_RADIUS)
+        self._sent_chunks = set()
+
         # Key used for per-user concurrent connection limits
         self._user_key = str(uid) if uid is not None else f"guestkey:{self.player_id}"
 
-        # --- Enforce per-session cap (reserve a spot under lock to avoid races) ---
-        sess = await _get_session(self.session_id)
-        async with sess["locks"]:
-            players = sess["players"]
-            if len(players) >= GAME_MAX_PLAYERS_PER_SESSION and self.player_id not in players:
-                # Accept solely to deliver the error payload, then close.
-                await self.accept()
-                await self.send_json({
-                    "type": "error",
-                    "code": "room_full",
-                    "message": "This game session is full.",
-                    "limit": GAME_MAX_PLAYERS_PER_SESSION,
-                })
-                await self.close(code=4001)
-                return
-            # Reserve presence immediately so concurrent connects don't overbook
-            players[self.player_id] = {"username": self.username, "last_seen": _utcnow()}
-            self._presence_added = True
+        # --- Enforce per-session cap (check + reserve happen without an await in between) ---
+        sess = _get_session(self.session_id, self.channel_layer)
+        if not sess.reserve(self.player_id, self.username, GAME_MAX_PLAYERS_PER_SESSION):
+            # Accept solely to deliver the error payload, then close.
+            await self.accept()
+            await self.send_json({
+                "type": "error",
+                "code": "room_full",
+                "message": "This game session is full.",
+                "limit": GAME_MAX_PLAYERS_PER_SESSION,
+            })
+            metrics.REJECTS.inc(consumer="game", code=4001)
+            await self.close(code=4001)
+            return
+        self._presence_added = True
 
         # --- Enforce per-user concurrent-connection cap (across all sessions) ---
         async with USER_CONN_LOCK:
             current = USER_CONN_COUNTS.get(self._user_key, 0)
             if current >= GAME_MAX_CONN_PER_USER:
                 # Roll back the presence reservation
-                try:
-                    async with sess["locks"]:
-                        sess["players"].pop(self.player_id, None)
-                        self._presence_added = False
-                except Exception:
-                    pass
+                sess.release(self.player_id)
+                self._presence_added = False
                 await self.accept()
                 await self.send_json({
                     "type": "error",
@@ -128,6 +252,7 @@ class GameConsumer(AsyncJsonWebsocketConsumer):
                     "message": "Too many concurrent connections.",
                     "limit": GAME_MAX_CONN_PER_USER,
                 })
+                metrics.REJECTS.inc(consumer="game", code=4002)
                 await self.close(code=4002)
                 return
             # Count this connection
@@ -138,41 +263,63 @@ class GameConsumer(AsyncJsonWebsocketConsumer):
         await self.channel_layer.group_add(self.group_name, self.channel_name)
         self._joined_group = True
         await self.accept()
+        self.start_outbox()
+        self.tick_frames = _want_tick_frames(self.scope)
+        if _query_param(self.scope, "moves") == "delta":
+            self.tick_frames = True
+            self.move_encoder = MoveEncoder()
+        metrics.CONNECTS.inc(consumer="game")
+
+        # After a restart: pick up the session's snapshot (tick counter, where you were)
+        await sess.restore()
+        you = {"id": self.player_id, "username": self.username}
+        pos = (sess.restored.get(self.player_id) or {}).get("pos")
+        if pos is not None:
+            you["pos"] = {"x": pos[0], "y": pos[1], "z": pos[2]}
+        # The first move is checked from where the client starts, like every later one
+        self._last_pos = tuple(pos) if pos is not None else spawn_pos()
+        self._last_move_at = time.monotonic()
 
         # Send a welcome with current players (we've already added ourselves)
-        await self.send_json({
+        welcome = {
             "type": "welcome",
             "session": self.session_id,
-            "you": {"id": self.player_id, "username": self.username},
-            "players": (await _get_session(self.session_id))["players"],
+            "you": you,
+            "players": sess.players,
+            "tick": sess.tick,
             "time": _utcnow(),
-        })
+        }
+        if self.move_encoder is not None:
+            welcome["moves"] = {"format": "delta", "scale": MOVE_SCALE}
+        await self.enqueue(welcome)
 
         # Notify others
-        await self.channel_layer.group_send(self.group_name, {
+        await self._group_send({
             "type": "player.join",
             "player": {"id": self.player_id, "username": self.username},
             "time": _utcnow(),
         })
 
     async def disconnect(self, close_code):
-        # Presence cleanup
-        try:
-            if self._presence_added:
-                sess = await _get_session(self.session_id)
-                async with sess["locks"]:
-                    sess["players"].pop(self.player_id, None)
-        except Exception:
-            pass
+        await self.stop_outbox()
+        metrics.DISCONNECTS.inc(consumer="game", code=close_code)
 
-        # Group cleanup + notify others only if we actually joined
+        # Presence cleanup
+        if self._presence_added:
+            sess = SESSIONS.get(self.session_id)
+            if sess is not None:
+                sess.release(self.player_id)
+                if not sess.players:
+                    SESSIONS.pop(self.session_id, None)
+
+        # Notify others, then leave the group, only if we actually joined
         if self._joined_group:
-            await self.channel_layer.group_discard(self.group_name, self.channel_name)
-            await self.channel_layer.group_send(self.group_name, {
+            await self._group_send({
                 "type": "player.leave",
                 "player": {"id": self.player_id},
                 "time": _utcnow(),
             })
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
 
         # Decrement per-user connection count
         try:
@@ -192,70 +339,73 @@ class GameConsumer(AsyncJsonWebsocketConsumer):
         kind = content.get("type")
         if not kind:
             return
+        if not await self.allow_message(kind):
+            return
+        metrics.MESSAGES.inc(consumer="game", type=metrics.message_label(kind, self.message_types))
 
         # Touch presence
-        sess = await _get_session(self.session_id)
-        async with sess["locks"]:
-            if self.player_id in sess["players"]:
-                sess["players"][self.player_id]["last_seen"] = _utcnow()
+        sess = _get_session(self.session_id, self.channel_layer)
+        sess.touch(self.player_id)
 
         if kind == "join":
             # No-op: we already added you, but allow client to set a display name.
             name = content.get("name")
             if name:
-                async with sess["locks"]:
-                    p = sess["players"].get(self.player_id)
-                    if p:
-                        p["username"] = str(name)[:32]
-                        self.username = p["username"]
-                await self.channel_layer.group_send(self.group_name, {
+                p = sess.players.get(self.player_id)
+                if p:
+                    p["username"] = str(name)[:32]
+                    self.username = p["username"]
+                await self._group_send({
                     "type": "player.join",
                     "player": {"id": self.player_id, "username": self.username},
                     "time": _utcnow(),
                 })
 
         elif kind == "move":
-            msg = {
-                "type": "player.move",
-                "player": {"id": self.player_id},
-                "pos": {
-                    "x": content.get("x"),
-                    "y": content.get("y"),
-                    "z": content.get("z")
-                },
-                "time": _utcnow(),
-            }
-            await self.channel_layer.group_send(self.group_name, msg)
+            xyz = _move_xyz(content)
+            if xyz is None:
+                return
+            now = time.monotonic()
+            dt = min(now - self._last_move_at, MAX_MOVE_GAP)
+            checked, reason = check_move(sess.world, self._last_pos, xyz, dt, GAME_MAX_MOVE_SPEED, GAME_MOVE_SLACK)
+            if checked is None:
+                metrics.MOVES_REJECTED.inc(consumer="game", reason=reason)
+                x, y, z = self._last_pos
+                # Only the newest correction matters
+                await self.enqueue({"type": "correction", "reason": reason,
+                                    "pos": {"x": x, "y": y, "z": z}}, ("correction",))
+                return
+            self._last_pos, self._last_move_at = checked, now
+            sess.move(self.player_id, *checked)
 
         elif kind == "place_block":
-            msg = {
-                "type": "block.place",
-                "player": {"id": self.player_id},
-                "block": {
-                    "x": content.get("x"),
-                    "y": content.get("y"),
-                    "z": content.get("z"),
-                    "kind": content.get("block")
-                },
-                "time": _utcnow(),
-            }
-            await self.channel_layer.group_send(self.group_name, msg)
+            xyz = _block_xyz(content)
+            block = content.get("block")
+            if xyz is None or block is None:
+                return
+            if not valid_kind(block):
+                await self.enqueue({"type": "warning", "code": "bad_block", "message": "Unknown block."})
+                return
+            sess.edit(self.player_id, *xyz, block)
 
         elif kind == "remove_block":
-            msg = {
-                "type": "block.remove",
-                "player": {"id": self.player_id},
-                "x": content.get("x"),
-                "y": content.get("y"),
-                "z": content.get("z"),
-                "time": _utcnow(),
-            }
-            await self.channel_layer.group_send(self.group_name, msg)
+            xyz = _block_xyz(content)
+            if xyz is not None:
+                sess.edit(self.player_id, *xyz)
+
+        elif kind in ("place_blocks", "remove_blocks"):
+            try:
+                block, boxes = parse_batch(content, kind == "place_blocks", GAME_MAX_BATCH_CELLS)
+            except BatchError as exc:
+                await self.enqueue({"type": "warning", "code": exc.code, "message": str(exc),
+                                      "limit": GAME_MAX_BATCH_CELLS})
+                return
+            sess.edit_batch(self.player_id, block, boxes)
 
         elif kind == "chat":
             text = str(content.get("message", ""))[:300]
             if text:
-                await self.channel_layer.group_send(self.group_name, {
+                await self._group_send({
                     "type": "chat.message",
                     "player": {"id": self.player_id, "username": self.username},
                     "message": text,
@@ -263,23 +413,100 @@ class GameConsumer(AsyncJsonWebsocketConsumer):
                 })
 
         elif kind == "ping":
-            await self.send_json({"type": "pong", "time": _utcnow()})
+            await self.enqueue({"type": "pong", "time": _utcnow()})
+
+    async def _group_send(self, msg: Dict[str, Any]):
+        sess = SESSIONS.get(self.session_id)
+        metrics.FANOUT.observe(len(sess.players) if sess else 0, consumer="game")
+        with metrics.GROUP_SEND_SECONDS.time(consumer="game"):
+            await self.channel_layer.group_send(self.group_name, msg)
 
     # ----- Handlers for messages we broadcast (group_send 'type' maps dots -> underscores) -----
     async def player_join(self, event):
-        await self.send_json({"type": "player_join", **event})
+        await self.enqueue({"type": "player_join", **event})
 
     async def player_leave(self, event):
-        await self.send_json({"type": "player_leave", **event})
-
-    async def player_move(self, event):
-        await self.send_json({"type": "player_move", **event})
-
-    async def block_place(self, event):
-        await self.send_json({"type": "block_place", **event})
-
-    async def block_remove(self, event):
-        await self.send_json({"type": "block_remove", **event})
+        self.aoi.forget(event["player"]["id"])
+        if self.move_encoder is not None:
+            self.move_encoder.forget(event["player"]["id"])
+        await self.enqueue({"type": "player_leave", **event})
+
+    async def _send_nearby_chunks(self):
+        center = self._chunks_center = self.aoi.center
+        window = set(self.aoi.window(center))
+        new, self._sent_chunks = window - self._sent_chunks, window
+        if new:
+            HEIGHTS.ensure_in_background(new)  # ground heights for the move checks
+        sess = SESSIONS.get(self.session_id)
+        if not new or sess is None:
+            return
+        try:
+            await sess.world.ensure(new)
+        except Exception:
+            self._sent_chunks -= new  # retried when the area slides again
+            return
+        chunks = sess.world.near(sorted(new))
+        if chunks:
+            await self.enqueue({"type": "chunk_edits", "chunks": chunks})
+
+    async def game_tick(self, event):
+        if event.get("refused", {}).get(self.player_id):
+            await self.enqueue({"type": "warning", "code": "edit_refused",
+                                  "message": "Too many block kinds in this section; edit not saved."})
+        moves, entered, left = self.aoi.apply_moves(event["moves"])
+        if self.aoi.center is not None and self.aoi.center != self._chunks_center:
+            await self._send_nearby_chunks()
+        edits = [e for e in event["edits"] if self.aoi.sees_block(e[1], e[3])]
+        batches = [b for b in event.get("batches", ())
+                   if any(self.aoi.sees_box(x0, z0, x1, z1) for x0, _, z0, x1, _, z1 in b[2])]
+        if not (moves or edits or batches or left):
+            return
+        if self.move_encoder is not None:
+            # Compact frame: the tick number is the sequence, empty lists are left out
+            for player_id in left:
+                self.move_encoder.forget(player_id)
+            frame = {"type": "tick", "tick": event["tick"]}
+            for name, rows in (("moves", self.move_encoder.encode(moves)), ("edits", edits),
+                               ("batches", batches), ("entered", entered), ("left", left)):
+                if rows:
+                    frame[name] = rows
+            if len(frame) > 2:
+                await self.enqueue(frame)
+            return
+        if self.tick_frames:
+            await self.enqueue({
+                "type": "tick",
+                "tick": event["tick"],
+                "time": event["time"],
+                "moves": moves,
+                "edits": edits,
+                "batches": batches,
+                "entered": entered,
+                "left": left,
+            })
+            return
+        # Legacy clients: one frame per moved player / edited block, as before the tick loop
+        t = event["time"]
+        for player_id in left:
+            await self.enqueue({"type": "aoi_leave", "player": {"id": player_id}, "time": t})
+        for player_id, x, y, z in moves:
+            # Only the newest position per player matters to a lagging client
+            await self.enqueue({
+                "type": "player_move",
+                "player": {"id": player_id},
+                "pos": {"x": x, "y": y, "z": z},
+                "time": t,
+            }, ("player_move", player_id))
+        for player_id, block, boxes in batches:
+            await self.enqueue({"type": "blocks_remove" if block is None else "blocks_place",
+                                "player": {"id": player_id}, "block": block, "boxes": boxes, "time": t})
+        for player_id, x, y, z, block in edits:
+            if block is None:
+                await self.enqueue({"type": "block_remove", "player": {"id": player_id},
+                                    "x": x, "y": y, "z": z, "time": t})
+            else:
+                await self.enqueue({"type": "block_place", "player": {"id": player_id},
+                                    "block": {"x": x, "y": y, "z": z, "kind": block}, "time": t})
 
     async def chat_message(self, event):
-        await self.send_json({"type": "chat", **event})
+        await self.enqueue({"type": "chat", **event})
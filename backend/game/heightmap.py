@@ -0,0 +1,133 @@
+# /backend/game/heightmap.py
+"""
+Server-side move checks: terrain heights and placed blocks.
+
+  - heights: the generated ground height of every column (worldgen.height_at), one int16
+    array of CHUNK_SIZE x CHUNK_SIZE per chunk, in a per-process LRU. Terrain is
+    deterministic, so the cache is shared by every session; chunks are computed off the
+    event loop (ensure()) when an area of interest slides onto them.
+  - solid cells: blocks placed by players, read straight from the session's WorldEdits
+    sections (game/chunks.py), which already hold persisted edits as packed arrays.
+
+check_move() is O(1): one array lookup for the ground under the player and at most
+2 x 3 x 2 cell lookups for the body. It mirrors the client (components/Player.tsx,
+lib/physics.ts): the eye never goes below heightAt(round(x), round(z)) + PLAYER_HEIGHT,
+and nobody walks faster than a sprint. The first move of a socket is checked against where
+the client starts: spawn_pos(), or the position restored from a session snapshot.
+"""
+import asyncio
+import math
+from array import array
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+from . import worldgen
+from .aoi import CHUNK_SIZE
+
+Chunk = Tuple[int, int]
+
+# Keep in sync with lib/physics.ts / components/Player.tsx
+PLAYER_HEIGHT = 1.6
+PLAYER_RADIUS = 0.35
+# Where a new client puts its camera (x, z), on top of the ground
+SPAWN_X, SPAWN_Z = 0, 6
+
+# Chunk heightmaps kept per process (512 bytes each)
+MAX_CACHED_CHUNKS = 4096
+
+
+def _chunk_heights(cx: int, cz: int) -> array:
+    if worldgen.np is not None:
+        h, _, _, _ = worldgen.terrain_grid(cx * CHUNK_SIZE, cz * CHUNK_SIZE, CHUNK_SIZE, CHUNK_SIZE)
+        return array("h", h.astype(worldgen.np.int16).tobytes())
+    x0, z0 = cx * CHUNK_SIZE, cz * CHUNK_SIZE
+    return array("h", [worldgen.height_at(x0 + i, z0 + j) for j in range(CHUNK_SIZE) for i in range(CHUNK_SIZE)])
+
+
+class HeightCache:
+    def __init__(self, max_chunks: int = MAX_CACHED_CHUNKS):
+        self.max_chunks = max_chunks
+        self._chunks: "OrderedDict[Chunk, array]" = OrderedDict()
+        self._pending: set = set()
+        # Running ensure_in_background() tasks (referenced until done)
+        self._tasks: set = set()
+
+    def __len__(self):
+        return len(self._chunks)
+
+    def ground(self, x: int, z: int) -> Optional[int]:
+        """Generated ground height of column (x, z), or None if its chunk is not cached yet."""
+        key = (x // CHUNK_SIZE, z // CHUNK_SIZE)
+        heights = self._chunks.get(key)
+        if heights is None:
+            return None
+        self._chunks.move_to_end(key)
+        return heights[(z % CHUNK_SIZE) * CHUNK_SIZE + (x % CHUNK_SIZE)]
+
+    def _store(self, key: Chunk, heights: array):
+        self._chunks[key] = heights
+        while len(self._chunks) > self.max_chunks:
+            self._chunks.popitem(last=False)
+
+    async def ensure(self, keys: Iterable[Chunk]):
+        """Compute the missing chunks in a worker thread; a chunk already being computed is skipped."""
+        missing = [k for k in keys if k not in self._chunks and k not in self._pending]
+        if not missing:
+            return
+        self._pending.update(missing)
+        try:
+            loop = asyncio.get_running_loop()
+            computed = await loop.run_in_executor(None, lambda: [(k, _chunk_heights(*k)) for k in missing])
+            for key, heights in computed:
+                self._store(key, heights)
+        finally:
+            self._pending.difference_update(missing)
+
+    def ensure_in_background(self, keys: Iterable[Chunk]) -> asyncio.Task:
+        task = asyncio.ensure_future(self.ensure(keys))
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+        return task
+
+    def _done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled():
+            task.exception()  # retrieved: a chunk that failed is computed again on the next ensure
+
+
+HEIGHTS = HeightCache()
+
+
+def _blocked(world, x: float, y: float, z: float) -> bool:
+    """Whether the player's body at eye (x, y, z) overlaps a block placed by a player."""
+    for bx in range(math.floor(x - PLAYER_RADIUS), math.floor(x + PLAYER_RADIUS) + 1):
+        for bz in range(math.floor(z - PLAYER_RADIUS), math.floor(z + PLAYER_RADIUS) + 1):
+            for by in range(math.floor(y - PLAYER_HEIGHT), math.floor(y) + 1):
+                if world.placed_at(bx, by, bz):
+                    return True
+    return False
+
+
+def spawn_pos() -> Tuple[float, float, float]:
+    """Eye position of a freshly spawned client, as Player.tsx computes it."""
+    return float(SPAWN_X), worldgen.height_at(SPAWN_X, SPAWN_Z) + PLAYER_HEIGHT, float(SPAWN_Z)
+
+
+def check_move(world, last, pos, dt: float, max_speed: float, slack: float):
+    """
+    Validate a move from `last` (previous accepted position, or None) to `pos`, `dt` seconds
+    later. Returns (position to forward, None) with y clamped to the ground, or (None, reason)
+    for an impossible move: "too_fast" or "blocked".
+    """
+    x, y, z = pos
+    ground = HEIGHTS.ground(math.floor(x + 0.5), math.floor(z + 0.5))  # JS Math.round
+    if ground is not None:
+        y = max(y, ground + PLAYER_HEIGHT)
+    if last is not None:
+        lx, ly, lz = last
+        reach = max_speed * dt + slack
+        if (x - lx) ** 2 + (z - lz) ** 2 > reach * reach or y - ly > reach:
+            return None, "too_fast"
+        if _blocked(world, x, y, z) and not _blocked(world, lx, ly, lz):
+            return None, "blocked"
+    return (x, y, z), None
@@ -0,0 +1,272 @@
+# backend/game/management/commands/game_bots.py
+"""
+Headless bot players for load-testing GameConsumer.
+
+    # in-process (WebsocketCommunicator against config.asgi.application)
+    python manage.py game_bots --bots 16 --duration 20
+
+    # real sockets against a local daphne started with e.g. GAME_MAX_PLAYERS_PER_SESSION=64
+    python manage.py game_bots --url ws://127.0.0.1:8000 --server-pid $(pgrep -f daphne) \\
+        --bots 64 --per-session 64 --frames delta --codec msgpack
+
+Each bot joins /ws/game/<session>/ as a guest, walks a random path (y = 40, positions on a
+1/16-block grid) inside a square of --spread blocks, places blocks next to itself, removes
+ones it placed earlier, optionally sends place_blocks batches, and chats, each at its own
+rate. The report has per-type throughput and p50/p99 send -> receive latency as seen by the
+other bots, plus dropped frames: block edits, batches and chat are lossless, so every bot
+in the session whose area of interest covered an edit (everyone, for chat) when it was sent
+should get it (an edit to a cell another bot edits in the same tick is folded away by the
+server and counts as dropped; bots crossing chunk borders make the counts approximate).
+Moves are folded per tick (latest wins) and are not counted as drops.
+Sockets the server closed are listed by close code (4408 lagging, 4429 flooding, ...).
+"""
+import asyncio
+import json
+import math
+import random
+import time
+from collections import Counter
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from game.aoi import CHUNK_SIZE
+from game.moves import MoveDecoder
+from realtime.bench import LatencyStats, cpu_seconds, every, make_client
+from realtime.codec import CODECS
+
+GRID = 16  # positions are multiples of 1/GRID block: exact in every wire format
+QUERY = {"legacy": "", "tick": "?tick=1", "delta": "?moves=delta"}
+
+
+def _pos_key(player_id, x, z):
+    return player_id, round(x * GRID), round(z * GRID)
+
+
+class Command(BaseCommand):
+    help = "Spawn simulated game players and report throughput / latency / drops / CPU."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bots", type=int, default=8, help="Simulated players")
+        parser.add_argument("--per-session", type=int, default=8,
+                            help="Bots per game session (the server caps it at GAME_MAX_PLAYERS_PER_SESSION)")
+        parser.add_argument("--duration", type=float, default=10.0, help="Seconds of traffic")
+        parser.add_argument("--url", default="", help="ws://host:port of a running server; in-process if omitted")
+        parser.add_argument("--server-pid", type=int, default=None, help="Server PID to sample CPU from (--url mode)")
+        parser.add_argument("--frames", choices=sorted(QUERY), default="delta",
+                            help="legacy per-event frames, tick frames, or tick frames with delta moves")
+        parser.add_argument("--codec", choices=["json", "msgpack", "cbor"], default="json")
+        parser.add_argument("--spread", type=float, default=48.0, help="Bots walk inside +-spread blocks")
+        parser.add_argument("--speed", type=float, default=4.0, help="Walking speed, blocks per second")
+        parser.add_argument("--move-hz", type=float, default=10.0)
+        parser.add_argument("--place-hz", type=float, default=1.0)
+        parser.add_argument("--remove-hz", type=float, default=0.5)
+        parser.add_argument("--batch-hz", type=float, default=0.0, help="place_blocks batches per second")
+        parser.add_argument("--batch-size", type=int, default=4, help="Edge of the cubic batch, in blocks")
+        parser.add_argument("--chat-hz", type=float, default=0.2)
+        parser.add_argument("--seed", type=int, default=None)
+        parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+
+    # ---------- one bot ----------
+    async def _bot(self, opts, app, stats, stop, world, session, rng):
+        client = make_client(opts["url"], app, f"/ws/game/{session}/{QUERY[opts['frames']]}",
+                             codec=opts["codec_obj"])
+        if not await client.connect():
+            world["closed"][client.close_code] += 1
+            return
+        welcome = await client.recv()
+        if not welcome or welcome.get("type") != "welcome":
+            world["closed"][client.close_code] += 1
+            await client.close()
+            return
+        me = welcome["you"]["id"]
+        peers = world["sessions"].setdefault(session, {})
+        spread = opts["spread"]
+        x, z = (round(rng.uniform(-spread, spread) * GRID) / GRID for _ in range(2))
+        heading = rng.uniform(0, 2 * math.pi)
+        step = opts["speed"] / max(opts["move_hz"], 1e-6)
+        placed = []
+        state = {"n": 0}
+        peers[me] = None  # sees everything until its first move
+        decoder = MoveDecoder()
+
+        def receivers(bx, bz):
+            """Other bots of the session whose area of interest covers block column (bx, bz)."""
+            cx, cz, r = bx // CHUNK_SIZE, bz // CHUNK_SIZE, world["radius"]
+            return sum(1 for pid, c in peers.items()
+                       if pid != me and (c is None or (abs(c[0] - cx) <= r and abs(c[1] - cz) <= r)))
+
+        def got_edit(bx, by, bz, kind):
+            stats.mark_received("remove_block" if kind is None else "place_block", (bx, by, bz))
+
+        async def reader():
+            while True:
+                msg = await client.recv()
+                if msg is None:
+                    world["closed"][client.close_code] += 1
+                    peers.pop(me, None)
+                    return
+                t = (msg.get("type") or "").replace(".", "_")
+                if t == "tick":
+                    rows = msg.get("moves") or []
+                    if opts["frames"] == "delta":
+                        rows = decoder.decode(rows)
+                    for pid, mx, _, mz in rows:
+                        if pid != me:
+                            stats.mark_received("move", _pos_key(pid, mx, mz))
+                    for pid, kind, boxes in msg.get("batches") or []:
+                        if pid != me:
+                            stats.mark_received("place_blocks", tuple(boxes[0]))
+                    for pid, bx, by, bz, kind in msg.get("edits") or []:
+                        if pid != me:
+                            got_edit(bx, by, bz, kind)
+                elif t == "player_move" and msg["player"]["id"] != me:
+                    pos = msg.get("pos") or {}
+                    stats.mark_received("move", _pos_key(msg["player"]["id"], pos.get("x"), pos.get("z")))
+                elif t == "block_place" and msg["player"]["id"] != me:
+                    b = msg.get("block") or {}
+                    got_edit(b.get("x"), b.get("y"), b.get("z"), b.get("kind"))
+                elif t == "block_remove" and msg["player"]["id"] != me:
+                    got_edit(msg.get("x"), msg.get("y"), msg.get("z"), None)
+                elif t == "blocks_place" and msg["player"]["id"] != me:
+                    stats.mark_received("place_blocks", tuple(msg["boxes"][0]))
+                elif t in ("chat", "chat_message") and msg["player"]["id"] != me:
+                    stats.mark_received("chat", msg.get("message"))
+                elif t == "warning":
+                    world["warnings"][msg.get("code")] += 1
+
+        async def move():
+            nonlocal x, z, heading
+            heading += rng.gauss(0, 0.4)
+            nx, nz = x + step * math.cos(heading), z + step * math.sin(heading)
+            if abs(nx) > spread or abs(nz) > spread:
+                heading += math.pi  # turn back at the edge of the area
+                nx, nz = x, z
+            x, z = round(nx * GRID) / GRID, round(nz * GRID) / GRID
+            peers[me] = (math.floor(x) // CHUNK_SIZE, math.floor(z) // CHUNK_SIZE)
+            stats.mark_sent("move", _pos_key(me, x, z))
+            await client.send({"type": "move", "x": x, "y": 40.0, "z": z})
+
+        async def place():
+            cell = (math.floor(x) + rng.randint(-3, 3), 41 + rng.randint(0, 3), math.floor(z) + rng.randint(-3, 3))
+            placed.append(cell)
+            stats.mark_sent("place_block", cell)
+            stats.expect("place_block", cell, receivers(cell[0], cell[2]))
+            await client.send({"type": "place_block", "x": cell[0], "y": cell[1], "z": cell[2], "block": 3})
+
+        async def remove():
+            if not placed:
+                return
+            cell = placed.pop(rng.randrange(len(placed)))
+            stats.mark_sent("remove_block", cell)
+            stats.expect("remove_block", cell, receivers(cell[0], cell[2]))
+            await client.send({"type": "remove_block", "x": cell[0], "y": cell[1], "z": cell[2]})
+
+        async def batch():
+            n = max(1, opts["batch_size"]) - 1
+            x0, y0, z0 = math.floor(x) + 2, 44 + rng.randint(0, 8), math.floor(z) + 2
+            box = [x0, y0, z0, x0 + n, y0 + n, z0 + n]
+            stats.mark_sent("place_blocks", tuple(box))
+            stats.expect("place_blocks", tuple(box), receivers(x0, z0))
+            await client.send({"type": "place_blocks", "block": 4, "boxes": [box]})
+
+        async def chat():
+            state["n"] += 1
+            text = f"bot {me} {state['n']}"
+            stats.mark_sent("chat", text)
+            stats.expect("chat", text, sum(1 for pid in peers if pid != me))
+            await client.send({"type": "chat", "message": text})
+
+        read_task = asyncio.ensure_future(reader())
+        await asyncio.gather(
+            every(opts["move_hz"], stop, move),
+            every(opts["place_hz"], stop, place),
+            every(opts["remove_hz"], stop, remove),
+            every(opts["batch_hz"], stop, batch),
+            every(opts["chat_hz"], stop, chat),
+        )
+        await asyncio.sleep(1.0)  # let in-flight frames land
+        read_task.cancel()
+        peers.pop(me, None)
+        await client.close()
+        stats.add_wire(client)
+
+    async def _run(self, opts):
+        app = None
+        if not opts["url"]:
+            from config.asgi import application as app
+
+        rng = random.Random(opts["seed"])
+        stats, stop = LatencyStats(), asyncio.Event()
+        world = {
+            "sessions": {},
+            "radius": int(getattr(settings, "GAME_AOI_RADIUS", 4)),
+            "closed": Counter(),
+            "warnings": Counter(),
+        }
+        tag = uuid4().hex[:6]
+        per = max(1, opts["per_session"])
+        tasks = [
+            self._bot(opts, app, stats, stop, world, f"bots-{tag}-{i // per}", random.Random(rng.random()))
+            for i in range(opts["bots"])
+        ]
+
+        # Rates and CPU cover the traffic window only, not connect / teardown
+        runner = asyncio.gather(*tasks)
+        cpu0, wall0 = cpu_seconds(opts["server_pid"]), time.perf_counter()
+        await asyncio.sleep(opts["duration"])
+        stop.set()
+        wall = time.perf_counter() - wall0
+        cpu = cpu_seconds(opts["server_pid"]) - cpu0
+        await runner
+        return stats, world, wall, cpu
+
+    def handle(self, *args, **opts):
+        opts["codec_obj"] = None
+        if opts["codec"] != "json":
+            opts["codec_obj"] = CODECS.get(f"rt.{opts['codec']}.v1")
+            if opts["codec_obj"] is None:
+                self.stderr.write(f"{opts['codec']} is not installed")
+                return
+        stats, world, wall, cpu = asyncio.run(self._run(opts))
+
+        report = {
+            "mode": "socket" if opts["url"] else "in-process",
+            "frames": opts["frames"],
+            "codec": opts["codec"],
+            "bots": opts["bots"],
+            "sessions": len(world["sessions"]),
+            "duration_s": round(wall, 2),
+            "cpu_s": round(cpu, 2),
+            # in-process mode: CPU includes the bots themselves
+            "cpu_pct": round(100.0 * cpu / wall, 1) if wall else 0,
+            "types": stats.summary(wall),
+            "closed": {str(code): n for code, n in world["closed"].items()},
+            "warnings": dict(world["warnings"]),
+            "wire_kb_in": round(stats.bytes_in / 1024, 1),
+            "wire_kb_out": round(stats.bytes_out / 1024, 1),
+        }
+        if opts["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(
+            f"{report['mode']} ({report['frames']} frames, {report['codec']}): {report['bots']} bots in "
+            f"{report['sessions']} sessions, {report['duration_s']}s, worker CPU {report['cpu_s']}s "
+            f"({report['cpu_pct']}%), wire in {report['wire_kb_in']} KiB / out {report['wire_kb_out']} KiB"
+        )
+        self.stdout.write(
+            f"{'type':<14}{'sent':>8}{'recv':>9}{'recv/s':>10}{'expected':>10}{'dropped':>9}"
+            f"{'p50 ms':>10}{'p99 ms':>10}"
+        )
+        for kind, row in report["types"].items():
+            self.stdout.write(
+                f"{kind:<14}{row['sent']:>8}{row['received']:>9}{row['recv_per_sec']:>10}"
+                f"{str(row.get('expected', '-')):>10}{str(row.get('dropped', '-')):>9}"
+                f"{str(row['p50_ms']):>10}{str(row['p99_ms']):>10}"
+            )
+        if report["closed"]:
+            self.stdout.write("closed by the server: " + ", ".join(f"{c} x{n}" for c, n in report["closed"].items()))
+        if report["warnings"]:
+            self.stdout.write("warnings: " + ", ".join(f"{c} x{n}" for c, n in report["warnings"].items()))
@@ -0,0 +1,87 @@
+# backend/game/management/commands/worldgen_bench.py
+"""
+Benchmark of the server-side terrain generator (game/worldgen.py): the scalar reference
+against the NumPy pass, and a check that both produce the same chunks.
+
+    python manage.py worldgen_bench --chunks 64
+    python manage.py worldgen_bench --chunks 256 --scalar-chunks 8 --json
+"""
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from game import worldgen
+from game.aoi import CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = "Time chunk terrain generation (scalar reference vs NumPy) and check they agree."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunks", type=int, default=64, help="Chunks generated with NumPy")
+        parser.add_argument("--scalar-chunks", type=int, default=8,
+                            help="Chunks generated with the scalar reference (and compared)")
+        parser.add_argument("--spread", type=int, default=2000, help="Chunk coordinates drawn from +-spread")
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+
+    def handle(self, *args, **opts):
+        rng = random.Random(opts["seed"])
+        spread = opts["spread"]
+        coords = [(rng.randint(-spread, spread), rng.randint(-spread, spread)) for _ in range(max(opts["chunks"], 1))]
+        scalar_coords = coords[:max(opts["scalar_chunks"], 1)]
+
+        t0 = time.perf_counter()
+        reference = [worldgen.chunk_terrain_scalar(cx, cz) for cx, cz in scalar_coords]
+        scalar_s = time.perf_counter() - t0
+
+        report = {
+            "numpy": worldgen.np is not None,
+            "scalar_ms_per_chunk": round(1000 * scalar_s / len(scalar_coords), 3),
+        }
+        if worldgen.np is not None:
+            worldgen.chunk_terrain(0, 0)  # warm-up
+            t0 = time.perf_counter()
+            for cx, cz in coords:
+                worldgen.chunk_terrain(cx, cz)
+            numpy_s = time.perf_counter() - t0
+
+            # A 4x4-chunk area in one pass amortizes the per-call overhead further
+            side = 4 * CHUNK_SIZE
+            areas = max(1, len(coords) // 16)
+            t0 = time.perf_counter()
+            for cx, cz in coords[:areas]:
+                worldgen.terrain_grid(cx * CHUNK_SIZE, cz * CHUNK_SIZE, side, side)
+            area_s = time.perf_counter() - t0
+
+            mismatches = sum(
+                1 for (cx, cz), ref in zip(scalar_coords, reference) if worldgen.chunk_terrain(cx, cz) != ref
+            )
+            report.update({
+                "numpy_ms_per_chunk": round(1000 * numpy_s / len(coords), 3),
+                "numpy_area_ms_per_chunk": round(1000 * area_s / (areas * 16), 3),
+                "speedup": round((scalar_s / len(scalar_coords)) / (numpy_s / len(coords)), 1),
+                "compared_chunks": len(scalar_coords),
+                "mismatched_chunks": mismatches,
+            })
+
+        if opts["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        self.stdout.write(f"scalar reference: {report['scalar_ms_per_chunk']} ms / chunk")
+        if not report["numpy"]:
+            self.stdout.write("numpy is not installed: chunk_terrain() uses the scalar reference")
+            return
+        self.stdout.write(
+            f"numpy:            {report['numpy_ms_per_chunk']} ms / chunk "
+            f"({report['numpy_area_ms_per_chunk']} ms / chunk in 4x4-chunk passes), "
+            f"{report['speedup']}x"
+        )
+        self.stdout.write(
+            f"agreement:        {report['compared_chunks'] - report['mismatched_chunks']}"
+            f"/{report['compared_chunks']} chunks identical"
+        )
+        if report["mismatched_chunks"]:
+            self.stderr.write("scalar and numpy terrain differ")
@@ -0,0 +1,20 @@
+from django.db import models
+
+
+class GameChunk(models.Model):
+    """
+    Block edits of one 16x16 chunk column of a game session (see game/chunks.py).
+    Only used when GAME_WORLD_DIR is empty; otherwise chunks live in region files.
+    """
+    session_id = models.CharField(max_length=64)
+    cx = models.IntegerField()
+    cz = models.IntegerField()
+    # zlib-compressed ChunkEdits.to_bytes()
+    data = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("session_id", "cx", "cz")
+
+    def __str__(self):
+        return f"{self.session_id}:{self.cx},{self.cz}"
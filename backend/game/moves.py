@@ -0,0 +1,92 @@
+# /backend/game/moves.py
+"""
+Compact move rows for tick frames (opt-in: connect with ?moves=delta).
+
+Positions are fixed-point integers in 1/MOVE_SCALE block, split into a 16x16x16 cell
+(the chunk column and its 16-high section) and an offset inside it:
+
+    q = round(v * MOVE_SCALE);   cell = q >> CELL_BITS;   offset = q & CELL_MASK   (0..4095)
+
+Per socket, the first row for a player (and every row after the player changes cell or
+comes back into range) is a key row; the others are deltas against the last row sent:
+
+    [handle, cx, cy, cz, ox, oy, oz, player_id]     key row
+    [handle, dx, dy, dz]                            delta row (1/MOVE_SCALE block, |d| < 4096)
+
+Offsets and deltas fit an int16; cell coordinates do not: positions are only bounded by
+MAX_BLOCK_XZ / MAX_BLOCK_Y (game/chunks.py), so |cx|, |cz| reach MAX_BLOCK_XZ / 16 = 2^20
+and |cy| MAX_BLOCK_Y / 16. Every number fits an int32 (msgpack / CBOR size each integer
+to its value, so the common small ones stay short). Handles are small per-socket integers
+standing in for the player id after its first key row. Tick frames reach a socket losslessly and in order (see
+realtime/sendqueue.py), so the last row sent is the one the client has applied.
+"""
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+from .aoi import CHUNK_SIZE
+
+MOVE_SCALE = 256
+CELL_BITS = (CHUNK_SIZE * MOVE_SCALE).bit_length() - 1
+CELL_MASK = (1 << CELL_BITS) - 1
+
+Fixed = Tuple[int, int, int]
+
+
+def quantize(x, y, z) -> Optional[Fixed]:
+    try:
+        return tuple(math.floor(float(v) * MOVE_SCALE + 0.5) for v in (x, y, z))  # type: ignore[return-value]
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+class MoveEncoder:
+    def __init__(self):
+        self._handles: Dict[str, int] = {}
+        self._last: Dict[str, Fixed] = {}
+
+    def forget(self, player_id: str):
+        """Player out of range / gone: their next row is a key row again."""
+        self._last.pop(player_id, None)
+
+    def encode(self, rows: List[List[Any]]) -> List[List[Any]]:
+        """[player_id, x, y, z] rows (from InterestArea.apply_moves) -> key / delta rows."""
+        out = []
+        for player_id, x, y, z in rows:
+            q = quantize(x, y, z)
+            if q is None:
+                continue
+            handle = self._handles.get(player_id)
+            if handle is None:
+                handle = self._handles[player_id] = len(self._handles) + 1
+            last = self._last.get(player_id)
+            self._last[player_id] = q
+            if last is not None and all(a >> CELL_BITS == b >> CELL_BITS for a, b in zip(q, last)):
+                if q != last:
+                    out.append([handle, q[0] - last[0], q[1] - last[1], q[2] - last[2]])
+            else:
+                out.append([handle, *(v >> CELL_BITS for v in q), *(v & CELL_MASK for v in q), player_id])
+        return out
+
+
+class MoveDecoder:
+    """Client side of MoveEncoder (what the frontend does); used by the load tools."""
+
+    def __init__(self):
+        self._players: Dict[int, str] = {}
+        self._last: Dict[int, Fixed] = {}
+
+    def decode(self, rows: List[List[Any]]) -> List[List[Any]]:
+        out = []
+        for row in rows:
+            handle = row[0]
+            if len(row) == 8:
+                self._players[handle] = row[7]
+                q = tuple((c << CELL_BITS) | o for c, o in zip(row[1:4], row[4:7]))
+            else:
+                last = self._last.get(handle)
+                if last is None:
+                    continue
+                q = (last[0] + row[1], last[1] + row[2], last[2] + row[3])
+            self._last[handle] = q  # type: ignore[assignment]
+            out.append([self._players[handle], *(v / MOVE_SCALE for v in q)])
+        return out
@@ -0,0 +1,266 @@
+# /backend/game/regions.py
+"""
+On-disk region files for game worlds.
+
+A region file packs the block edits of 32x32 chunks:
+
+    GAME_WORLD_DIR/<session_id>/r.<rx>.<rz>.region
+
+    [0:4]      magic b"GRG1"
+    [4:8]      reserved
+    [8:8200]   offset table: 1024 x (offset u32, length u32), chunk (lx, lz) at lz * 32 + lx;
+               offset 0 = chunk not stored
+    [8200:]    payloads: zlib(ChunkEdits.to_bytes())
+
+Reads go through an mmap of the file, so loading a chunk is a table lookup and a slice.
+Writes append the new payload and then repoint the table entry, so a crash mid-write
+leaves the previous version readable. Superseded payloads are dead space; once a file
+is mostly dead it is compacted (live payloads copied to a new file, then renamed over).
+Compaction is not part of save(): the store only notes the file, and the session's
+background flush compacts it later (compact()).
+
+Several processes may open the same file (a session moved between workers, a stale
+worker still flushing): every read, write and compaction holds an flock on it and
+re-reads the offset table first, reopening the file if a compaction replaced it.
+"""
+import mmap
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+try:
+    import fcntl
+except Exception:  # not on Windows: only this process' lock then
+    fcntl = None
+
+REGION_SIZE = 32
+_MAGIC = b"GRG1"
+_ENTRY = struct.Struct("<II")
+_TABLE_OFFSET = 8
+HEADER_SIZE = _TABLE_OFFSET + REGION_SIZE * REGION_SIZE * _ENTRY.size
+
+# Compact a file once dead payload bytes exceed both of these
+COMPACT_MIN_DEAD_BYTES = 64 * 1024
+COMPACT_DEAD_RATIO = 0.5
+
+# Region files kept open (and mapped) per process
+MAX_OPEN_REGIONS = 64
+
+Chunk = Tuple[int, int]
+
+
+def region_of(cx: int, cz: int) -> Tuple[int, int]:
+    return cx // REGION_SIZE, cz // REGION_SIZE
+
+
+def _slot(cx: int, cz: int) -> int:
+    return (cz % REGION_SIZE) * REGION_SIZE + (cx % REGION_SIZE)
+
+
+class RegionFile:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(_MAGIC + b"\0" * (HEADER_SIZE - len(_MAGIC)))
+        self._open()
+
+    def _open(self):
+        self._file = open(self.path, "r+b")
+        if self._file.read(4) != _MAGIC:
+            self._file.close()
+            raise ValueError(f"{self.path}: not a region file")
+        self._map: Optional[mmap.mmap] = None
+        self._load_table()
+
+    def _load_table(self):
+        self._unmap()  # another process may have appended since
+        view = self._view()
+        self._table = [_ENTRY.unpack_from(view, _TABLE_OFFSET + i * _ENTRY.size)
+                       for i in range(REGION_SIZE * REGION_SIZE)]
+
+    def _replaced(self) -> bool:
+        try:
+            return os.stat(self.path).st_ino != os.fstat(self._file.fileno()).st_ino
+        except OSError:
+            return False
+
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        """This thread's lock, then the file lock, with the table as currently on disk."""
+        with self._lock:
+            while True:
+                if fcntl is not None:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                if not self._replaced():
+                    break
+                # Compacted by another process while we waited: lock the new file instead
+                self._unmap()
+                self._file.close()
+                self._open()
+            try:
+                self._load_table()
+                yield
+            finally:
+                if fcntl is not None and not self._file.closed:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def _view(self) -> mmap.mmap:
+        # (Re)mapped lazily: appends grow the file past the current mapping
+        if self._map is None:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def _unmap(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def close(self):
+        with self._lock:
+            self._unmap()
+            self._file.close()
+
+    def read(self, cx: int, cz: int) -> Optional[bytes]:
+        """Uncompressed payload of a chunk, or None."""
+        return self.read_many([(cx, cz)]).get((cx, cz))
+
+    def read_many(self, keys: Iterable[Chunk]) -> Dict[Chunk, bytes]:
+        """Uncompressed payloads of the stored chunks among keys."""
+        found = {}
+        with self._locked(exclusive=False):
+            view = self._view()
+            for key in keys:
+                offset, length = self._table[_slot(*key)]
+                if offset:
+                    found[key] = zlib.decompress(view[offset:offset + length])
+        return found
+
+    def write_many(self, payloads: Dict[Chunk, bytes]):
+        with self._locked(exclusive=True):
+            f = self._file
+            end = f.seek(0, os.SEEK_END)
+            blobs = []
+            for (cx, cz), raw in payloads.items():
+                blob = zlib.compress(raw)
+                blobs.append(blob)
+                self._table[_slot(cx, cz)] = (end, len(blob))
+                end += len(blob)
+            f.write(b"".join(blobs))
+            f.flush()
+            os.fsync(f.fileno())
+            # Payloads are durable: now point the table at them
+            for (cx, cz) in payloads:
+                slot = _slot(cx, cz)
+                os.pwrite(f.fileno(), _ENTRY.pack(*self._table[slot]), _TABLE_OFFSET + slot * _ENTRY.size)
+            f.flush()
+            self._unmap()
+
+    def _dead_bytes(self) -> Tuple[int, int]:
+        size = os.fstat(self._file.fileno()).st_size
+        return size - HEADER_SIZE - sum(length for _, length in self._table), size
+
+    def dead_bytes(self) -> int:
+        with self._locked(exclusive=False):
+            return self._dead_bytes()[0]
+
+    def _needs_compaction(self) -> bool:
+        dead, size = self._dead_bytes()
+        return dead >= COMPACT_MIN_DEAD_BYTES and dead >= COMPACT_DEAD_RATIO * (size - HEADER_SIZE)
+
+    def needs_compaction(self) -> bool:
+        with self._locked(exclusive=False):
+            return self._needs_compaction()
+
+    def compact(self):
+        """Rewrite the file with only the live payloads (unless another process just did)."""
+        with self._locked(exclusive=True):
+            if not self._needs_compaction():
+                return
+            view = self._view()
+            table = [(0, 0)] * (REGION_SIZE * REGION_SIZE)
+            tmp = self.path + ".compact"
+            with open(tmp, "wb") as out:
+                out.write(b"\0" * HEADER_SIZE)
+                pos = HEADER_SIZE
+                for slot, (offset, length) in enumerate(self._table):
+                    if offset:
+                        out.write(view[offset:offset + length])
+                        table[slot] = (pos, length)
+                        pos += length
+                out.seek(0)
+                out.write(_MAGIC + b"\0" * (_TABLE_OFFSET - len(_MAGIC)))
+                out.write(b"".join(_ENTRY.pack(*e) for e in table))
+                out.flush()
+                os.fsync(out.fileno())
+            # Still holding the old file's lock: processes waiting on it see the new file
+            os.replace(tmp, self.path)
+            self._unmap()
+            self._file.close()
+            self._open()
+
+
+class RegionStore:
+    """Chunk payload store over region files (same interface as the GameChunk table store)."""
+
+    def __init__(self, root: str, max_open: int = MAX_OPEN_REGIONS):
+        self.root = root
+        self.max_open = max_open
+        self._open: "OrderedDict[str, RegionFile]" = OrderedDict()
+        self._lock = threading.Lock()
+        # session_id -> region coordinates whose file is mostly dead space
+        self._due: Dict[str, Set[Tuple[int, int]]] = {}
+
+    def _region(self, session_id: str, rx: int, rz: int, create: bool) -> Optional[RegionFile]:
+        path = os.path.join(self.root, session_id, f"r.{rx}.{rz}.region")
+        with self._lock:
+            region = self._open.get(path)
+            if region is not None:
+                self._open.move_to_end(path)
+                return region
+            if not create and not os.path.exists(path):
+                return None
+            region = self._open[path] = RegionFile(path)
+            while len(self._open) > self.max_open:
+                _, evicted = self._open.popitem(last=False)
+                evicted.close()
+            return region
+
+    @staticmethod
+    def _by_region(keys: Iterable[Chunk]) -> Dict[Tuple[int, int], list]:
+        groups: Dict[Tuple[int, int], list] = {}
+        for key in keys:
+            groups.setdefault(region_of(*key), []).append(key)
+        return groups
+
+    def load(self, session_id: str, keys: Iterable[Chunk]) -> Dict[Chunk, bytes]:
+        found = {}
+        for (rx, rz), chunk_keys in self._by_region(keys).items():
+            region = self._region(session_id, rx, rz, create=False)
+            if region is None:
+                continue
+            found.update(region.read_many(chunk_keys))
+        return found
+
+    def save(self, session_id: str, payloads: Dict[Chunk, bytes]):
+        for (rx, rz), chunk_keys in self._by_region(payloads).items():
+            region = self._region(session_id, rx, rz, create=True)
+            region.write_many({k: payloads[k] for k in chunk_keys})
+            if region.needs_compaction():
+                with self._lock:
+                    self._due.setdefault(session_id, set()).add((rx, rz))
+
+    def compact(self, session_id: str):
+        """Compact the session's files that save() found mostly dead."""
+        with self._lock:
+            due = self._due.pop(session_id, set())
+        for rx, rz in due:
+            region = self._region(session_id, rx, rz, create=False)
+            if region is not None:
+                region.compact()
@@ -3,5 +3,5 @@ from .consumers import GameConsumer
 
 websocket_urlpatterns = [
     # ws://<host>/ws/game/<session_id>/?token=<JWT>
-    re_path(r"^ws/game/(?P<session_id>[-\w]+)/$", GameConsumer.as_asgi()),
+    re_path(r"^ws/game/(?P<session_id>[-\w]{1,64})/$", GameConsumer.as_asgi()),
 ]
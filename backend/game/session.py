@@ -0,0 +1,276 @@
+# /backend/game/session.py
+"""
+One actor per game session.
+
+Sockets do not broadcast moves and block edits themselves. They hand them to the session's
+actor (an asyncio task reading an inbound queue), which folds everything that arrived during
+a tick and sends at most one frame per tick to the session group:
+
+    {"type": "game.tick", "tick": N, "time": iso,
+     "moves": [[player_id, x, y, z], ...],          # only players whose position changed
+     "edits": [[player_id, x, y, z, kind], ...],    # last edit per cell; kind None = removed
+     "batches": [[player_id, kind, boxes], ...],    # place_blocks / remove_blocks, in order
+     "refused": {player_id: n}}                     # edits the world could not store (palette full)
+
+so the session costs GAME_TICK_HZ group sends per second however many players are moving.
+Clients apply a tick's batches before its edits: a single edit that arrived before a batch
+covering its cell is dropped from "edits", so that order gives the same result as arrival order.
+A single edit the world refused is left out of "edits" too; its sender gets a warning.
+
+Presence (the player cap, joins, leaves) is only touched from the event loop without an
+await in between, so none of it needs a lock. Each worker runs an actor for the sessions
+it has players in; the actor stops when its last local player leaves.
+
+A session must therefore be hosted by a single worker: run the game sockets in one process,
+or have the proxy route /ws/game/<session_id>/ by session id. Players of one session on two
+workers would get two actors, each with its own tick counter, player cap, edit fold and
+WorldEdits, and their ticks would interleave in the group.
+
+Block edits are also recorded in the session's WorldEdits (game/chunks.py): the actor loads
+the chunks an edit (or a whole batch) touches before applying it, so a batch lands in one
+tick, writes dirty chunks back every GAME_CHUNK_FLUSH_SECONDS in the background, and once
+more when it stops. Every GAME_SNAPSHOT_SECONDS it also snapshots the session (tick counter,
+player positions; see game/snapshots.py), which restore() reads back after a restart.
+"""
+import asyncio
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from channels.db import database_sync_to_async
+
+from realtime import metrics
+
+from .aoi import CHUNK_SIZE
+from .batches import box_chunks, iter_cells
+from .chunks import WorldEdits
+from .snapshots import read_snapshot, snapshot_dir, write_snapshot
+
+Cell = Tuple[Any, Any, Any]
+
+
+def _utcnow() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+# Snapshot files are read / written on the database thread, like the chunk store
+_read_snapshot = database_sync_to_async(read_snapshot)
+_write_snapshot = database_sync_to_async(write_snapshot)
+
+
+class GameSession:
+    def __init__(self, session_id: str, channel_layer, hz: float, flush_seconds: float = 5.0,
+                 snapshot_seconds: float = 30.0):
+        self.session_id = session_id
+        self.group_name = f"game_{session_id}"
+        self.channel_layer = channel_layer
+        self.interval = 1.0 / max(1.0, float(hz))
+        # player_id -> {"username": str, "last_seen": iso}
+        self.players: Dict[str, Dict[str, Any]] = {}
+        self.tick = 0
+        self._inbox: "asyncio.Queue[Tuple[str, str, Any]]" = asyncio.Queue()
+        self._positions: Dict[str, Tuple[Any, Any, Any]] = {}  # last position sent per player
+        self._task: Optional[asyncio.Task] = None
+        self.world = WorldEdits(session_id)
+        self.flush_interval = float(flush_seconds)
+        self.snapshot_interval = float(snapshot_seconds)
+        # Restored from the last snapshot: player_id -> {"username": str, "pos": [x, y, z] | None}
+        self.restored: Dict[str, Dict[str, Any]] = {}
+        self._restoring: Optional[asyncio.Future] = None
+
+    # ---------- Presence (synchronous: no awaits, no locks) ----------
+    def reserve(self, player_id: str, username: str, limit: int) -> bool:
+        if len(self.players) >= limit and player_id not in self.players:
+            return False
+        self.players[player_id] = {"username": username, "last_seen": _utcnow()}
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+        return True
+
+    def release(self, player_id: str):
+        self.players.pop(player_id, None)
+        self._positions.pop(player_id, None)
+
+    def touch(self, player_id: str):
+        p = self.players.get(player_id)
+        if p is not None:
+            p["last_seen"] = _utcnow()
+
+    # ---------- Snapshots ----------
+    async def restore(self):
+        """Read this session's snapshot once (concurrent callers wait for the same read)."""
+        if self._restoring is None:
+            self._restoring = asyncio.ensure_future(self._restore())
+        try:
+            await asyncio.shield(self._restoring)
+        except Exception:
+            pass  # unreadable snapshot: start afresh
+
+    async def _restore(self):
+        state = await _read_snapshot(self.session_id)
+        if state is None:
+            return
+        try:
+            self.tick += int(state.get("tick") or 0)
+        except (TypeError, ValueError):
+            pass
+        players = state.get("players")
+        for player_id, p in (players.items() if isinstance(players, dict) else ()):
+            pos = p.get("pos") if isinstance(p, dict) else None
+            if not (isinstance(pos, list) and len(pos) == 3):
+                pos = None
+            self.restored[player_id] = {"username": p.get("username") if isinstance(p, dict) else None, "pos": pos}
+
+    def snapshot_state(self) -> Dict[str, Any]:
+        players = {}
+        for player_id, p in self.players.items():
+            pos = self._positions.get(player_id)
+            try:
+                pos = [float(v) for v in pos] if pos is not None else None
+            except (TypeError, ValueError):
+                pos = None
+            players[player_id] = {"username": p.get("username"), "pos": pos}
+        return {"tick": self.tick, "saved_at": _utcnow(), "players": players}
+
+    async def snapshot(self):
+        """Write the dirty chunks (after any flush already running), then the session file."""
+        state = self.snapshot_state()
+        await self.world.close()
+        await _write_snapshot(self.session_id, state)
+
+    async def _snapshot_quietly(self):
+        try:
+            await self.snapshot()
+        except Exception:
+            pass
+
+    # ---------- Inputs ----------
+    def move(self, player_id: str, x, y, z):
+        self._inbox.put_nowait(("move", player_id, (x, y, z)))
+
+    def edit(self, player_id: str, x: int, y: int, z: int, kind=None):
+        """Block edit (integer cell): kind is the placed block, None for a removal."""
+        self._inbox.put_nowait(("edit", player_id, (x, y, z, kind)))
+
+    def edit_batch(self, player_id: str, kind, boxes: List[List[int]]):
+        """Validated batch (game/batches.py): every cell of boxes set to kind (None = removed)."""
+        self._inbox.put_nowait(("batch", player_id, (kind, boxes)))
+
+    # ---------- Actor ----------
+    def _drain(self) -> List[Tuple[str, str, Any]]:
+        inputs = []
+        while True:
+            try:
+                inputs.append(self._inbox.get_nowait())
+            except asyncio.QueueEmpty:
+                return inputs
+
+    def _fold(self, inputs: List[Tuple[str, str, Any]]):
+        moves: Dict[str, Tuple[Any, Any, Any]] = {}
+        edits: "OrderedDict[Cell, Tuple[str, Any]]" = OrderedDict()
+        batches: List[List[Any]] = []
+        refused: Dict[str, int] = {}  # player_id -> edits the world could not store
+        world = self.world
+
+        def store(player_id, x, y, z, block) -> bool:
+            if (x // CHUNK_SIZE, z // CHUNK_SIZE) not in world.chunks:
+                return True
+            try:
+                if world.apply(x, y, z, block):
+                    return True
+            except Exception:
+                pass
+            refused[player_id] = refused.get(player_id, 0) + 1
+            return False
+
+        for kind, player_id, data in inputs:
+            if player_id not in self.players:
+                continue  # left before the tick
+            if kind == "move":
+                moves[player_id] = data
+            elif kind == "batch":
+                block, boxes = data
+                batches.append([player_id, block, boxes])
+                for x, y, z in iter_cells(boxes):
+                    if edits:
+                        edits.pop((x, y, z), None)  # superseded by the batch
+                    store(player_id, x, y, z, block)
+            else:
+                x, y, z, block = data
+                edits.pop((x, y, z), None)
+                if store(player_id, x, y, z, block):
+                    edits[(x, y, z)] = (player_id, block)
+
+        changed: List[List[Any]] = []
+        for player_id, pos in moves.items():
+            if self._positions.get(player_id) != pos:
+                self._positions[player_id] = pos
+                changed.append([player_id, *pos])
+        edit_rows = [[pid, x, y, z, block] for (x, y, z), (pid, block) in edits.items()]
+        return changed, edit_rows, batches, refused
+
+    async def _run(self):
+        while True:
+            await self._ticks()
+            await self.world.close()
+            if not self.players:
+                return  # nobody rejoined while the last chunks were written
+
+    async def _ticks(self):
+        loop = asyncio.get_running_loop()
+        next_at = loop.time()
+        next_flush = next_at + self.flush_interval
+        next_snapshot = next_at + self.snapshot_interval
+        while self.players:
+            next_at += self.interval
+            delay = next_at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                next_at = loop.time()  # overran: skip the missed ticks instead of bursting
+            self.tick += 1
+            inputs = self._drain()
+            touched = set()
+            for k, _, d in inputs:
+                if k == "edit":
+                    touched.add((d[0] // CHUNK_SIZE, d[2] // CHUNK_SIZE))
+                elif k == "batch":
+                    touched |= box_chunks(d[1])
+            if touched:
+                try:
+                    await self.world.ensure(touched)
+                except Exception:
+                    pass  # not stored this time (still broadcast); the chunk loads on a later edit
+            try:
+                moves, edits, batches, refused = self._fold(inputs)
+            except Exception:
+                moves, edits, batches, refused = [], [], [], {}  # this tick's inputs are lost, not the loop
+            if loop.time() >= next_flush:
+                next_flush = loop.time() + self.flush_interval
+                self.world.flush_in_background()
+            if snapshot_dir() and loop.time() >= next_snapshot:
+                next_snapshot = loop.time() + self.snapshot_interval
+                asyncio.ensure_future(self._snapshot_quietly())
+            if not (moves or edits or batches or refused):
+                continue
+            metrics.FANOUT.observe(len(self.players), consumer="game")
+            try:
+                with metrics.GROUP_SEND_SECONDS.time(consumer="game"):
+                    await self.channel_layer.group_send(self.group_name, {
+                        "type": "game.tick",
+                        "tick": self.tick,
+                        "time": _utcnow(),
+                        "moves": moves,
+                        "edits": edits,
+                        "batches": batches,
+                        "refused": refused,
+                    })
+            except Exception:
+                # A full layer drops this tick; let these players' next moves go out again
+                for player_id, *_ in moves:
+                    self._positions.pop(player_id, None)
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
@@ -0,0 +1,111 @@
+# /backend/game/snapshots.py
+"""
+Session snapshots, so a restarted worker picks a game up where it left off.
+
+A snapshot is the session's dirty chunks, written to the chunk store like any flush, plus
+
+    GAME_SNAPSHOT_DIR/<session_id>/session.json
+    {"version": 1, "session": id, "tick": N, "saved_at": iso,
+     "players": {player_id: {"username": str, "pos": [x, y, z] | null}}}
+
+written to a temporary file and renamed over the previous one. The session actor takes one
+every GAME_SNAPSHOT_SECONDS; install_shutdown_hook() adds one on SIGTERM / SIGINT, and only
+then passes the signal on to the server's own handler. A session re-created in another
+process reads its snapshot once, when its first player connects: the tick counter carries
+on and returning players get their last position back. Guests get a new id per socket, so
+only signed-in players are matched.
+
+With GAME_SNAPSHOT_DIR empty only the chunk flushes happen.
+"""
+import asyncio
+import json
+import os
+import signal
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from django.conf import settings
+
+VERSION = 1
+
+
+def snapshot_dir() -> str:
+    return str(getattr(settings, "GAME_SNAPSHOT_DIR", "") or "")
+
+
+def _path(session_id: str) -> Optional[str]:
+    root = snapshot_dir()
+    return os.path.join(root, session_id, "session.json") if root else None
+
+
+def write_snapshot(session_id: str, state: Dict[str, Any]):
+    path = _path(session_id)
+    if path is None:
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": VERSION, "session": session_id, **state}, f, separators=(",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def read_snapshot(session_id: str) -> Optional[Dict[str, Any]]:
+    path = _path(session_id)
+    if path is None:
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(state, dict) or state.get("version") != VERSION:
+        return None
+    return state
+
+
+# ---------- Shutdown ----------
+# Longest a shutdown waits for the snapshots before letting the server stop anyway
+SHUTDOWN_TIMEOUT = 10.0
+
+_INSTALLED = False
+
+
+def install_shutdown_hook(sessions: Callable[[], Iterable[Any]]):
+    """
+    Snapshot every session of this worker on SIGTERM / SIGINT, then hand the signal to the
+    handler that was there before (the server's). Call from the event loop thread.
+    """
+    global _INSTALLED
+    if _INSTALLED or threading.current_thread() is not threading.main_thread():
+        return
+    loop = asyncio.get_running_loop()
+
+    async def snapshot_then_chain(signum, frame, previous):
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(s.snapshot() for s in list(sessions())), return_exceptions=True),
+                SHUTDOWN_TIMEOUT,
+            )
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            if callable(previous):
+                previous(signum, frame)
+            elif previous != signal.SIG_IGN:
+                os.kill(os.getpid(), signum)  # default action (the handler was reset below)
+
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        previous = signal.getsignal(signum)
+
+        def handler(signum, frame, previous=previous):
+            # A second signal goes straight to the previous handler
+            signal.signal(signum, previous if previous is not None else signal.SIG_DFL)
+            loop.call_soon_threadsafe(lambda: asyncio.ensure_future(snapshot_then_chain(signum, frame, previous)))
+
+        try:
+            signal.signal(signum, handler)
+        except (ValueError, OSError):
+            return
+    _INSTALLED = True
@@ -0,0 +1,46 @@
+from django.test import SimpleTestCase
+
+from game.aoi import InterestArea, chunk_of
+
+
+class InterestAreaTests(SimpleTestCase):
+    def test_chunk_of(self):
+        self.assertEqual(chunk_of(15.9, -0.1), (0, -1))
+        self.assertIsNone(chunk_of("x", 0))
+
+    def test_sees_everything_until_own_move(self):
+        aoi = InterestArea("me", radius=1)
+        rows, entered, left = aoi.apply_moves([["far", 1000, 0, 1000]])
+        self.assertEqual((rows, entered, left), ([["far", 1000, 0, 1000]], ["far"], []))
+        self.assertTrue(aoi.sees_block(10 ** 6, 0))
+
+    def test_enter_and_leave(self):
+        aoi = InterestArea("me", radius=1)
+        aoi.apply_moves([["me", 0, 0, 0], ["near", 20, 0, 0], ["far", 100, 0, 0]])
+        self.assertEqual(aoi.visible, {"near"})
+        self.assertFalse(aoi.sees_block(100, 0))
+
+        rows, entered, left = aoi.apply_moves([["near", 21, 0, 0]])
+        self.assertEqual((rows, entered, left), ([["near", 21, 0, 0]], [], []))
+
+        # I walk east: "far" comes into range with its last position, "near" stays
+        rows, entered, left = aoi.apply_moves([["me", 90, 0, 0]])
+        self.assertEqual((rows, entered, left), ([["far", 100, 0, 0]], ["far"], ["near"]))
+
+        rows, entered, left = aoi.apply_moves([["far", 300, 0, 0]])
+        self.assertEqual((rows, entered, left), ([], [], ["far"]))
+
+    def test_sees_box(self):
+        aoi = InterestArea("me", radius=1)
+        aoi.apply_moves([["me", 0, 0, 0]])
+        self.assertTrue(aoi.sees_box(-100, -100, 100, 100))
+        self.assertTrue(aoi.sees_box(31, 0, 40, 0))
+        self.assertFalse(aoi.sees_box(32, 0, 40, 0))
+
+    def test_forget(self):
+        aoi = InterestArea("me", radius=1)
+        aoi.apply_moves([["me", 0, 0, 0], ["p", 1, 0, 1]])
+        aoi.forget("p")
+        self.assertEqual((aoi.visible, aoi.positions), (set(), {}))
+        _, entered, _ = aoi.apply_moves([["p", 1, 0, 1]])
+        self.assertEqual(entered, ["p"])
@@ -0,0 +1,34 @@
+from django.test import SimpleTestCase
+
+from game.batches import BatchError, box_chunks, iter_cells, parse_batch
+
+
+class ParseBatchTests(SimpleTestCase):
+    def _error(self, content, place=True, max_cells=100):
+        with self.assertRaises(BatchError) as ctx:
+            parse_batch(content, place, max_cells)
+        return ctx.exception.code
+
+    def test_boxes_and_runs(self):
+        kind, boxes = parse_batch({"block": 3, "boxes": [[2, 0, 2, 0, 1, 0]], "runs": [[5, 1, 5, 3.0]]}, True, 100)
+        self.assertEqual(kind, 3)
+        self.assertEqual(boxes, [[0, 0, 0, 2, 1, 2], [5, 1, 5, 7, 1, 5]])
+        self.assertEqual(len(list(iter_cells(boxes))), 21)
+
+    def test_non_finite_coordinates(self):
+        for bad in (float("nan"), float("inf"), float("-inf")):
+            with self.subTest(value=bad):
+                self.assertEqual(self._error({"block": 1, "boxes": [[0, 0, 0, bad, 0, 0]]}), "bad_batch")
+                self.assertEqual(self._error({"runs": [[0, 0, 0, bad]]}, place=False), "bad_batch")
+
+    def test_rejects(self):
+        self.assertEqual(self._error({"block": 1, "boxes": [[0, 0, 0, 0.5, 0, 0]]}), "bad_batch")
+        self.assertEqual(self._error({"block": 1, "boxes": [[0, 0, 0, True, 0, 0]]}), "bad_batch")
+        self.assertEqual(self._error({"block": 99, "boxes": [[0, 0, 0, 0, 0, 0]]}), "bad_batch")
+        self.assertEqual(self._error({"runs": [[0, 0, 0, 0]]}, place=False), "bad_batch")
+        self.assertEqual(self._error({"boxes": []}, place=False), "bad_batch")
+        self.assertEqual(self._error({"boxes": [[0, 0, 0, 1 << 30, 0, 0]]}, place=False), "batch_too_large")
+        self.assertEqual(self._error({"boxes": [[1 << 25, 0, 0, 1 << 25, 0, 0]]}, place=False), "bad_batch")
+
+    def test_box_chunks(self):
+        self.assertEqual(box_chunks([[-1, 0, 0, 16, 0, 0]]), {(-1, 0), (0, 0), (1, 0)})
@@ -0,0 +1,58 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from game.chunks import BLOCK_KINDS, MAX_PALETTE, ChunkEdits, Section, WorldEdits, valid_kind
+
+
+class ValidKindTests(SimpleTestCase):
+    def test_only_block_ids(self):
+        for kind in (None, 1, 9):
+            self.assertTrue(valid_kind(kind), kind)
+        for kind in (0, 10, 65535, True, "stone", "x" * 32, 1.0, [1]):
+            self.assertFalse(valid_kind(kind), kind)
+
+
+class SectionTests(SimpleTestCase):
+    def test_round_trips(self):
+        chunk = ChunkEdits(0, 0)
+        for i in range(40):
+            chunk.set(i % 16, 1, i // 16, 1 + i % 9)
+        chunk.set(0, 17, 0, None)
+        again = ChunkEdits.from_bytes(0, 0, chunk.to_bytes())
+        self.assertEqual(again.edits(), chunk.edits())
+        self.assertEqual(len(again), 41)
+        self.assertEqual(len(chunk.sections[0].data), 2048)
+
+    def test_every_kind_fits_4_bits(self):
+        section = Section()
+        for i, kind in enumerate([*sorted(BLOCK_KINDS), None]):
+            self.assertTrue(section.set(i, kind))
+        self.assertLessEqual(len(section.palette), MAX_PALETTE)
+
+    def test_full_palette_refuses_without_raising(self):
+        # Only reachable with kinds valid_kind() rejects; the world must still not raise
+        world = WorldEdits("s")
+        for i in range(MAX_PALETTE - 1):
+            self.assertTrue(world.apply(i, 0, 0, 100 + i))
+        self.assertFalse(world.apply(0, 1, 0, 999))
+        self.assertEqual(len(world.chunks[(0, 0)]), MAX_PALETTE - 1)
+        self.assertIn((0, 0), world.take_dirty())
+
+    def test_rejects_other_widths(self):
+        chunk = ChunkEdits(0, 0)
+        chunk.set(0, 0, 0, 1)
+        raw = bytearray(chunk.to_bytes())
+        raw[10] = 8  # section header: <iBH after the magic and count
+        with self.assertRaises(ValueError):
+            ChunkEdits.from_bytes(0, 0, bytes(raw))
+
+    def test_unserializable_chunk_stays_dirty(self):
+        world = WorldEdits("s")
+        world.apply(0, 0, 0, 1)
+        world.apply(32, 0, 0, 2)
+        with mock.patch.object(Section, "palette_bytes", side_effect=ValueError("palette")):
+            payloads = world.take_dirty()
+        self.assertEqual(payloads, {})
+        self.assertTrue(all(c.dirty for c in world.chunks.values()))
+        self.assertEqual(set(world.take_dirty()), {(0, 0), (2, 0)})
@@ -0,0 +1,48 @@
+import asyncio
+from unittest import mock
+
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.test import SimpleTestCase
+from django.urls import re_path
+
+from game import heightmap
+from game.chunks import WorldEdits
+from game.consumers import GameConsumer
+from game.heightmap import HeightCache, check_move, spawn_pos
+
+
+class HeightCacheTests(SimpleTestCase):
+    async def test_background_failure_is_retried(self):
+        cache = HeightCache()
+        with mock.patch.object(heightmap, "_chunk_heights", side_effect=RuntimeError("worldgen")):
+            task = cache.ensure_in_background([(0, 0)])
+            await asyncio.wait([task])
+        self.assertIsInstance(task.exception(), RuntimeError)
+        self.assertEqual((cache._tasks, cache._pending, len(cache)), (set(), set(), 0))
+        await cache.ensure_in_background([(0, 0)])
+        self.assertIsNotNone(cache.ground(0, 0))
+
+
+class CheckMoveTests(SimpleTestCase):
+    def test_first_move_is_checked_from_spawn(self):
+        world = WorldEdits("s")
+        x, y, z = spawn_pos()
+        self.assertEqual(check_move(world, spawn_pos(), (x + 1, y, z), 0.1, 12, 3)[1], None)
+        self.assertEqual(check_move(world, spawn_pos(), (x + 500, y, z), 0.1, 12, 3), (None, "too_fast"))
+
+
+class FirstMoveTests(SimpleTestCase):
+    async def test_teleport_on_first_move_is_corrected(self):
+        app = URLRouter([re_path(r"^ws/game/(?P<session_id>[-\w]{1,64})/$", GameConsumer.as_asgi())])
+        ws = WebsocketCommunicator(app, "/ws/game/first-move-test/")
+        connected, _ = await ws.connect()
+        self.assertTrue(connected)
+        self.assertEqual((await ws.receive_json_from())["type"], "welcome")
+        x, y, z = spawn_pos()
+        await ws.send_json_to({"type": "move", "x": x + 500, "y": y, "z": z})
+        frame = await ws.receive_json_from()
+        while frame["type"] != "correction":
+            frame = await ws.receive_json_from()
+        self.assertEqual((frame["reason"], frame["pos"]), ("too_fast", {"x": x, "y": y, "z": z}))
+        await ws.disconnect()
@@ -0,0 +1,51 @@
+from django.test import SimpleTestCase
+
+from game.aoi import CHUNK_SIZE
+from game.chunks import MAX_BLOCK_XZ, MAX_BLOCK_Y
+from game.moves import MOVE_SCALE, MoveDecoder, MoveEncoder, quantize
+
+
+class MoveEncoderTests(SimpleTestCase):
+    def test_key_then_delta_rows(self):
+        enc = MoveEncoder()
+        first = enc.encode([["p1", 1.5, 64.0, -2.25]])
+        self.assertEqual(len(first[0]), 8)
+        self.assertEqual(first[0][-1], "p1")
+        delta = enc.encode([["p1", 1.75, 64.0, -2.25]])
+        self.assertEqual(delta, [[first[0][0], MOVE_SCALE // 4, 0, 0]])
+        self.assertEqual(enc.encode([["p1", 1.75, 64.0, -2.25]]), [])  # unchanged: nothing
+
+    def test_cell_change_and_forget_send_key_rows(self):
+        enc = MoveEncoder()
+        enc.encode([["p1", 15.5, 0, 0]])
+        self.assertEqual(len(enc.encode([["p1", 16.5, 0, 0]])[0]), 8)
+        enc.forget("p1")
+        self.assertEqual(len(enc.encode([["p1", 16.75, 0, 0]])[0]), 8)
+
+    def test_offsets_and_deltas_fit_int16(self):
+        enc = MoveEncoder()
+        rows = enc.encode([["p", -1e5, 4000.0, 1e5]]) + enc.encode([["p", -1e5 + 15.9, 4000.0, 1e5]])
+        self.assertEqual([len(r) for r in rows], [8, 4])
+        for v in rows[0][4:7] + rows[1][1:4]:
+            self.assertLess(abs(v), 1 << 15)
+
+    def test_coordinate_limits(self):
+        enc, dec = MoveEncoder(), MoveDecoder()
+        edge = MAX_BLOCK_XZ - 1 / MOVE_SCALE  # largest position _move_xyz lets through
+        tick = [["a", edge, MAX_BLOCK_Y - 1, -edge], ["b", -edge, -(MAX_BLOCK_Y - 1), edge]]
+        rows = enc.encode(tick)
+        for row in rows:
+            self.assertLessEqual(max(abs(c) for c in row[1:4]), MAX_BLOCK_XZ // CHUNK_SIZE)
+            self.assertLess(max(abs(c) for c in row[1:4]), 1 << 31)
+        self.assertEqual(dec.decode(rows), [[pid, x, y, z] for pid, x, y, z in tick])
+
+    def test_decoder_round_trip(self):
+        enc, dec = MoveEncoder(), MoveDecoder()
+        path = [["a", 0.5, 60, 0.5], ["b", -20, 61, 3]], [["a", 0.75, 60, 0.25]], [["a", 30, 60, 0.25], ["b", -19.5, 61, 3]]
+        for tick in path:
+            decoded = dec.decode(enc.encode(tick))
+            expected = [[pid, *(q / MOVE_SCALE for q in quantize(x, y, z))] for pid, x, y, z in tick]
+            self.assertEqual(decoded, expected)
+
+    def test_bad_positions_skipped(self):
+        self.assertEqual(MoveEncoder().encode([["p", float("nan"), 0, 0], ["q", "x", 0, 0]]), [])
@@ -0,0 +1,86 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from game import regions
+from game.regions import HEADER_SIZE, RegionFile, RegionStore, region_of
+
+
+class RegionFileTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "s", "r.0.0.region")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_write_read_and_reopen(self):
+        region = RegionFile(self.path)
+        self.assertIsNone(region.read(0, 0))
+        region.write_many({(0, 0): b"a" * 100, (31, 31): b"b"})
+        region.write_many({(0, 0): b"c"})
+        self.assertEqual(region.read(0, 0), b"c")
+        region.close()
+        again = RegionFile(self.path)
+        self.assertEqual((again.read(0, 0), again.read(31, 31), again.read(5, 5)), (b"c", b"b", None))
+        again.close()
+
+    def test_compaction_keeps_live_payloads(self):
+        region = RegionFile(self.path)
+        for i in range(5):
+            region.write_many({(1, 2): os.urandom(200), (3, 4): bytes([i]) * 10})
+        self.assertGreater(region.dead_bytes(), 0)
+        live = region.read(1, 2)
+        region.compact()  # not dead enough yet
+        self.assertGreater(region.dead_bytes(), 0)
+        with mock.patch.object(regions, "COMPACT_MIN_DEAD_BYTES", 1):
+            region.compact()
+        self.assertEqual(region.dead_bytes(), 0)
+        self.assertEqual((region.read(1, 2), region.read(3, 4)), (live, bytes([4]) * 10))
+        self.assertLess(os.path.getsize(self.path), HEADER_SIZE + 2 * 300)
+        region.close()
+
+    def test_two_openers_keep_each_others_chunks(self):
+        # e.g. two workers flushing the same session
+        a, b = RegionFile(self.path), RegionFile(self.path)
+        a.write_many({(0, 0): os.urandom(200)})
+        a.write_many({(0, 0): b"a"})
+        b.write_many({(1, 0): b"b"})
+        with mock.patch.object(regions, "COMPACT_MIN_DEAD_BYTES", 1):
+            a.compact()
+        self.assertEqual(b.read_many([(0, 0), (1, 0)]), {(0, 0): b"a", (1, 0): b"b"})
+        b.write_many({(2, 0): b"c"})  # lands in the compacted file, not the old one
+        self.assertEqual(a.read(2, 0), b"c")
+        self.assertEqual(a.dead_bytes(), 0)
+        a.close()
+        b.close()
+
+
+class RegionStoreTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_chunks_across_regions(self):
+        store = RegionStore(self.tmp.name, max_open=1)
+        payloads = {(0, 0): b"x", (-1, 0): b"y", (40, -33): b"z"}
+        store.save("s1", payloads)
+        self.assertEqual(len({region_of(*k) for k in payloads}), 3)
+        self.assertEqual(store.load("s1", [*payloads, (7, 7)]), payloads)
+        self.assertEqual(store.load("other", list(payloads)), {})
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, "other")))
+
+    def test_compacts_mostly_dead_files_after_save(self):
+        store = RegionStore(self.tmp.name)
+        with mock.patch.object(regions, "COMPACT_MIN_DEAD_BYTES", 1):
+            store.save("s1", {(0, 0): b"old" * 50})
+            store.save("s1", {(0, 0): b"new"})
+            region = store._region("s1", 0, 0, create=False)
+            self.assertGreater(region.dead_bytes(), 0)  # not on the save path
+            store.compact("s1")
+        self.assertEqual(region.dead_bytes(), 0)
+        self.assertEqual(store.load("s1", [(0, 0)]), {(0, 0): b"new"})
@@ -0,0 +1,38 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from game import chunks
+from game.session import GameSession
+
+
+class FoldTests(SimpleTestCase):
+    def _session(self):
+        sess = GameSession("s", channel_layer=None, hz=20)
+        sess.players = {"a": {}, "b": {}}
+        return sess
+
+    def test_refused_edit_is_not_broadcast(self):
+        sess = self._session()
+        sess.world.apply(0, 0, 0, 1)  # chunk loaded
+        with mock.patch.object(chunks, "MAX_PALETTE", 3):
+            moves, edits, batches, refused = sess._fold([
+                ("edit", "a", (1, 0, 0, 2)),
+                ("edit", "b", (2, 0, 0, 3)),
+            ])
+        self.assertEqual(edits, [["a", 1, 0, 0, 2]])
+        self.assertEqual(refused, {"b": 1})
+
+    def test_failing_apply_does_not_raise(self):
+        sess = self._session()
+        sess.world.apply(0, 0, 0, 1)
+        with mock.patch.object(sess.world, "apply", side_effect=ValueError):
+            _, edits, _, refused = sess._fold([("edit", "a", (1, 0, 0, 2))])
+        self.assertEqual(edits, [])
+        self.assertEqual(refused, {"a": 1})
+
+    def test_unloaded_chunk_edits_still_broadcast(self):
+        sess = self._session()
+        _, edits, _, refused = sess._fold([("edit", "a", (100, 0, 0, 2)), ("move", "b", (1, 2, 3))])
+        self.assertEqual(edits, [["a", 100, 0, 0, 2]])
+        self.assertEqual(refused, {})
@@ -0,0 +1,374 @@
+# /backend/game/worldgen.py
+"""
+Server-side port of the client terrain generator
+(frontend/app/games/minecraft/lib/worldgen.ts): heights, biomes and the visible surface
+block per column. Trees are not ported (they never change a column's ground height).
+
+Two implementations of the same pipeline:
+  - a scalar reference, line for line with worldgen.ts (hash2 reproduces the JS number
+    semantics: float64 products truncated through ToInt32 / ToUint32)
+  - a NumPy version that computes a whole chunk (or any x/z rectangle) in one pass
+
+Both agree bit for bit (manage.py worldgen_bench checks it). chunk_terrain() uses NumPy
+when it is installed and falls back to the scalar reference otherwise.
+
+Grids are indexed [z - z0][x - x0].
+"""
+import math
+from typing import NamedTuple, Tuple
+
+try:
+    import numpy as np
+except Exception:  # pragma: no cover
+    np = None  # type: ignore
+
+from .aoi import CHUNK_SIZE
+
+# ---------- Constants (keep in sync with worldgen.ts) ----------
+WORLD_BASE = 12
+WORLD_VAR = 36
+SEA_LEVEL_TARGET = 20
+SEA_BAND = max(0.0, min(1.0, (SEA_LEVEL_TARGET - WORLD_BASE) / WORLD_VAR))
+MOUNTAIN_BAND = 0.70
+WATER_BLOCK_ID = 7
+SEA_LEVEL_Y = math.floor(WORLD_BASE + SEA_BAND * WORLD_VAR)
+
+RIVER_SCALE = 420
+RIVER_WIDTH = 0.035
+RIVER_MAX_DEPTH = 5
+
+RELIEF_GAIN = 0.85
+WARP_STRENGTH = 38
+WARP_SCALE = 160
+MICRO_BUMP_AMPL = 1.5
+MICRO_BUMP_SCALE = 14
+PEAK_LIFT = 0.38
+
+CLIMATE_CONTRAST = 0.18
+PLAINS_WEIGHT = 0.55
+
+# Biome codes used in the grids
+BIOMES = ("desert", "plains", "taiga", "mountains", "alpine", "beach")
+DESERT, PLAINS, TAIGA, MOUNTAINS, ALPINE, BEACH = range(len(BIOMES))
+
+# Block ids (lib/constants.ts)
+GRASS, DIRT, STONE, SAND, LAVA, SNOW = 1, 2, 3, 4, 8, 9
+
+_U32 = 0xFFFFFFFF
+_2_32 = 4294967296.0
+
+
+class ChunkTerrain(NamedTuple):
+    height: list      # terrain height (heightAt)
+    surface_y: list   # visible surface after rivers / sea (surfaceAt().y)
+    surface_id: list  # block id of that surface (water = WATER_BLOCK_ID)
+    biome: list       # BIOMES index
+
+
+# ---------- Scalar reference ----------
+def _clamp(v, a=0.0, b=1.0):
+    return max(a, min(b, v))
+
+
+def _lerp(a, b, t):
+    return a + (b - a) * t
+
+
+def _fade(t):
+    return t * t * t * (t * (t * 6 - 15) + 10)
+
+
+def _smooth_step01(e0, e1, x):
+    t = _clamp((x - e0) / max(1e-6, e1 - e0), 0, 1)
+    return t * t * (3 - 2 * t)
+
+
+def _bits(d: float) -> int:
+    """ToUint32 of an integral float64 (the JS bit operators' view of a number)."""
+    return int(d) & _U32
+
+
+def hash2(x, y, seed=1337) -> float:
+    h = _bits(float(x) * 374761393.0) ^ _bits(float(y) * 668265263.0) ^ (seed & _U32)
+    g = h ^ (h >> 13)
+    if g >= 0x80000000:
+        g -= 0x100000000  # `^` yields an int32, which is then multiplied as a double
+    return _bits(float(g) * 1274126177.0) / _2_32
+
+
+def value_noise2(x, z, scale, seed=0) -> float:
+    xs, zs = x / scale, z / scale
+    xi, zi = math.floor(xs), math.floor(zs)
+    xf, zf = xs - xi, zs - zi
+    u, v = _fade(xf), _fade(zf)
+    a = hash2(xi, zi, seed)
+    b = hash2(xi + 1, zi, seed)
+    c = hash2(xi, zi + 1, seed)
+    d = hash2(xi + 1, zi + 1, seed)
+    return _lerp(_lerp(a, b, u), _lerp(c, d, u), v)
+
+
+def fbm2(x, z, octaves=4, lacunarity=2.0, gain=0.5, scale=128, seed=0) -> float:
+    amp, freq_scale, total, norm = 1.0, scale, 0.0, 0.0
+    for i in range(octaves):
+        total += amp * value_noise2(x, z, freq_scale, seed + i * 1013)
+        norm += amp
+        amp *= gain
+        freq_scale /= lacunarity
+    return total / norm
+
+
+def height_at(x, z) -> int:
+    wx = (value_noise2(x + 9102, z - 771, WARP_SCALE, 321) - 0.5) * 2 * WARP_STRENGTH
+    wz = (value_noise2(x - 551, z + 4431, WARP_SCALE, 654) - 0.5) * 2 * WARP_STRENGTH
+    xw, zw = x + wx, z + wz
+
+    continent = fbm2(x, z, scale=220, octaves=4, gain=0.55, seed=42)
+    ridges0 = 1 - abs(2 * value_noise2(xw, zw, 80, 7) - 1)
+    detail = fbm2(xw + 1000, zw - 1000, scale=26, octaves=4, gain=0.55, seed=99)
+    elev01 = _clamp(0.52 * continent + 0.30 * ridges0 + 0.18 * detail, 0, 1)
+
+    massif_mask = fbm2(x - 12000, z + 12000, scale=520, octaves=3, gain=0.6, seed=313)
+    massif = _smooth_step01(0.55, 0.9, massif_mask)
+    high_band = _smooth_step01(0.60, 0.98, elev01)
+    ridge_raw = 1.0 - abs(2.0 * value_noise2(xw - 4000, zw + 4000, 72, 707) - 1.0)
+    ridge = math.pow(ridge_raw, 1.6)
+    elev01 = _clamp(elev01 + PEAK_LIFT * massif * high_band * ridge, 0, 1)
+
+    relief_mask = fbm2(x + 5000, z - 5000, scale=280, octaves=3, gain=0.6, seed=222)
+    relief = 1 + RELIEF_GAIN * (relief_mask * 2 - 1)
+    elev01 = _clamp(0.5 + (elev01 - 0.5) * relief, 0, 1)
+
+    micro = (fbm2(x - 1234, z + 4321, scale=MICRO_BUMP_SCALE, octaves=2, gain=0.55, seed=777) - 0.5) * 2 * MICRO_BUMP_AMPL
+    return math.floor(WORLD_BASE + elev01 * WORLD_VAR + micro)
+
+
+def temperature_at(x, z, elev_y) -> float:
+    t = fbm2(x + 3000, z - 5000, scale=650, octaves=4, gain=0.55, seed=1337)
+    altitude_penalty = _clamp((elev_y - 18) / 28, 0, 1) * 0.55
+    return _clamp(t - altitude_penalty)
+
+
+def moisture_at(x, z, elev01) -> float:
+    m = fbm2(x - 8000, z + 2500, scale=520, octaves=4, gain=0.6, seed=2025)
+    sea_boost = _clamp((SEA_BAND - elev01) * 1.6, 0, 0.25)
+    return _clamp(m + sea_boost)
+
+
+def _contrast01(v, k=CLIMATE_CONTRAST):
+    return _clamp(0.5 + (v - 0.5) * (1 + 2 * k))
+
+
+def biome_at(x, z) -> int:
+    y = height_at(x, z)
+    elev01 = _clamp((y - WORLD_BASE) / WORLD_VAR, 0, 1)
+    if elev01 > 0.90:
+        return ALPINE if temperature_at(x, z, y) < 0.50 else MOUNTAINS
+    if elev01 < SEA_BAND + 0.02:
+        return BEACH
+    t = _contrast01(temperature_at(x, z, y))
+    m = _contrast01(moisture_at(x, z, elev01))
+    desert = t * (1 - m)
+    taiga = (1 - t) * (0.4 + 0.6 * m)
+    plains = max(0, (1 - 2 * abs(t - 0.5)) * (1 - 2 * abs(m - 0.5))) * PLAINS_WEIGHT
+    if desert >= taiga and desert >= plains:
+        return DESERT
+    if taiga >= desert and taiga >= plains:
+        return TAIGA
+    return PLAINS
+
+
+def _river_strength_at(x, z) -> float:
+    d = abs(0.5 - value_noise2(x + 1111, z - 1111, RIVER_SCALE, 12345)) * 2
+    return _clamp((RIVER_WIDTH - d) / RIVER_WIDTH, 0, 1)
+
+
+def _top_block_at_height(x, z, y) -> int:
+    s = max(abs(height_at(x + 1, z) - y), abs(height_at(x - 1, z) - y),
+            abs(height_at(x, z + 1) - y), abs(height_at(x, z - 1) - y))
+    if s >= 2:
+        return STONE
+    elev01 = _clamp((y - WORLD_BASE) / WORLD_VAR, 0, 1)
+    b = biome_at(x, z)
+    if b == BEACH:
+        return SAND
+    if b == DESERT:
+        hot_dry = temperature_at(x, z, y) > 0.8 and moisture_at(x, z, elev01) < 0.25
+        if hot_dry and hash2(math.floor(x), math.floor(z), 555) < 0.015:
+            return LAVA
+        return SAND
+    if b in (TAIGA, ALPINE):
+        return SNOW
+    if b == MOUNTAINS:
+        return STONE
+    return STONE if elev01 > MOUNTAIN_BAND else GRASS
+
+
+def surface_at(x, z) -> Tuple[int, int]:
+    y_terrain = height_at(x, z)
+    elev01 = _clamp((y_terrain - WORLD_BASE) / WORLD_VAR, 0, 1)
+    r = _river_strength_at(x, z)
+    y_carved = y_terrain
+    if r > 0 and SEA_BAND + 0.02 < elev01 < 0.95:
+        y_carved = y_terrain - math.floor(r * RIVER_MAX_DEPTH)
+    if y_carved < SEA_LEVEL_Y:
+        return SEA_LEVEL_Y, WATER_BLOCK_ID
+    if r > 0 and elev01 > SEA_BAND + 0.02:
+        return min(y_terrain, y_carved + 1), WATER_BLOCK_ID
+    return y_carved, _top_block_at_height(x, z, y_carved)
+
+
+def chunk_terrain_scalar(cx: int, cz: int) -> ChunkTerrain:
+    x0, z0 = cx * CHUNK_SIZE, cz * CHUNK_SIZE
+    rows = range(CHUNK_SIZE)
+    height = [[height_at(x0 + i, z0 + j) for i in rows] for j in rows]
+    surface = [[surface_at(x0 + i, z0 + j) for i in rows] for j in rows]
+    return ChunkTerrain(
+        height=height,
+        surface_y=[[s[0] for s in row] for row in surface],
+        surface_id=[[s[1] for s in row] for row in surface],
+        biome=[[biome_at(x0 + i, z0 + j) for i in rows] for j in rows],
+    )
+
+
+# ---------- NumPy ----------
+def _bits_v(d):
+    return d.astype(np.int64) & _U32
+
+
+def _hash2_v(x, y, seed):
+    h = _bits_v(x * 374761393.0) ^ _bits_v(y * 668265263.0) ^ (seed & _U32)
+    g = h ^ (h >> 13)
+    g = np.where(g >= 0x80000000, g - 0x100000000, g)
+    return _bits_v(g.astype(np.float64) * 1274126177.0) / _2_32
+
+
+def _clamp_v(v, a=0.0, b=1.0):
+    return np.maximum(a, np.minimum(b, v))
+
+
+def _smooth_step01_v(e0, e1, x):
+    t = _clamp_v((x - e0) / max(1e-6, e1 - e0), 0, 1)
+    return t * t * (3 - 2 * t)
+
+
+def _value_noise2_v(x, z, scale, seed=0):
+    xs, zs = x / scale, z / scale
+    xi, zi = np.floor(xs), np.floor(zs)
+    u, v = _fade(xs - xi), _fade(zs - zi)
+    a = _hash2_v(xi, zi, seed)
+    b = _hash2_v(xi + 1, zi, seed)
+    c = _hash2_v(xi, zi + 1, seed)
+    d = _hash2_v(xi + 1, zi + 1, seed)
+    return _lerp(_lerp(a, b, u), _lerp(c, d, u), v)
+
+
+def _fbm2_v(x, z, octaves=4, lacunarity=2.0, gain=0.5, scale=128, seed=0):
+    amp, freq_scale, total, norm = 1.0, scale, 0.0, 0.0
+    for i in range(octaves):
+        total = total + amp * _value_noise2_v(x, z, freq_scale, seed + i * 1013)
+        norm += amp
+        amp *= gain
+        freq_scale /= lacunarity
+    return total / norm
+
+
+def _height_v(x, z):
+    wx = (_value_noise2_v(x + 9102, z - 771, WARP_SCALE, 321) - 0.5) * 2 * WARP_STRENGTH
+    wz = (_value_noise2_v(x - 551, z + 4431, WARP_SCALE, 654) - 0.5) * 2 * WARP_STRENGTH
+    xw, zw = x + wx, z + wz
+
+    continent = _fbm2_v(x, z, scale=220, octaves=4, gain=0.55, seed=42)
+    ridges0 = 1 - np.abs(2 * _value_noise2_v(xw, zw, 80, 7) - 1)
+    detail = _fbm2_v(xw + 1000, zw - 1000, scale=26, octaves=4, gain=0.55, seed=99)
+    elev01 = _clamp_v(0.52 * continent + 0.30 * ridges0 + 0.18 * detail, 0, 1)
+
+    massif = _smooth_step01_v(0.55, 0.9, _fbm2_v(x - 12000, z + 12000, scale=520, octaves=3, gain=0.6, seed=313))
+    high_band = _smooth_step01_v(0.60, 0.98, elev01)
+    ridge_raw = 1.0 - np.abs(2.0 * _value_noise2_v(xw - 4000, zw + 4000, 72, 707) - 1.0)
+    ridge = np.power(ridge_raw, 1.6)
+    elev01 = _clamp_v(elev01 + PEAK_LIFT * massif * high_band * ridge, 0, 1)
+
+    relief_mask = _fbm2_v(x + 5000, z - 5000, scale=280, octaves=3, gain=0.6, seed=222)
+    relief = 1 + RELIEF_GAIN * (relief_mask * 2 - 1)
+    elev01 = _clamp_v(0.5 + (elev01 - 0.5) * relief, 0, 1)
+
+    micro = (_fbm2_v(x - 1234, z + 4321, scale=MICRO_BUMP_SCALE, octaves=2, gain=0.55, seed=777) - 0.5) * 2 * MICRO_BUMP_AMPL
+    return np.floor(WORLD_BASE + elev01 * WORLD_VAR + micro)
+
+
+def _temperature_v(x, z, elev_y):
+    t = _fbm2_v(x + 3000, z - 5000, scale=650, octaves=4, gain=0.55, seed=1337)
+    return _clamp_v(t - _clamp_v((elev_y - 18) / 28, 0, 1) * 0.55)
+
+
+def _moisture_v(x, z, elev01):
+    m = _fbm2_v(x - 8000, z + 2500, scale=520, octaves=4, gain=0.6, seed=2025)
+    return _clamp_v(m + _clamp_v((SEA_BAND - elev01) * 1.6, 0, 0.25))
+
+
+def _contrast01_v(v):
+    return _clamp_v(0.5 + (v - 0.5) * (1 + 2 * CLIMATE_CONTRAST))
+
+
+def _biome_v(x, z, y):
+    elev01 = _clamp_v((y - WORLD_BASE) / WORLD_VAR, 0, 1)
+    t0 = _temperature_v(x, z, y)
+    t, m = _contrast01_v(t0), _contrast01_v(_moisture_v(x, z, elev01))
+    desert = t * (1 - m)
+    taiga = (1 - t) * (0.4 + 0.6 * m)
+    plains = np.maximum(0, (1 - 2 * np.abs(t - 0.5)) * (1 - 2 * np.abs(m - 0.5))) * PLAINS_WEIGHT
+    return np.select(
+        [elev01 > 0.90, elev01 < SEA_BAND + 0.02, (desert >= taiga) & (desert >= plains), (taiga >= desert) & (taiga >= plains)],
+        [np.where(t0 < 0.50, ALPINE, MOUNTAINS), BEACH, DESERT, TAIGA],
+        PLAINS,
+    )
+
+
+def terrain_grid(x0: int, z0: int, width: int, depth: int):
+    """
+    NumPy pass over the columns x0..x0+width-1, z0..z0+depth-1.
+    Returns (height, surface_y, surface_id, biome) int arrays of shape (depth, width).
+    """
+    if np is None:
+        raise RuntimeError("numpy is not installed")
+    # One ring of neighbours for the slope probe
+    zz, xx = np.mgrid[z0 - 1:z0 + depth + 1, x0 - 1:x0 + width + 1].astype(np.float64)
+    h_pad = _height_v(xx, zz)
+    x, z, h = xx[1:-1, 1:-1], zz[1:-1, 1:-1], h_pad[1:-1, 1:-1]
+
+    biome = _biome_v(x, z, h)
+    elev01 = _clamp_v((h - WORLD_BASE) / WORLD_VAR, 0, 1)
+    r = _clamp_v((RIVER_WIDTH - np.abs(0.5 - _value_noise2_v(x + 1111, z - 1111, RIVER_SCALE, 12345)) * 2) / RIVER_WIDTH, 0, 1)
+    inland = elev01 > SEA_BAND + 0.02
+    carved = np.where((r > 0) & inland & (elev01 < 0.95), h - np.floor(r * RIVER_MAX_DEPTH), h)
+
+    # Land top block (topBlockForAtHeight at the carved height)
+    slope = np.maximum.reduce([
+        np.abs(h_pad[1:-1, 2:] - carved), np.abs(h_pad[1:-1, :-2] - carved),
+        np.abs(h_pad[2:, 1:-1] - carved), np.abs(h_pad[:-2, 1:-1] - carved),
+    ])
+    c_elev01 = _clamp_v((carved - WORLD_BASE) / WORLD_VAR, 0, 1)
+    hot_dry = (_temperature_v(x, z, carved) > 0.8) & (_moisture_v(x, z, c_elev01) < 0.25)
+    vent = hot_dry & (_hash2_v(np.floor(x), np.floor(z), 555) < 0.015)
+    by_biome = np.select(
+        [biome == BEACH, biome == DESERT, (biome == TAIGA) | (biome == ALPINE), biome == MOUNTAINS, c_elev01 > MOUNTAIN_BAND],
+        [SAND, np.where(vent, LAVA, SAND), SNOW, STONE, STONE],
+        GRASS,
+    )
+    land_id = np.where(slope >= 2, STONE, by_biome)
+
+    ocean = carved < SEA_LEVEL_Y
+    river = ~ocean & (r > 0) & inland
+    surface_y = np.select([ocean, river], [SEA_LEVEL_Y, np.minimum(h, carved + 1)], carved)
+    surface_id = np.where(ocean | river, WATER_BLOCK_ID, land_id)
+    return h.astype(np.int32), surface_y.astype(np.int32), surface_id.astype(np.int8), biome.astype(np.int8)
+
+
+def chunk_terrain(cx: int, cz: int) -> ChunkTerrain:
+    """Terrain of one chunk as nested lists (NumPy when available)."""
+    if np is None:
+        return chunk_terrain_scalar(cx, cz)
+    h, sy, sid, biome = terrain_grid(cx * CHUNK_SIZE, cz * CHUNK_SIZE, CHUNK_SIZE, CHUNK_SIZE)
+    return ChunkTerrain(h.tolist(), sy.tolist(), sid.tolist(), biome.tolist())
+
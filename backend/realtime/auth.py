@@ -1,7 +1,7 @@
 from urllib.parse import parse_qs
 from typing import Optional
 from django.contrib.auth.models import AnonymousUser
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from users.authentication import CachedJWTAuthentication
 from channels.db import database_sync_to_async
 
 def _get_token_from_headers(scope) -> Optional[str]:
@@ -32,7 +32,7 @@ def _get_token_from_query(scope) -> Optional[str]:
 
 @database_sync_to_async
 def authenticate_scope(scope):
-    auth = JWTAuthentication()
+    auth = CachedJWTAuthentication()
     raw = _get_token_from_headers(scope) or _get_token_from_query(scope) or _get_token_from_cookies(scope)
     if not raw:
         return AnonymousUser()
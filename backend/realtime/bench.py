@@ -0,0 +1,244 @@
+# /backend/realtime/bench.py
+"""
+Shared plumbing for the websocket load tools (manage.py realtime_bench, game_bots).
+
+Two client transports with the same tiny API (connect / send / recv / close):
+  - LocalClient:  drives the ASGI app in-process through channels' WebsocketCommunicator
+  - SocketClient: a real websocket (autobahn, already installed with daphne) against a server
+Both speak JSON, or one of the binary codecs from realtime/codec.py, and count wire bytes.
+
+Every simulated client lives in this one process, so end-to-end latency is measured by
+remembering when each uniquely-keyed frame was sent and looking the key up on receipt.
+"""
+import asyncio
+import json
+import os
+import random
+import resource
+import time
+from collections import defaultdict
+from typing import Any, Dict, Hashable, List, Optional
+from urllib.parse import urlparse
+
+from .codec import Codec, pack_client, unpack_server
+
+
+class _Wire:
+    """Frame <-> wire payload for one client, plus byte counters."""
+
+    def __init__(self, codec: Optional[Codec]):
+        self.codec = codec
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def subprotocols(self, extra: Optional[List[str]]) -> List[str]:
+        return ([self.codec.subprotocol] if self.codec else []) + list(extra or [])
+
+    def dump(self, frame: Dict[str, Any]):
+        if self.codec is None:
+            data = json.dumps(frame)
+            self.bytes_out += len(data.encode("utf-8"))
+            return data
+        data = self.codec.dumps(pack_client(frame))
+        self.bytes_out += len(data)
+        return data
+
+    def load(self, text: Optional[str] = None, data: Optional[bytes] = None) -> Dict[str, Any]:
+        if data is not None and self.codec is not None:
+            self.bytes_in += len(data)
+            return unpack_server(self.codec.loads(data))
+        self.bytes_in += len(text.encode("utf-8"))
+        return json.loads(text)
+
+
+class LocalClient:
+    def __init__(self, application, path: str, subprotocols: Optional[List[str]] = None, codec=None):
+        from channels.testing import WebsocketCommunicator
+        self.wire = _Wire(codec)
+        self._comm = WebsocketCommunicator(application, path, subprotocols=self.wire.subprotocols(subprotocols))
+        self.close_code: Optional[int] = None
+
+    async def connect(self) -> bool:
+        ok, _ = await self._comm.connect(timeout=10)
+        return ok
+
+    async def send(self, frame: Dict[str, Any]):
+        data = self.wire.dump(frame)
+        if isinstance(data, bytes):
+            await self._comm.send_to(bytes_data=data)
+        else:
+            await self._comm.send_to(text_data=data)
+
+    async def recv(self) -> Optional[Dict[str, Any]]:
+        """Next frame from the server, or None once the socket is closed."""
+        while True:
+            msg = await self._comm.receive_output(timeout=None)
+            if msg["type"] == "websocket.close":
+                self.close_code = msg.get("code")
+                return None
+            if msg["type"] == "websocket.send":
+                return self.wire.load(msg.get("text"), msg.get("bytes"))
+
+    async def close(self):
+        try:
+            await self._comm.disconnect()
+        except Exception:
+            pass
+
+
+class SocketClient:
+    def __init__(self, url: str, subprotocols: Optional[List[str]] = None, codec=None):
+        self.url = url
+        self.wire = _Wire(codec)
+        self.subprotocols = self.wire.subprotocols(subprotocols)
+        self.close_code: Optional[int] = None
+        self._inbox: asyncio.Queue = asyncio.Queue()
+        self._proto = None
+
+    async def connect(self) -> bool:
+        from autobahn.asyncio.websocket import WebSocketClientFactory, WebSocketClientProtocol
+
+        loop = asyncio.get_running_loop()
+        opened = loop.create_future()
+        client = self
+
+        class _Protocol(WebSocketClientProtocol):
+            def onOpen(self):
+                if not opened.done():
+                    opened.set_result(True)
+
+            def onMessage(self, payload, isBinary):
+                if isBinary:
+                    client._inbox.put_nowait(client.wire.load(data=payload))
+                else:
+                    client._inbox.put_nowait(client.wire.load(payload.decode("utf-8")))
+
+            def onClose(self, wasClean, code, reason):
+                client.close_code = code
+                client._inbox.put_nowait(None)
+                if not opened.done():
+                    opened.set_result(False)
+
+        factory = WebSocketClientFactory(self.url, protocols=self.subprotocols)
+        factory.protocol = _Protocol
+        u = urlparse(self.url)
+        secure = u.scheme == "wss"
+        _, self._proto = await loop.create_connection(
+            factory, u.hostname, u.port or (443 if secure else 80), ssl=True if secure else None
+        )
+        return await asyncio.wait_for(opened, 10)
+
+    async def send(self, frame: Dict[str, Any]):
+        if self._proto is not None:
+            data = self.wire.dump(frame)
+            if isinstance(data, bytes):
+                self._proto.sendMessage(data, isBinary=True)
+            else:
+                self._proto.sendMessage(data.encode("utf-8"))
+
+    async def recv(self) -> Optional[Dict[str, Any]]:
+        return await self._inbox.get()
+
+    async def close(self):
+        if self._proto is not None:
+            self._proto.sendClose()
+
+
+def make_client(base_url: Optional[str], application, path: str, subprotocols=None, codec=None):
+    """Real socket when base_url (ws://host:port) is given, otherwise in-process."""
+    if base_url:
+        return SocketClient(base_url.rstrip("/") + path, subprotocols, codec)
+    return LocalClient(application, path, subprotocols, codec)
+
+
+class LatencyStats:
+    """
+    Per-kind sent/received counts and send->receive latency samples (seconds). For lossless
+    kinds, expect() records how many clients should receive a frame; whatever has not arrived
+    by summary() is reported as dropped.
+    """
+
+    def __init__(self):
+        self._sent_at: Dict[Hashable, float] = {}
+        self._awaited: Dict[Hashable, int] = {}
+        self.sent: Dict[str, int] = defaultdict(int)
+        self.received: Dict[str, int] = defaultdict(int)
+        self.expected: Dict[str, int] = defaultdict(int)
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def mark_sent(self, kind: str, key: Hashable):
+        self._sent_at[(kind, key)] = time.perf_counter()
+        self.sent[kind] += 1
+
+    def expect(self, kind: str, key: Hashable, receivers: int):
+        if receivers > 0:
+            self._awaited[(kind, key)] = self._awaited.get((kind, key), 0) + receivers
+            self.expected[kind] += receivers
+
+    def mark_received(self, kind: str, key: Hashable):
+        self.received[kind] += 1
+        if self._awaited.get((kind, key)):
+            self._awaited[(kind, key)] -= 1
+        sent_at = self._sent_at.get((kind, key))
+        if sent_at is not None:
+            self.samples[kind].append(time.perf_counter() - sent_at)
+
+    def add_wire(self, client):
+        self.bytes_in += client.wire.bytes_in
+        self.bytes_out += client.wire.bytes_out
+
+    @staticmethod
+    def percentile(values: List[float], pct: float) -> Optional[float]:
+        if not values:
+            return None
+        ordered = sorted(values)
+        idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+        return ordered[idx]
+
+    def dropped(self) -> Dict[str, int]:
+        out: Dict[str, int] = defaultdict(int)
+        for (kind, _), left in self._awaited.items():
+            out[kind] += left
+        return out
+
+    def summary(self, duration: float) -> Dict[str, Dict[str, Any]]:
+        out = {}
+        dropped = self.dropped()
+        for kind in sorted(set(self.sent) | set(self.received)):
+            lat = self.samples.get(kind, [])
+            p50, p99 = self.percentile(lat, 50), self.percentile(lat, 99)
+            out[kind] = {
+                "sent": self.sent.get(kind, 0),
+                "received": self.received.get(kind, 0),
+                "recv_per_sec": round(self.received.get(kind, 0) / duration, 1) if duration else 0,
+                "p50_ms": round(p50 * 1000, 2) if p50 is not None else None,
+                "p99_ms": round(p99 * 1000, 2) if p99 is not None else None,
+            }
+            if kind in self.expected:
+                out[kind]["expected"] = self.expected[kind]
+                out[kind]["dropped"] = dropped.get(kind, 0)
+        return out
+
+
+def cpu_seconds(pid: Optional[int] = None) -> float:
+    """User+system CPU of this process, or of `pid` (Linux /proc) for an external server."""
+    if pid is None:
+        ru = resource.getrusage(resource.RUSAGE_SELF)
+        return ru.ru_utime + ru.ru_stime
+    with open(f"/proc/{pid}/stat") as fh:
+        fields = fh.read().rsplit(")", 1)[1].split()
+    # utime / stime are fields 14 / 15 of the full line (11 / 12 after the comm field)
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+async def every(hz: float, stop: asyncio.Event, fn):
+    """Call `fn()` about `hz` times per second (jittered) until `stop` is set."""
+    if hz <= 0:
+        return
+    period = 1.0 / hz
+    await asyncio.sleep(random.random() * period)
+    while not stop.is_set():
+        await fn()
+        await asyncio.sleep(period * random.uniform(0.8, 1.2))
@@ -0,0 +1,268 @@
+# /backend/realtime/codec.py
+"""
+Opt-in binary wire format for the project and game sockets.
+
+A client asks for it in the websocket handshake, e.g.
+    new WebSocket(url, ["rt.msgpack.v1"])        // or "rt.cbor.v1"
+and the server answers with the first subprotocol it supports. Without one (the default)
+frames stay JSON text. With one, both directions use binary frames:
+
+  - Hot frames are positional arrays led by an integer type tag; positions are
+    fixed-point integers and timestamps are epoch milliseconds.
+  - Every other frame is the same object the JSON protocol sends, encoded as a map.
+
+Server -> client
+    [1,  peer_id, x, y]                         cursor         (x, y in 1/CANVAS_SCALE px)
+    [2,  seq, epoch, path, x, y, by]            node_move      (x, y in 1/CANVAS_SCALE px; seq and
+                                                               epoch as in the JSON frame, or null)
+    [10, player_id, x, y, z, t_ms]              player.move    (x, y, z in 1/WORLD_SCALE blocks)
+    [11, player_id, x, y, z, kind, t_ms]        block.place
+    [12, player_id, x, y, z, t_ms]              block.remove
+
+Client -> server
+    [1,  x, y]                                  cursor
+    [2,  path, x, y]                            node_move
+    [10, x, y, z]                               move
+    [11, x, y, z, kind]                         place_block
+    [12, x, y, z]                               remove_block
+
+Frames on the multiplexed socket (realtime/mux.py) carry a "room" key and are always
+sent as maps in both directions.
+
+msgpack and cbor2 are optional; a subprotocol is only offered if its library imports.
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+try:
+    import msgpack
+except Exception:  # pragma: no cover
+    msgpack = None  # type: ignore
+
+try:
+    import cbor2
+except Exception:  # pragma: no cover
+    cbor2 = None  # type: ignore
+
+# Fixed-point scales: project canvas in 1/10 px, game world in 1/100 block
+CANVAS_SCALE = 10
+WORLD_SCALE = 100
+
+T_CURSOR, T_NODE_MOVE = 1, 2
+T_PLAYER_MOVE, T_BLOCK_PLACE, T_BLOCK_REMOVE = 10, 11, 12
+
+
+def _q(value, scale: int):
+    if value is None:
+        return None
+    try:
+        return int(round(float(value) * scale))
+    except (TypeError, ValueError):
+        return None
+
+
+def _dq(value, scale: int):
+    return None if value is None else value / scale
+
+
+def _ms(iso) -> Optional[int]:
+    try:
+        return int(datetime.fromisoformat(iso).timestamp() * 1000)
+    except (TypeError, ValueError):
+        return None
+
+
+def _iso(ms) -> Optional[str]:
+    if ms is None:
+        return None
+    return datetime.fromtimestamp(ms / 1000.0, timezone.utc).isoformat()
+
+
+# ---------- Server -> client ----------
+def pack_server(frame: Dict[str, Any]):
+    if "room" in frame:
+        return frame
+    t = frame.get("type")
+    if t == "cursor":
+        d = frame.get("data") or {}
+        return [T_CURSOR, frame.get("peer_id"), _q(d.get("x"), CANVAS_SCALE), _q(d.get("y"), CANVAS_SCALE)]
+    if t == "node_move":
+        d = frame.get("data") or {}
+        return [T_NODE_MOVE, frame.get("seq"), frame.get("epoch"), d.get("path"),
+                _q(d.get("x"), CANVAS_SCALE), _q(d.get("y"), CANVAS_SCALE), d.get("by")]
+    if t in ("player.move", "player_move"):
+        p = frame.get("pos") or {}
+        return [T_PLAYER_MOVE, frame["player"]["id"], _q(p.get("x"), WORLD_SCALE),
+                _q(p.get("y"), WORLD_SCALE), _q(p.get("z"), WORLD_SCALE), _ms(frame.get("time"))]
+    if t in ("block.place", "block_place"):
+        b = frame.get("block") or {}
+        return [T_BLOCK_PLACE, frame["player"]["id"], b.get("x"), b.get("y"), b.get("z"),
+                b.get("kind"), _ms(frame.get("time"))]
+    if t in ("block.remove", "block_remove"):
+        return [T_BLOCK_REMOVE, frame["player"]["id"], frame.get("x"), frame.get("y"), frame.get("z"),
+                _ms(frame.get("time"))]
+    return frame
+
+
+def unpack_server(obj) -> Dict[str, Any]:
+    """Inverse of pack_server (what a client decodes); used by the load tools."""
+    if not isinstance(obj, list):
+        return obj
+    tag = obj[0]
+    if tag == T_CURSOR:
+        _, peer, x, y = obj
+        return {"type": "cursor", "peer_id": peer,
+                "data": {"x": _dq(x, CANVAS_SCALE), "y": _dq(y, CANVAS_SCALE)}}
+    if tag == T_NODE_MOVE:
+        _, seq, epoch, path, x, y, by = obj
+        frame = {"type": "node_move",
+                 "data": {"path": path, "x": _dq(x, CANVAS_SCALE), "y": _dq(y, CANVAS_SCALE), "by": by}}
+        if seq is not None:
+            frame["seq"], frame["epoch"] = seq, epoch
+        return frame
+    if tag == T_PLAYER_MOVE:
+        _, pid, x, y, z, ms = obj
+        return {"type": "player.move", "player": {"id": pid},
+                "pos": {"x": _dq(x, WORLD_SCALE), "y": _dq(y, WORLD_SCALE), "z": _dq(z, WORLD_SCALE)},
+                "time": _iso(ms)}
+    if tag == T_BLOCK_PLACE:
+        _, pid, x, y, z, kind, ms = obj
+        return {"type": "block.place", "player": {"id": pid},
+                "block": {"x": x, "y": y, "z": z, "kind": kind}, "time": _iso(ms)}
+    if tag == T_BLOCK_REMOVE:
+        _, pid, x, y, z, ms = obj
+        return {"type": "block.remove", "player": {"id": pid}, "x": x, "y": y, "z": z, "time": _iso(ms)}
+    return {"type": "unknown", "tag": tag}
+
+
+# ---------- Client -> server ----------
+def pack_client(frame: Dict[str, Any]):
+    """Compact form of a client frame (what a client encodes); used by the load tools."""
+    t = frame.get("type")
+    if t == "cursor":
+        return [T_CURSOR, _q(frame.get("x"), CANVAS_SCALE), _q(frame.get("y"), CANVAS_SCALE)]
+    if t == "node_move":
+        return [T_NODE_MOVE, frame.get("path"), _q(frame.get("x"), CANVAS_SCALE), _q(frame.get("y"), CANVAS_SCALE)]
+    if t == "move":
+        return [T_PLAYER_MOVE, _q(frame.get("x"), WORLD_SCALE), _q(frame.get("y"), WORLD_SCALE),
+                _q(frame.get("z"), WORLD_SCALE)]
+    if t == "place_block":
+        return [T_BLOCK_PLACE, frame.get("x"), frame.get("y"), frame.get("z"), frame.get("block")]
+    if t == "remove_block":
+        return [T_BLOCK_REMOVE, frame.get("x"), frame.get("y"), frame.get("z")]
+    return frame
+
+
+def unpack_client(obj) -> Dict[str, Any]:
+    """Client frame -> the dict receive_json() gets on the JSON protocol."""
+    if isinstance(obj, dict):
+        return obj
+    if not isinstance(obj, list) or not obj:
+        return {}
+    tag, args = obj[0], list(obj[1:])
+    try:
+        if tag == T_CURSOR:
+            x, y = args
+            return {"type": "cursor", "x": _dq(x, CANVAS_SCALE), "y": _dq(y, CANVAS_SCALE)}
+        if tag == T_NODE_MOVE:
+            path, x, y = args
+            return {"type": "node_move", "path": path, "x": _dq(x, CANVAS_SCALE), "y": _dq(y, CANVAS_SCALE)}
+        if tag == T_PLAYER_MOVE:
+            x, y, z = args
+            return {"type": "move", "x": _dq(x, WORLD_SCALE), "y": _dq(y, WORLD_SCALE), "z": _dq(z, WORLD_SCALE)}
+        if tag == T_BLOCK_PLACE:
+            x, y, z, kind = args
+            return {"type": "place_block", "x": x, "y": y, "z": z, "block": kind}
+        if tag == T_BLOCK_REMOVE:
+            x, y, z = args
+            return {"type": "remove_block", "x": x, "y": y, "z": z}
+    except ValueError:
+        pass
+    return {}
+
+
+# ---------- Encodings ----------
+class Codec:
+    subprotocol = ""
+
+    def dumps(self, obj) -> bytes:
+        raise NotImplementedError
+
+    def loads(self, data: bytes):
+        raise NotImplementedError
+
+    def encode(self, frame: Dict[str, Any]) -> bytes:
+        return self.dumps(pack_server(frame))
+
+    def decode(self, data: bytes) -> Dict[str, Any]:
+        return unpack_client(self.loads(data))
+
+
+class MsgpackCodec(Codec):
+    subprotocol = "rt.msgpack.v1"
+
+    def dumps(self, obj) -> bytes:
+        return msgpack.packb(obj, use_bin_type=True)
+
+    def loads(self, data: bytes):
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+class CborCodec(Codec):
+    subprotocol = "rt.cbor.v1"
+
+    def dumps(self, obj) -> bytes:
+        return cbor2.dumps(obj)
+
+    def loads(self, data: bytes):
+        return cbor2.loads(data)
+
+
+CODECS: Dict[str, Codec] = {}
+if msgpack is not None:
+    CODECS[MsgpackCodec.subprotocol] = MsgpackCodec()
+if cbor2 is not None:
+    CODECS[CborCodec.subprotocol] = CborCodec()
+
+
+def negotiate(offered: List[str]) -> Optional[Codec]:
+    """First subprotocol the client offered that we support, or None for JSON."""
+    for name in offered or ():
+        codec = CODECS.get(name)
+        if codec is not None:
+            return codec
+    return None
+
+
+class CodecMixin:
+    """
+    For AsyncJsonWebsocketConsumer: picks a codec from the handshake subprotocols and
+    routes send_json / binary receive through it. Text frames are always read as JSON.
+    """
+    codec: Optional[Codec] = None
+
+    async def websocket_connect(self, message):
+        self.codec = negotiate(self.scope.get("subprotocols", []))
+        await super().websocket_connect(message)
+
+    async def accept(self, subprotocol=None, headers=None):
+        if subprotocol is None and self.codec is not None:
+            subprotocol = self.codec.subprotocol
+        await super().accept(subprotocol=subprotocol, headers=headers)
+
+    async def send_json(self, content, close=False):
+        if self.codec is None:
+            await super().send_json(content, close=close)
+        else:
+            await self.send(bytes_data=self.codec.encode(content), close=close)
+
+    async def receive(self, text_data=None, bytes_data=None, **kwargs):
+        if bytes_data is not None and self.codec is not None:
+            try:
+                content = self.codec.decode(bytes_data)
+            except Exception:
+                return  # undecodable frame: ignore like an unknown type
+            if isinstance(content, dict):
+                await self.receive_json(content, **kwargs)
+            return
+        await super().receive(text_data=text_data, bytes_data=bytes_data, **kwargs)
@@ -1,14 +1,27 @@
 # /backend/realtime/consumers.py
 from uuid import uuid4
 from datetime import datetime, timezone
+from functools import lru_cache
+from urllib.parse import parse_qs
 import asyncio
-from typing import Dict, Any
+import time
+from typing import Dict, Any, Optional
 
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 from channels.db import database_sync_to_async
+from channels.layers import InMemoryChannelLayer
 from django.contrib.auth.models import AnonymousUser
-from django.db.models import Q
 from django.conf import settings
+from django.core.cache import cache as shared_cache
+
+from .layers import LocalChannelLayer
+from .replay import ReplayBuffer
+from .sendqueue import OutboxMixin
+from .ratelimit import RateLimitMixin
+from .codec import CodecMixin
+from .roomcache import ROLE_EDITOR, ROLE_OWNER, ROLE_VIEWER, RoomAcl, RoomCache
+from .spectators import SpectatorFeed, spectator_group
+from . import metrics
 
 # Try to import your Project model for access control.
 # If it's not available or its field names differ, the guard below falls back permissively.
@@ -20,6 +33,14 @@ except Exception:  # pragma: no cover
 # ---------- Tunables (override via Django settings) ----------
 REALTIME_MAX_PEERS_PER_PROJECT = getattr(settings, "REALTIME_MAX_PEERS_PER_PROJECT", 10)
 REALTIME_MAX_CONN_PER_USER = getattr(settings, "REALTIME_MAX_CONN_PER_USER", 4)
+REALTIME_REPLAY_BUFFER = getattr(settings, "REALTIME_REPLAY_BUFFER", 500)
+REALTIME_REPLAY_MAX_AGE = getattr(settings, "REALTIME_REPLAY_MAX_AGE", 120)
+REALTIME_RATE_LIMITS = getattr(settings, "REALTIME_RATE_LIMITS", {"*": (50, 100)})
+REALTIME_ROOM_ACL_TTL = getattr(settings, "REALTIME_ROOM_ACL_TTL", 30)
+REALTIME_SHAPES_SHARED_TTL = getattr(settings, "REALTIME_SHAPES_SHARED_TTL", 3600)
+REALTIME_MAX_SPECTATORS_PER_PROJECT = getattr(settings, "REALTIME_MAX_SPECTATORS_PER_PROJECT", 500)
+REALTIME_SPECTATOR_HZ = getattr(settings, "REALTIME_SPECTATOR_HZ", 10)
+REALTIME_VIEWERS_SPECTATE = getattr(settings, "REALTIME_VIEWERS_SPECTATE", True)
 
 # --- Very light in-memory presence just for dev/demo ---
 # PRESENCE = { group_name: { user_id: {"id": int, "username": str, "color": str, "sockets": int, "last_seen": iso} } }
@@ -35,6 +56,31 @@ CHAT_HISTORY_MAX = 100  # cap backlog per project group
 # { group_name: {"zoom": float, "pan": {"x": float, "y": float}} }
 VIEWPORT_STATE: Dict[str, Dict[str, Any]] = {}
 
+# --- Resumable sessions: per-room seq + ring buffer of recent events (ephemeral; per process) ---
+# { group_name: ReplayBuffer }
+REPLAY_BUFFERS: Dict[str, ReplayBuffer] = {}
+
+# --- Room cache: access list + live shapes, warmed on first join (ephemeral; per process) ---
+# { group_name: RoomCache }
+ROOM_CACHES: Dict[str, RoomCache] = {}
+ROOM_CACHE_IDLE = 300  # seconds an empty room's cache is kept
+# Live shapes are also shared between workers through the Django cache (Redis in production):
+# "rt:shapes:<project_id>" -> {"token": str, "shapes": list | None}. Every change publishes the
+# whole list under a new token; a join adopts it when its token differs from the local copy's.
+# shapes None is a tombstone (the project was saved elsewhere): reload from the database.
+# Concurrent edits on two workers: the last published list wins.
+_SHARED_DOWN = object()  # the shared cache could not be reached: trust the local copy
+
+# --- Spectators: read-only audience fed a down-sampled stream (ephemeral; per process) ---
+# { group_name: SpectatorFeed }, { group_name: local spectator sockets }
+# A feed only exists while its room has spectators on some worker: "rt:spectators:<group>"
+# in the Django cache counts them across workers, read at most every AUDIENCE_CHECK_SECONDS
+# per room ({ group_name: (monotonic checked at, has spectators) }).
+SPECTATOR_FEEDS: Dict[str, SpectatorFeed] = {}
+SPECTATOR_COUNTS: Dict[str, int] = {}
+AUDIENCE_SEEN: Dict[str, tuple] = {}
+AUDIENCE_CHECK_SECONDS = 1.0
+
 # --- Per-user global concurrent connection counts (across rooms; dev only) ---
 USER_CONN_COUNTS: Dict[int, int] = {}
 USER_CONN_LOCK = asyncio.Lock()
@@ -49,7 +95,184 @@ def _color_for_user(uid: int) -> str:
     return f"rgb({r},{g},{b})"
 
 
-class ProjectConsumer(AsyncJsonWebsocketConsumer):
+def _replay_buffer(group_name: str) -> ReplayBuffer:
+    buf = REPLAY_BUFFERS.get(group_name)
+    if buf is None:
+        # Drop buffers of rooms nobody has touched for a while (their epoch is dead anyway)
+        for name, other in list(REPLAY_BUFFERS.items()):
+            if name not in PRESENCE and other.idle_for() > REALTIME_REPLAY_MAX_AGE:
+                REPLAY_BUFFERS.pop(name, None)
+        buf = REPLAY_BUFFERS[group_name] = ReplayBuffer(REALTIME_REPLAY_BUFFER, REALTIME_REPLAY_MAX_AGE)
+    return buf
+
+
+def _single_process_layer(layer) -> bool:
+    # Every socket of every room is on this worker: no events to miss while we have no members
+    return isinstance(layer, (LocalChannelLayer, InMemoryChannelLayer))
+
+
+def _room_cache(group_name: str) -> RoomCache:
+    cache = ROOM_CACHES.get(group_name)
+    if cache is None:
+        for name, other in list(ROOM_CACHES.items()):
+            if name not in PRESENCE and other.idle_for() > ROOM_CACHE_IDLE:
+                ROOM_CACHES.pop(name, None)
+        cache = ROOM_CACHES[group_name] = RoomCache()
+    cache.touched = time.monotonic()
+    return cache
+
+
+def _spectator_feed(channel_layer, group_name: str) -> SpectatorFeed:
+    feed = SPECTATOR_FEEDS.get(group_name)
+    if feed is None:
+        feed = SPECTATOR_FEEDS[group_name] = SpectatorFeed(
+            channel_layer, group_name, REALTIME_SPECTATOR_HZ, on_idle=_forget_spectator_feed,
+        )
+    return feed
+
+
+def _forget_spectator_feed(feed: SpectatorFeed):
+    if SPECTATOR_FEEDS.get(feed.group_name) is feed:
+        SPECTATOR_FEEDS.pop(feed.group_name, None)
+
+
+def _drop_spectator_feed(group_name: str):
+    feed = SPECTATOR_FEEDS.pop(group_name, None)
+    if feed is not None:
+        feed.stop()
+
+
+def _audience_key(group_name: str) -> str:
+    return f"rt:spectators:{group_name}"
+
+
+async def _count_spectator(group_name: str, delta: int):
+    """Keep the cross-worker spectator count of a room (best effort)."""
+    AUDIENCE_SEEN.pop(group_name, None)
+    key = _audience_key(group_name)
+    try:
+        if delta > 0:
+            await shared_cache.aadd(key, 0, None)
+        left = await shared_cache.aincr(key, delta)
+        if left <= 0:
+            await shared_cache.adelete(key)
+    except Exception:
+        pass
+
+
+async def _room_has_spectators(group_name: str) -> bool:
+    if SPECTATOR_COUNTS.get(group_name):
+        return True
+    now = time.monotonic()
+    seen = AUDIENCE_SEEN.get(group_name)
+    if seen is not None and now - seen[0] < AUDIENCE_CHECK_SECONDS:
+        return seen[1]
+    if seen is None:
+        for name, (at, _) in list(AUDIENCE_SEEN.items()):
+            if now - at > ROOM_CACHE_IDLE:
+                AUDIENCE_SEEN.pop(name, None)
+    try:
+        watching = bool(await shared_cache.aget(_audience_key(group_name)))
+    except Exception:
+        watching = False
+    AUDIENCE_SEEN[group_name] = (now, watching)
+    return watching
+
+
+def _shapes_key(project_id) -> str:
+    return f"rt:shapes:{project_id}"
+
+
+async def _shared_shapes(project_id):
+    try:
+        return await shared_cache.aget(_shapes_key(project_id))
+    except Exception:
+        return _SHARED_DOWN
+
+
+async def _publish_shapes(project_id, room: RoomCache):
+    """Share this worker's copy of the room's shapes with the others."""
+    token = uuid4().hex[:12]
+    try:
+        await shared_cache.aset(_shapes_key(project_id), {"token": token, "shapes": room.shapes},
+                                REALTIME_SHAPES_SHARED_TTL)
+    except Exception:
+        return
+    room.shapes_token = token
+
+
+def invalidate_room(project_id, shapes: bool = False):
+    """Forget a room's cached access list (and shapes, on every worker); called from realtime.signals."""
+    cache = ROOM_CACHES.get(f"proj_{project_id}")
+    if cache is not None:
+        cache.acl = None
+        if shapes:
+            cache.shapes = None
+    if shapes:
+        try:
+            shared_cache.set(_shapes_key(project_id), {"token": uuid4().hex[:12], "shapes": None},
+                             REALTIME_SHAPES_SHARED_TTL)
+        except Exception:
+            pass
+
+
+@lru_cache(maxsize=1)
+def _project_fields() -> frozenset:
+    # Introspected once: the Project model does not change at runtime
+    return frozenset(f.name for f in Project._meta.get_fields()) if Project is not None else frozenset()
+
+
+def _wants_snapshot(scope) -> bool:
+    qs = parse_qs(scope.get("query_string", b"").decode("utf-8"))
+    return qs.get("snapshot", ["0"])[0] not in ("", "0", "false")
+
+
+def _wants_spectate(scope) -> bool:
+    qs = parse_qs(scope.get("query_string", b"").decode("utf-8"))
+    return qs.get("mode", [""])[0] == "spectate"
+
+
+def _resume_params(scope) -> Optional[tuple]:
+    """(epoch, last_seq) from ?epoch=...&last_seq=N, or None for a fresh join."""
+    qs = parse_qs(scope.get("query_string", b"").decode("utf-8"))
+    epoch = qs.get("epoch", [None])[0]
+    try:
+        last_seq = int(qs.get("last_seq", [None])[0])
+    except (TypeError, ValueError):
+        return None
+    return (epoch, last_seq) if epoch else None
+
+
+def _room_gauges():
+    return {("project",): len(PRESENCE)}
+
+
+def _peer_gauges():
+    return {("project",): sum(len(room) for room in list(PRESENCE.values()))}
+
+
+def _spectator_gauges():
+    return {("project",): sum(SPECTATOR_COUNTS.values())}
+
+
+metrics.ROOMS.set_function(_room_gauges)
+metrics.PEERS.set_function(_peer_gauges)
+metrics.SPECTATORS.set_function(_spectator_gauges)
+
+
+# Latest-wins keys for the outbound queue; other event types are delivered losslessly
+def _coalesce_key(payload: Dict[str, Any]):
+    t = payload.get("type")
+    if t == "cursor":
+        return ("cursor", payload.get("peer_id"))
+    if t == "viewport":
+        return ("viewport",)
+    if t == "node_move":
+        return ("node_move", (payload.get("data") or {}).get("path"))
+    return None
+
+
+class ProjectConsumer(CodecMixin, RateLimitMixin, OutboxMixin, AsyncJsonWebsocketConsumer):
     """
     Group: proj_<project_id>
     Frontend sends: {"type": "...", ...payload...}
@@ -57,46 +280,93 @@ class ProjectConsumer(AsyncJsonWebsocketConsumer):
     Presence events: presence_state / presence_join / presence_leave
     Chat events: chat_history (on connect), chat (live)
     Shapes events: shapes_full (on connect), shape_op / shape_ops relay, optional shape_commit
+    Resume: every durable room event carries "seq" and the "epoch" of the worker that numbered it;
+      on connect we send {"type": "session", "epoch", "seq", "resumed"}. Reconnecting with
+      ?epoch=<e>&last_seq=<n> replays only the missed events, other workers' ones included (each
+      worker records what the layer delivers to it); the full snapshot is sent if that gap has aged
+      out, the worker had no member in the room for part of it, or the socket lands on another
+      worker (another epoch).
+    Outbound: room events go through a per-socket queue (see sendqueue.py); cursor, viewport and
+      node_move (per path) are latest-wins, everything else is lossless. Lagging sockets get 4408.
+    Inbound: per-type token buckets (REALTIME_RATE_LIMITS); excess is dropped, sustained abuse
+      gets a "warning" frame and then 4429.
+    Join path: access list and shapes come from the room cache (roomcache.py), so only the first
+      peer of a room touches the DB; live shapes are shared between workers via the Django cache. With ?snapshot=1 a fresh join gets one versioned
+      {"type": "room_snapshot", "v": 1, epoch, seq, peers, chat, shapes, shapes_version, viewport}
+      frame instead of session + presence_state + chat_history + shapes_full + viewport.
+    Wire format: JSON text by default; binary msgpack/CBOR with compact cursor / node_move
+      frames when the client offers the "rt.msgpack.v1" / "rt.cbor.v1" subprotocol (codec.py).
+
+    Spectators: viewers (shared_with only, if REALTIME_VIEWERS_SPECTATE) and ?mode=spectate sockets
+      are read-only, invisible in presence and outside the peer cap. They join proj_<id>_spec and
+      get the room's events coalesced at REALTIME_SPECTATOR_HZ without WebRTC (spectators.py).
+      Editors' workers only feed that stream while the room has spectators on some worker.
 
     Limits:
       - Per-room unique peers: REALTIME_MAX_PEERS_PER_PROJECT
+      - Per-room spectators: REALTIME_MAX_SPECTATORS_PER_PROJECT
       - Per-user concurrent sockets: REALTIME_MAX_CONN_PER_USER
     """
 
+    rate_limits = REALTIME_RATE_LIMITS
+    metrics_label = "project"
+    message_types = frozenset({
+        "cursor", "node_move", "node_visibility", "popup_open", "popup_close", "popup_resize",
+        "popup_lines", "popup_lines_global", "text_edit", "colorize_functions", "chat",
+        "shape_op", "shape_ops", "shape_request_full", "shape_commit",
+        "rtc_offer", "rtc_answer", "rtc_ice", "rtc_hangup", "viewport",
+    })
+
+    # Highest seq of this worker's buffer (epoch) already sent by a resume replay (0 = none)
+    _replayed: Optional[Dict[str, int]] = None
+    # owner / editor / viewer, from the room's access list
+    role: Optional[str] = None
+    spectator: bool = False
+
     # ---------- Access control helper ----------
+    async def _user_can_access_project(self, user, project_id: int) -> bool:
+        """Membership check against the room's cached access list (loaded at most once per TTL)."""
+        cache = _room_cache(self.group_name)
+        acl = cache.acl_fresh(REALTIME_ROOM_ACL_TTL)
+        if acl is None:
+            acl = cache.acl = await self._load_room_acl(project_id)
+        self.role = acl.role(int(user.id))
+        return self.role is not None
+
     @database_sync_to_async
-    def _user_can_access_project(self, user, project_id: int) -> bool:
+    def _load_room_acl(self, project_id: int) -> RoomAcl:
         """
-        Allow connection if the authenticated user appears to be related to the project.
-        Tries common field names: user/owner (FK) and editors/shared_with/members/collaborators/viewers (M2M).
+        Who may join the room, by role. Tries common field names: user/owner (FK) and
+        editors/members/collaborators (edit) and shared_with/viewers (read-only) M2Ms.
         If the Project model isn't importable (Project is None), allow (dev-friendly default).
         """
         if Project is None:
-            return True  # can't verify; be permissive for dev
+            return RoomAcl(True, True, {})  # can't verify; be permissive for dev
 
         try:
-            fields = {f.name for f in Project._meta.get_fields()}
+            fields = _project_fields()
             qs = Project.objects.filter(id=project_id)
-
-            filt = Q()
-            # Common owner fields
-            if "user" in fields:
-                filt |= Q(user=user)
-            if "owner" in fields:
-                filt |= Q(owner=user)
-            # Common membership relations
-            for m2m in ["editors", "shared_with", "members", "collaborators", "viewers"]:
-                if m2m in fields:
-                    filt |= Q(**{m2m: user})
-
-            if filt.children:
-                return qs.filter(filt).exists()
+            if not qs.exists():
+                return RoomAcl(False, False, {})
+
+            members: Dict[int, str] = {}
+            relations = [(ROLE_VIEWER, f) for f in ("shared_with", "viewers")]
+            relations += [(ROLE_EDITOR, f) for f in ("editors", "members", "collaborators")]
+            relations += [(ROLE_OWNER, f) for f in ("user", "owner")]
+            found = False
+            for role, name in relations:  # later (stronger) roles overwrite earlier ones
+                if name not in fields:
+                    continue
+                found = True
+                for uid in qs.values_list(f"{name}__id", flat=True):
+                    if uid is not None:
+                        members[int(uid)] = role
 
             # If we can't detect any known relation fields, fall back to allowing if the project exists.
-            return qs.exists()
+            return RoomAcl(True, not found, members)
         except Exception:
             # On any ORM error, do not hard-fail the socket in dev.
-            return True
+            return RoomAcl(True, True, {})
 
     # ---------- Lifecycle ----------
     async def connect(self):
@@ -108,6 +378,7 @@ class ProjectConsumer(AsyncJsonWebsocketConsumer):
         if not user or isinstance(user, AnonymousUser) or not user.is_authenticated:
             await self.accept()
             await self.send_json({"type": "error", "code": "unauthorized", "message": "Authentication required."})
+            metrics.REJECTS.inc(consumer="project", code=4401)
             await self.close(code=4401)
             return
 
@@ -115,12 +386,18 @@ class ProjectConsumer(AsyncJsonWebsocketConsumer):
         if not await self._user_can_access_project(user, int(self.project_id)):
             await self.accept()
             await self.send_json({"type": "error", "code": "forbidden", "message": "You do not have access."})
+            metrics.REJECTS.inc(consumer="project", code=4403)
             await self.close(code=4403)
             return
 
         self.uid = int(user.id)
         self.username = getattr(user, "username", f"user-{self.uid}")
 
+        if _wants_spectate(self.scope) or (REALTIME_VIEWERS_SPECTATE and self.role == ROLE_VIEWER):
+            self.spectator = True
+            await self._connect_spectator()
+            return
+
         # ---- Enforce room cap & tentatively add presence (under lock) ----
         async with PRESENCE_LOCK:
             room = PRESENCE.setdefault(self.group_name, {})
@@ -135,6 +412,7 @@ class ProjectConsumer(AsyncJsonWebsocketConsumer):
                     "message": "This project room is full.",
                     "limit": REALTIME_MAX_PEERS_PER_PROJECT,
                 })
+                metrics.REJECTS.inc(consumer="project", code=4001)
                 await self.close(code=4001)
                 return
 
@@ -152,20 +430,114 @@ class ProjectConsumer(AsyncJsonWebsocketConsumer):
             self._presence_reserved = True  # flag for cleanup
 
         # ---- Enforce per-user global concurrent connection cap ----
+        if not await self._claim_user_slot():
+            return
+
+        # Join group & accept
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        self._joined_group = True
+        await self.accept()
+        self.start_outbox()
+        metrics.CONNECTS.inc(consumer="project")
+
+        # ----- Initial payloads -----
+        # Resume: only the events missed since last_seq, if the buffer still covers the gap
+        buf = _replay_buffer(self.group_name)
+        resume = _resume_params(self.scope)
+        missed = buf.since(*resume) if resume else None
+        if missed is None and _wants_snapshot(self.scope):
+            # Opt-in (?snapshot=1): session + presence + chat + shapes + viewport in one frame
+            await self.enqueue(await self._room_snapshot(buf))
+        elif missed is not None:
+            await self.enqueue({"type": "session", "epoch": buf.epoch, "seq": buf.seq, "resumed": True})
+            # Anything already in `missed` may also be queued for us by the layer; skip those
+            replayed = {buf.epoch: buf.seq}
+            for payload in missed:
+                if payload.get("epoch") != buf.epoch:
+                    replayed[payload["epoch"]] = max(replayed.get(payload["epoch"], 0), payload["seq"])
+            self._replayed = replayed
+            for payload in missed:
+                await self.enqueue(payload)
+        else:
+            await self.enqueue({"type": "session", "epoch": buf.epoch, "seq": buf.seq, "resumed": False})
+            await self._send_snapshot()
+
+        # Announce my join to others
+        await self._broadcast({"type": "presence_join", "peer": {
+            "id": self.uid, "username": self.username, "color": _color_for_user(self.uid)
+        }})
+
+    async def _connect_spectator(self):
+        spec_group = spectator_group(self.group_name)
+        count = SPECTATOR_COUNTS.get(self.group_name, 0)
+        if count >= REALTIME_MAX_SPECTATORS_PER_PROJECT:
+            await self.accept()
+            await self.send_json({
+                "type": "error",
+                "code": "audience_full",
+                "message": "This project has too many spectators.",
+                "limit": REALTIME_MAX_SPECTATORS_PER_PROJECT,
+            })
+            metrics.REJECTS.inc(consumer="project", code=4001)
+            await self.close(code=4001)
+            return
+        SPECTATOR_COUNTS[self.group_name] = count + 1
+        self._spectator_counted = True
+        await _count_spectator(self.group_name, 1)
+
+        if not await self._claim_user_slot():
+            return
+
+        await self.channel_layer.group_add(spec_group, self.channel_name)
+        self._joined_group = True
+        await self.accept()
+        self.start_outbox()
+        metrics.CONNECTS.inc(consumer="project")
+
+        buf = _replay_buffer(self.group_name)
+        if _wants_snapshot(self.scope):
+            await self.enqueue({**(await self._room_snapshot(buf)), "spectator": True})
+        else:
+            await self.enqueue({
+                "type": "session", "epoch": buf.epoch, "seq": buf.seq, "resumed": False, "spectator": True,
+            })
+            await self._send_snapshot()
+
+    async def _disconnect_spectator(self):
+        try:
+            if getattr(self, "_joined_group", False):
+                await self.channel_layer.group_discard(spectator_group(self.group_name), self.channel_name)
+        except Exception:
+            pass
+        if getattr(self, "_spectator_counted", False):
+            left = SPECTATOR_COUNTS.get(self.group_name, 1) - 1
+            if left > 0:
+                SPECTATOR_COUNTS[self.group_name] = left
+            else:
+                SPECTATOR_COUNTS.pop(self.group_name, None)
+            await _count_spectator(self.group_name, -1)
+            if not await _room_has_spectators(self.group_name):
+                _drop_spectator_feed(self.group_name)
+        await self._release_user_slot()
+
+    async def _claim_user_slot(self) -> bool:
+        """Count this socket against REALTIME_MAX_CONN_PER_USER; on refusal roll back and close."""
         async with USER_CONN_LOCK:
             current = USER_CONN_COUNTS.get(self.uid, 0)
             if current >= REALTIME_MAX_CONN_PER_USER:
-                # roll back the room reservation
+                # roll back the room reservation (spectators have none)
                 try:
-                    async with PRESENCE_LOCK:
-                        room = PRESENCE.get(self.group_name, {})
-                        entry = room.get(self.uid)
-                        if entry:
-                            entry["sockets"] = max(0, entry["sockets"] - 1)
-                            if entry["sockets"] == 0:
-                                room.pop(self.uid, None)
-                        if not room:
-                            PRESENCE.pop(self.group_name, None)
+                    if getattr(self, "_presence_reserved", False):
+                        async with PRESENCE_LOCK:
+                            room = PRESENCE.get(self.group_name, {})
+                            entry = room.get(self.uid)
+                            if entry:
+                                entry["sockets"] = max(0, entry["sockets"] - 1)
+                                if entry["sockets"] == 0:
+                                    room.pop(self.uid, None)
+                            if not room:
+                                PRESENCE.pop(self.group_name, None)
+                        self._presence_reserved = False
                 except Exception:
                     pass
 
@@ -176,55 +548,91 @@ class ProjectConsumer(AsyncJsonWebsocketConsumer):
                     "message": "Too many concurrent connections.",
                     "limit": REALTIME_MAX_CONN_PER_USER,
                 })
+                metrics.REJECTS.inc(consumer="project", code=4002)
                 await self.close(code=4002)
-                return
+                return False
 
             USER_CONN_COUNTS[self.uid] = current + 1
             self._conn_counted = True
+            return True
 
-        # Join group & accept
-        await self.channel_layer.group_add(self.group_name, self.channel_name)
-        self._joined_group = True
-        await self.accept()
+    async def _release_user_slot(self):
+        try:
+            if getattr(self, "_conn_counted", False):
+                async with USER_CONN_LOCK:
+                    if self.uid in USER_CONN_COUNTS:
+                        USER_CONN_COUNTS[self.uid] = max(0, USER_CONN_COUNTS[self.uid] - 1)
+                        if USER_CONN_COUNTS[self.uid] == 0:
+                            USER_CONN_COUNTS.pop(self.uid, None)
+        except Exception:
+            pass
 
-        # ----- Initial payloads -----
+    async def _send_snapshot(self):
         # Send full presence state to me
         async with PRESENCE_LOCK:
             peers_list = list(PRESENCE.get(self.group_name, {}).values())
-        await self.send_json({"type": "presence_state", "peers": peers_list})
+        await self.enqueue({"type": "presence_state", "peers": peers_list})
 
         # Send lightweight chat backlog to me
-        await self.send_json({
+        await self.enqueue({
             "type": "chat_history",
             "messages": CHAT_HISTORY.get(self.group_name, []),
         })
 
         # Send current shapes snapshot to me
-        shapes = await self._fetch_shapes()
-        await self.send_json({"type": "shapes_full", "shapes": shapes})
+        shapes = await self._cached_shapes()
+        await self.enqueue({"type": "shapes_full", "shapes": shapes})
 
         # --- Viewport sync: send last known viewport (if any) so newcomers land where the team is
         vp = VIEWPORT_STATE.get(self.group_name)
         if vp:
-            await self.send_json({"type": "viewport", "data": {"zoom": vp.get("zoom"), "pan": vp.get("pan")}})
+            await self.enqueue({"type": "viewport", "data": {"zoom": vp.get("zoom"), "pan": vp.get("pan")}})
 
-        # Announce my join to others
-        await self.channel_layer.group_send(
-            self.group_name,
-            {"type": "broadcast", "payload": {"type": "presence_join", "peer": {
-                "id": self.uid, "username": self.username, "color": _color_for_user(self.uid)
-            }}},
-        )
+    async def _room_snapshot(self, buf: ReplayBuffer) -> Dict[str, Any]:
+        """Everything a fresh joiner needs, versioned; `seq` is the room seq it reflects."""
+        async with PRESENCE_LOCK:
+            peers_list = list(PRESENCE.get(self.group_name, {}).values())
+        shapes = await self._cached_shapes()
+        vp = VIEWPORT_STATE.get(self.group_name)
+        return {
+            "type": "room_snapshot",
+            "v": 1,
+            "epoch": buf.epoch,
+            "seq": buf.seq,
+            "peers": peers_list,
+            "chat": CHAT_HISTORY.get(self.group_name, []),
+            "shapes": shapes,
+            "shapes_version": _room_cache(self.group_name).shapes_version,
+            "viewport": {"zoom": vp.get("zoom"), "pan": vp.get("pan")} if vp else None,
+        }
+
+    async def _cached_shapes(self):
+        """The room's live shapes: the shared copy if another worker changed them, else ours."""
+        room = _room_cache(self.group_name)
+        shared = await _shared_shapes(self.project_id)
+        if shared is _SHARED_DOWN:
+            if room.shapes is None:
+                room.set_shapes(await self._fetch_shapes())
+            return room.shapes
+        if shared is not None and shared.get("shapes") is not None:
+            if shared.get("token") != room.shapes_token:
+                room.set_shapes(shared["shapes"])
+                room.shapes_token = shared.get("token")
+            return room.shapes
+        if shared is not None or room.shapes is None:
+            # Saved elsewhere (tombstone) or never loaded: the database has the current list
+            room.set_shapes(await self._fetch_shapes())
+        # else: the shared entry expired; our copy may hold unsaved edits, share it again
+        await _publish_shapes(self.project_id, room)
+        return room.shapes
 
     async def disconnect(self, code):
         user = self.scope.get("user", AnonymousUser())
-
-        # Group cleanup
-        try:
-            if getattr(self, "_joined_group", False):
-                await self.channel_layer.group_discard(self.group_name, self.channel_name)
-        except Exception:
-            pass
+        await self.stop_outbox()
+        metrics.DISCONNECTS.inc(consumer="project", code=code)
+        if self.spectator:
+            await self._disconnect_spectator()
+            return
 
         # Presence cleanup
         try:
@@ -246,26 +654,37 @@ class ProjectConsumer(AsyncJsonWebsocketConsumer):
             peers = PRESENCE.get(self.group_name, {})
             if user.id not in peers:
                 # already removed; still broadcast a leave event
-                await self.channel_layer.group_send(
-                    self.group_name,
-                    {"type": "broadcast", "payload": {"type": "presence_leave", "peer": {"id": int(user.id)}}},
-                )
+                await self._broadcast({"type": "presence_leave", "peer": {"id": int(user.id)}})
 
-        # Global per-user conn decrement
+        # Group cleanup, after the leave went out (while this worker still counts as a member)
         try:
-            if getattr(self, "_conn_counted", False) and user and not isinstance(user, AnonymousUser) and user.is_authenticated:
-                async with USER_CONN_LOCK:
-                    if user.id in USER_CONN_COUNTS:
-                        USER_CONN_COUNTS[user.id] = max(0, USER_CONN_COUNTS[user.id] - 1)
-                        if USER_CONN_COUNTS[user.id] == 0:
-                            USER_CONN_COUNTS.pop(user.id, None)
+            if getattr(self, "_joined_group", False):
+                await self.channel_layer.group_discard(self.group_name, self.channel_name)
         except Exception:
             pass
+        # No member left here: other workers' events stop reaching this buffer, so a resume
+        # across the gap must fall back to the snapshot
+        if self.group_name not in PRESENCE and not _single_process_layer(self.channel_layer):
+            buf = REPLAY_BUFFERS.get(self.group_name)
+            if buf is not None:
+                buf.blind()
+
+        # Global per-user conn decrement
+        await self._release_user_slot()
 
     # ---------- Frontend -> Server ----------
     async def receive_json(self, content, **kwargs):
         t = content.get("type")
         user = self.scope.get("user")
+        if not await self.allow_message(t):
+            return
+        metrics.MESSAGES.inc(consumer="project", type=metrics.message_label(t, self.message_types))
+
+        # Spectators are read-only: they may only re-request the shapes snapshot
+        if self.spectator:
+            if t == "shape_request_full":
+                await self.enqueue({"type": "shapes_full", "shapes": await self._cached_shapes()})
+            return
 
         # Touch presence timestamp on any activity
         try:
@@ -278,89 +697,53 @@ class ProjectConsumer(AsyncJsonWebsocketConsumer):
 
         # Cursor (lightweight, throttled by client)
         if t == "cursor":
-            await self.channel_layer.group_send(
-                self.group_name,
-                {
-                    "type": "broadcast",
-                    "payload": {
-                        "type": "cursor",
-                        "peer_id": user.id,
-                        "data": {"x": content.get("x"), "y": content.get("y")},
-                    },
-                },
-            )
+            await self._broadcast({
+                "type": "cursor",
+                "peer_id": user.id,
+                "data": {"x": content.get("x"), "y": content.get("y")},
+            })
 
         # Node drag / position
         elif t == "node_move":
-            await self.channel_layer.group_send(
-                self.group_name,
-                {
-                    "type": "broadcast",
-                    "payload": {
-                        "type": "node_move",
-                        "data": {
-                            "path": content.get("path"),
-                            "x": content.get("x"),
-                            "y": content.get("y"),
-                            "by": user.id,
-                        },
-                    },
+            await self._broadcast({
+                "type": "node_move",
+                "data": {
+                    "path": content.get("path"),
+                    "x": content.get("x"),
+                    "y": content.get("y"),
+                    "by": user.id,
                 },
-            )
+            })
 
         # Show/hide node from the tree
         elif t == "node_visibility":
-            await self.channel_layer.group_send(
-                self.group_name,
-                {
-                    "type": "broadcast",
-                    "payload": {
-                        "type": "node_visibility",
-                        "data": {
-                            "path": content.get("path"),
-                            "hidden": bool(content.get("hidden")),
-                            "by": user.id,
-                        },
-                    },
+            await self._broadcast({
+                "type": "node_visibility",
+                "data": {
+                    "path": content.get("path"),
+                    "hidden": bool(content.get("hidden")),
+                    "by": user.id,
                 },
-            )
+            })
 
         # Popup open/close
         elif t == "popup_open":
-            await self.channel_layer.group_send(
-                self.group_name,
-                {
-                    "type": "broadcast",
-                    "payload": {"type": "popup_open", "data": {"path": content.get("path"), "by": user.id}},
-                },
-            )
+            await self._broadcast({"type": "popup_open", "data": {"path": content.get("path"), "by": user.id}})
 
         elif t == "popup_close":
-            await self.channel_layer.group_send(
-                self.group_name,
-                {
-                    "type": "broadcast",
-                    "payload": {"type": "popup_close", "data": {"path": content.get("path"), "by": user.id}},
-                },
-            )
+            await self._broadcast({"type": "popup_close", "data": {"path": content.get("path"), "by": user.id}})
 
         # Popup resize
         elif t == "popup_resize":
-            await self.channel_layer.group_send(
-                self.group_name,
-                {
-                    "type": "broadcast",
-                    "payload": {
-                        "type": "popup_resize",
-                        "data": {
-                            "path": content.get("path"),
-                            "w": content.get("w"),
-                            "h": content.get("h"),
-                            "by": user.id,
-                        },
-                    },
+            await self._broadcast({
+                "type": "popup_resize",
+                "data": {
+                    "path": content.get("path"),
+                    "w": content.get("w"),
+                    "h": content.get("h"),
+                    "by": user.id,
                 },
-            )
+            })
 
         # --- Sync per-popup "lines on/off" toggle ---
         elif t == "popup_lines":
@@ -368,74 +751,50 @@ class ProjectConsumer(AsyncJsonWebsocketConsumer):
             enabled = bool(content.get("enabled"))
             if not path:
                 return
-            await self.channel_layer.group_send(
-                self.group_name,
-                {
-                    "type": "broadcast",
-                    "payload": {
-                        "type": "popup_lines",
-                        "data": {
-                            "path": path,
-                            "enabled": enabled,
-                            "by": user.id,
-                        },
-                    },
+            await self._broadcast({
+                "type": "popup_lines",
+                "data": {
+                    "path": path,
+                    "enabled": enabled,
+                    "by": user.id,
                 },
-            )
+            })
 
         # --- Sync GLOBAL "all lines on/off" toggle ---
         elif t == "popup_lines_global":
             enabled = bool(content.get("enabled"))
-            await self.channel_layer.group_send(
-                self.group_name,
-                {
-                    "type": "broadcast",
-                    "payload": {
-                        "type": "popup_lines_global",
-                        "data": {
-                            "enabled": enabled,
-                            "by": user.id,
-                        },
-                    },
+            await self._broadcast({
+                "type": "popup_lines_global",
+                "data": {
+                    "enabled": enabled,
+                    "by": user.id,
                 },
-            )
+            })
 
         # Full-document text edits (frontend sends {type:"text_edit", path, content})
         elif t == "text_edit":
             path = content.get("path")
             if not path:
                 return
-            await self.channel_layer.group_send(
-                self.group_name,
-                {
-                    "type": "broadcast",
-                    "payload": {
-                        "type": "text_edit",
-                        "data": {
-                            "path": path,
-                            "content": content.get("content", ""),
-                            "by": user.id,
-                        },
-                    },
+            await self._broadcast({
+                "type": "text_edit",
+                "data": {
+                    "path": path,
+                    "content": content.get("content", ""),
+                    "by": user.id,
                 },
-            )
+            })
 
         # --- Sync GLOBAL "code coloration" toggle ---
         elif t == "colorize_functions":
             enabled = bool(content.get("enabled"))
-            await self.channel_layer.group_send(
-                self.group_name,
-                {
-                    "type": "broadcast",
-                    "payload": {
-                        "type": "colorize_functions",
-                        "data": {
-                            "enabled": enabled,
-                            "by": user.id,
-                        },
-                    },
+            await self._broadcast({
+                "type": "colorize_functions",
+                "data": {
+                    "enabled": enabled,
+                    "by": user.id,
                 },
-            )
+            })
 
         # --- Realtime chat ---
         elif t == "chat":
@@ -462,37 +821,41 @@ class ProjectConsumer(AsyncJsonWebsocketConsumer):
                 del hist[:-CHAT_HISTORY_MAX]
 
             # Fan-out to everyone in the project
-            await self.channel_layer.group_send(
-                self.group_name,
-                {"type": "broadcast", "payload": {"type": "chat", "data": msg}},
-            )
+            await self._broadcast({"type": "chat", "data": msg})
 
         # --- Realtime shapes sync ---
         elif t == "shape_op":
-            # forward one op (add/remove/patch/replace_all) to everyone
-            await self.channel_layer.group_send(
-                self.group_name,
-                {"type": "broadcast", "payload": content},
-            )
+            # forward one op (add/remove/patch/replace_all) to everyone; keep the room cache current
+            await self._cached_shapes()
+            room = _room_cache(self.group_name)
+            room.apply_shape_ops([content])
+            await _publish_shapes(self.project_id, room)
+            await self._broadcast(content)
 
         elif t == "shape_ops":
             # forward a batch of ops to everyone
-            await self.channel_layer.group_send(
-                self.group_name,
-                {"type": "broadcast", "payload": content},
-            )
+            ops = content.get("ops")
+            if isinstance(ops, list):
+                await self._cached_shapes()
+                room = _room_cache(self.group_name)
+                room.apply_shape_ops(ops)
+                await _publish_shapes(self.project_id, room)
+            await self._broadcast(content)
 
         elif t == "shape_request_full":
-            # send a fresh snapshot to just this client
-            shapes = await self._fetch_shapes()
-            await self.send_json({"type": "shapes_full", "shapes": shapes})
+            # send the room's current shapes to just this client
+            shapes = await self._cached_shapes()
+            await self.enqueue({"type": "shapes_full", "shapes": shapes})
 
         elif t == "shape_commit":
             # optional: persist shapes to DB when client explicitly asks
             shapes = content.get("shapes")
             if isinstance(shapes, list):
                 await self._save_shapes(shapes)
-                await self.send_json({"type": "shape_commit_ok"})
+                room = _room_cache(self.group_name)
+                room.set_shapes(shapes)
+                await _publish_shapes(self.project_id, room)
+                await self.enqueue({"type": "shape_commit_ok"})
 
         # --- WebRTC audio signaling (1:1) ---
         elif t in ("rtc_offer", "rtc_answer", "rtc_ice", "rtc_hangup"):
@@ -504,10 +867,7 @@ class ProjectConsumer(AsyncJsonWebsocketConsumer):
                 payload["candidate"] = content.get("candidate")
             if "reason" in content:
                 payload["reason"] = content.get("reason")  # e.g. "hangup" | "decline" | "busy"
-            await self.channel_layer.group_send(
-                self.group_name,
-                {"type": "broadcast", "payload": payload},
-            )
+            await self._broadcast(payload)
 
         # --- Viewport sync: store + broadcast ---
         elif t == "viewport":
@@ -525,25 +885,45 @@ class ProjectConsumer(AsyncJsonWebsocketConsumer):
                 VIEWPORT_STATE[self.group_name] = {"zoom": zoom, "pan": {"x": panx, "y": pany}}
 
             # Fan-out to everyone (clients ignore echoes from themselves)
-            await self.channel_layer.group_send(
-                self.group_name,
-                {
-                    "type": "broadcast",
-                    "payload": {
-                        "type": "viewport",
-                        "data": {"zoom": zoom, "pan": {"x": panx, "y": pany}, "by": getattr(user, "id", None)},
-                    },
-                },
-            )
+            await self._broadcast({
+                "type": "viewport",
+                "data": {"zoom": zoom, "pan": {"x": panx, "y": pany}, "by": getattr(user, "id", None)},
+            })
 
         # Unknown → ignore silently
         else:
             return
 
     # ---------- Server -> Clients ----------
+    async def _broadcast(self, payload: Dict[str, Any]):
+        # Stamp with the room's next seq (kept for replay), then fan out to the group
+        payload = _replay_buffer(self.group_name).stamp(payload)
+        room = PRESENCE.get(self.group_name, {})
+        metrics.FANOUT.observe(sum(p["sockets"] for p in room.values()), consumer="project")
+        with metrics.GROUP_SEND_SECONDS.time(consumer="project"):
+            await self.channel_layer.group_send(
+                self.group_name, {"type": "broadcast", "group": self.group_name, "payload": payload}
+            )
+        # Spectators (on any worker) get it later, coalesced, in one group_send per tick
+        if await _room_has_spectators(self.group_name):
+            _spectator_feed(self.channel_layer, self.group_name).push(payload)
+        elif self.group_name in SPECTATOR_FEEDS:
+            _drop_spectator_feed(self.group_name)  # the last spectator left
+
+    async def spectate_batch(self, event):
+        for payload in event["events"]:
+            await self.enqueue(payload, _coalesce_key(payload))
+
     async def broadcast(self, event):
-        # Just forward the payload as-is to the socket
-        await self.send_json(event["payload"])
+        payload = event["payload"]
+        # Another worker's event: keep it for resumes on this worker too
+        _replay_buffer(self.group_name).record(payload)
+        # Already delivered by the resume replay (seqs only compare within one epoch)
+        seq = payload.get("seq", 0)
+        if seq and self._replayed and seq <= self._replayed.get(payload.get("epoch"), 0):
+            return
+        # Otherwise forward the payload as-is to the socket
+        await self.enqueue(payload, _coalesce_key(payload))
 
     # ---------- Shapes helpers ----------
     @database_sync_to_async
@@ -551,13 +931,10 @@ class ProjectConsumer(AsyncJsonWebsocketConsumer):
         if Project is None:
             return []
         try:
-            fields = {f.name for f in Project._meta.get_fields()}
-            if "shapes" not in fields:
+            if "shapes" not in _project_fields():
                 return []
-            obj = Project.objects.get(id=int(self.project_id))
-            return getattr(obj, "shapes", []) or []
-        except Project.DoesNotExist:
-            return []
+            shapes = Project.objects.filter(id=int(self.project_id)).values_list("shapes", flat=True).first()
+            return shapes or []
         except Exception:
             return []
 
@@ -566,8 +943,7 @@ class ProjectConsumer(AsyncJsonWebsocketConsumer):
         if Project is None:
             return
         try:
-            fields = {f.name for f in Project._meta.get_fields()}
-            if "shapes" not in fields:
+            if "shapes" not in _project_fields():
                 return
             Project.objects.filter(id=int(self.project_id)).update(shapes=shapes)
         except Exception:
@@ -0,0 +1,383 @@
+# /backend/realtime/layers.py
+"""
+Channel layers for the realtime tier.
+
+LocalChannelLayer: single-process layer used when REDIS_URL is not set. Compared to
+channels' InMemoryChannelLayer it
+  - keeps group membership in plain sets (no per-member timestamps / expiry scans),
+  - shares one message object between all recipients instead of deep-copying it per
+    channel, so consumers must treat received events as read-only,
+  - bounds every channel queue and counts what it drops (realtime_layer_dropped_total),
+  - sweeps queues nobody has read for `expiry` seconds (sockets that closed with events
+    still on their way, e.g. their own leave broadcast).
+
+RoomAffinityChannelLayer: multi-worker layer that wraps a LocalChannelLayer and a shared
+backend (Redis) and only touches the backend for groups with members on other workers.
+"""
+import asyncio
+import random
+import string
+import time
+import weakref
+from collections import deque
+from typing import Any, Deque, Dict, List, Set, Tuple
+
+from channels.exceptions import ChannelFull
+from channels.layers import BaseChannelLayer
+
+from . import metrics
+
+LAYER_DROPPED = metrics.Counter(
+    "realtime_layer_dropped_total", "Messages the channel layer dropped, by reason.", ("layer", "reason")
+)
+LAYER_QUEUED = metrics.Gauge("realtime_layer_queued", "Messages waiting in channel layer queues.", ("layer",))
+_LOCAL_LAYERS: "weakref.WeakSet[LocalChannelLayer]" = weakref.WeakSet()
+LAYER_QUEUED.set_function(lambda: {
+    ("local",): sum(len(c.items) for layer in list(_LOCAL_LAYERS) for c in list(layer.channels.values()))
+})
+
+
+class _Channel:
+    __slots__ = ("capacity", "items", "waiters")
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.items: Deque[Tuple[float, Dict[str, Any]]] = deque()
+        self.waiters: List[asyncio.Future] = []
+
+
+class LocalChannelLayer(BaseChannelLayer):
+    extensions = ["groups", "flush"]
+
+    def __init__(self, expiry=60, group_expiry=86400, capacity=100, channel_capacity=None, **kwargs):
+        super().__init__(expiry=expiry, capacity=capacity)
+        self.channel_capacity = self.compile_capacities(channel_capacity or {})
+        self.group_expiry = group_expiry  # accepted for config compatibility; membership is explicit
+        self.channels: Dict[str, _Channel] = {}
+        self.groups: Dict[str, Set[str]] = {}
+        self._next_sweep = time.monotonic() + self.expiry
+        _LOCAL_LAYERS.add(self)
+
+    # ---------- Channel layer API ----------
+    async def send(self, channel, message):
+        assert isinstance(message, dict), "message is not a dict"
+        assert self.valid_channel_name(channel), "Channel name not valid"
+        if not self._put(channel, message):
+            raise ChannelFull(channel)
+
+    async def receive(self, channel):
+        assert self.valid_channel_name(channel)
+        chan = self._channel(channel)
+        try:
+            while not chan.items:
+                waiter = asyncio.get_running_loop().create_future()
+                chan.waiters.append(waiter)
+                try:
+                    await waiter
+                finally:
+                    if waiter in chan.waiters:
+                        chan.waiters.remove(waiter)
+            _, message = chan.items.popleft()
+            return message
+        finally:
+            if not chan.items and not chan.waiters and self.channels.get(channel) is chan:
+                del self.channels[channel]
+
+    async def new_channel(self, prefix="specific"):
+        return "%s.local!%s" % (prefix, "".join(random.choice(string.ascii_letters) for _ in range(12)))
+
+    # ---------- Groups extension ----------
+    async def group_add(self, group, channel):
+        assert self.valid_group_name(group), "Group name not valid"
+        assert self.valid_channel_name(channel), "Channel name not valid"
+        self.groups.setdefault(group, set()).add(channel)
+
+    async def group_discard(self, group, channel):
+        assert self.valid_channel_name(channel), "Invalid channel name"
+        assert self.valid_group_name(group), "Invalid group name"
+        members = self.groups.get(group)
+        if members is not None:
+            members.discard(channel)
+            if not members:
+                del self.groups[group]
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), "Message is not a dict"
+        assert self.valid_group_name(group), "Invalid group name"
+        # Same object for every member: no copies, no awaits
+        for channel in tuple(self.groups.get(group, ())):
+            self._put(channel, message)
+
+    # ---------- Flush extension ----------
+    async def flush(self):
+        self.channels = {}
+        self.groups = {}
+
+    async def close(self):
+        pass
+
+    # ---------- internals ----------
+    def _channel(self, name: str) -> _Channel:
+        chan = self.channels.get(name)
+        if chan is None:
+            chan = self.channels[name] = _Channel(self.get_capacity(name))
+        return chan
+
+    def _put(self, name: str, message: Dict[str, Any]) -> bool:
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._sweep(now)
+        chan = self._channel(name)
+        if len(chan.items) >= chan.capacity:
+            if now - chan.items[0][0] > self.expiry:
+                # Nobody has drained this channel for `expiry` seconds: treat it as dead
+                LAYER_DROPPED.inc(len(chan.items) + 1, layer="local", reason="expired")
+                self._forget(name)
+                return True
+            LAYER_DROPPED.inc(layer="local", reason="full")
+            return False
+        chan.items.append((now, message))
+        for waiter in chan.waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+                break
+        return True
+
+    def _sweep(self, now: float):
+        """Drop queues whose oldest message has waited `expiry` seconds with nobody receiving."""
+        self._next_sweep = now + self.expiry
+        cutoff = now - self.expiry
+        for name, chan in list(self.channels.items()):
+            if chan.items and not chan.waiters and chan.items[0][0] < cutoff:
+                LAYER_DROPPED.inc(len(chan.items), layer="local", reason="expired")
+                self._forget(name)
+
+    def _forget(self, name: str):
+        self.channels.pop(name, None)
+        for group, members in list(self.groups.items()):
+            members.discard(name)
+            if not members:
+                del self.groups[group]
+
+
+LAYER_GROUP_SENDS = metrics.Counter(
+    "realtime_layer_group_sends_total",
+    "group_send calls by route: local only, or also through the shared backend.",
+    ("layer", "route"),
+)
+
+
+class RoomAffinityChannelLayer(BaseChannelLayer):
+    """
+    Hybrid layer for multi-worker deployments: a LocalChannelLayer for sockets on this
+    worker plus a shared backend (normally Redis) used only to reach other workers.
+
+    Each worker owns one backend inbox channel ("hybrid.worker.<id>"). The first time a
+    worker gets a local member in a group it adds its inbox to the backend group and
+    announces itself; the workers already there answer directly, so every worker knows
+    which *other* workers hold members of each group. group_send then:
+      - delivers to local members in-process (no serialization, no network),
+      - makes one backend group_send only if some other worker is in the group.
+
+    Announcements are repeated every `announce_interval` seconds and remote entries not
+    refreshed within `remote_ttl` are forgotten, so a crashed worker only costs a few
+    wasted backend sends. A worker that has just joined may miss messages sent before
+    its announcement reached the sender (the same window a Redis reconnect has); the
+    project consumer's replay buffer covers that gap for clients that resume.
+
+    A group_send to a group with no member on this worker (a spectator group fed from an
+    editor's worker, a leave sent after the last local member left) always goes through
+    the backend, whose own membership decides who gets it.
+    """
+    extensions = ["groups", "flush"]
+
+    def __init__(
+        self,
+        backend=None,
+        expiry=60,
+        capacity=100,
+        channel_capacity=None,
+        announce_interval=30,
+        remote_ttl=None,
+        **kwargs,
+    ):
+        super().__init__(expiry=expiry, capacity=capacity)
+        self.local = LocalChannelLayer(expiry=expiry, capacity=capacity, channel_capacity=channel_capacity)
+        self.backend = self._make_backend(backend)
+        self.worker_id = "".join(random.choice(string.ascii_letters + string.digits) for _ in range(10))
+        self.inbox = "hybrid.worker.%s" % self.worker_id
+        self.announce_interval = float(announce_interval)
+        self.remote_ttl = float(remote_ttl or 3 * self.announce_interval)
+        # group -> {worker id: last announcement (monotonic)}
+        self.remote: Dict[str, Dict[str, float]] = {}
+        # groups this worker's inbox is a backend member of
+        self.joined: Set[str] = set()
+        self._pump = None
+
+    @staticmethod
+    def _make_backend(backend):
+        if backend is None:
+            raise ValueError("RoomAffinityChannelLayer needs a 'backend' layer config")
+        if isinstance(backend, BaseChannelLayer):
+            return backend
+        from django.utils.module_loading import import_string
+        return import_string(backend["BACKEND"])(**backend.get("CONFIG", {}))
+
+    # ---------- Channel layer API ----------
+    async def send(self, channel, message):
+        assert isinstance(message, dict), "message is not a dict"
+        assert self.valid_channel_name(channel), "Channel name not valid"
+        self._ensure_pump()
+        owner = self._owner(channel)
+        if owner == self.worker_id:
+            await self.local.send(channel, message)
+        elif owner is not None:
+            await self.backend.send(
+                "hybrid.worker.%s" % owner, {"type": "hybrid.deliver", "channel": channel, "message": message}
+            )
+        else:
+            await self.backend.send(channel, message)
+
+    async def receive(self, channel):
+        self._ensure_pump()
+        if self._owner(channel) == self.worker_id:
+            return await self.local.receive(channel)
+        return await self.backend.receive(channel)
+
+    async def new_channel(self, prefix="specific"):
+        return "%s.hybrid-%s!%s" % (
+            prefix, self.worker_id, "".join(random.choice(string.ascii_letters) for _ in range(12))
+        )
+
+    # ---------- Groups extension ----------
+    async def group_add(self, group, channel):
+        assert self.valid_group_name(group), "Group name not valid"
+        self._ensure_pump()
+        await self.local.group_add(group, channel)
+        if group not in self.joined:
+            self.joined.add(group)
+            await self.backend.group_add(group, self.inbox)
+            await self._announce(group, reply=True)
+
+    async def group_discard(self, group, channel):
+        await self.local.group_discard(group, channel)
+        if group not in self.local.groups and group in self.joined:
+            await self._leave(group)
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), "Message is not a dict"
+        assert self.valid_group_name(group), "Invalid group name"
+        await self.local.group_send(group, message)
+        # Without a local member we hold no map of the group's workers (we never announced
+        # ourselves there): the backend is the only way to reach them
+        if group not in self.joined or self._remote_workers(group):
+            LAYER_GROUP_SENDS.inc(layer="hybrid", route="remote")
+            await self.backend.group_send(
+                group, {"type": "hybrid.group", "group": group, "origin": self.worker_id, "message": message}
+            )
+        else:
+            LAYER_GROUP_SENDS.inc(layer="hybrid", route="local")
+
+    # ---------- Flush extension ----------
+    async def flush(self):
+        await self.local.flush()
+        self.remote = {}
+        self.joined = set()
+        if hasattr(self.backend, "flush"):
+            await self.backend.flush()
+
+    async def close(self):
+        pump, self._pump = self._pump, None
+        if pump is not None:
+            pump.cancel()
+        if hasattr(self.backend, "close"):
+            await self.backend.close()
+
+    # ---------- internals ----------
+    def _owner(self, channel: str):
+        """Worker id for channels minted by a RoomAffinityChannelLayer, else None."""
+        head, sep, _ = channel.partition("!")
+        if not sep:
+            return None
+        _, _, tail = head.rpartition(".")
+        return tail[len("hybrid-"):] if tail.startswith("hybrid-") else None
+
+    def _remote_workers(self, group: str):
+        workers = self.remote.get(group)
+        if not workers:
+            return ()
+        cutoff = time.monotonic() - self.remote_ttl
+        for worker in [w for w, seen in workers.items() if seen < cutoff]:
+            del workers[worker]
+        if not workers:
+            del self.remote[group]
+        return workers
+
+    async def _announce(self, group: str, reply: bool):
+        await self.backend.group_send(
+            group, {"type": "hybrid.join", "group": group, "worker": self.worker_id, "reply": reply}
+        )
+
+    async def _leave(self, group: str):
+        self.joined.discard(group)
+        await self.backend.group_discard(group, self.inbox)
+        await self.backend.group_send(group, {"type": "hybrid.leave", "group": group, "worker": self.worker_id})
+        self.remote.pop(group, None)
+
+    def _ensure_pump(self):
+        if self._pump is None or self._pump.done():
+            self._pump = asyncio.ensure_future(self._run_pump())
+
+    async def _run_pump(self):
+        """Drain this worker's backend inbox and re-announce local groups periodically."""
+        next_announce = time.monotonic() + self.announce_interval
+        while True:
+            timeout = max(0.0, next_announce - time.monotonic())
+            try:
+                message = await asyncio.wait_for(self.backend.receive(self.inbox), timeout)
+            except asyncio.TimeoutError:
+                next_announce = time.monotonic() + self.announce_interval
+                await self._refresh()
+                continue
+            try:
+                await self._handle(message)
+            except Exception:
+                # one malformed control message must not stop cross-worker delivery
+                continue
+
+    async def _refresh(self):
+        for group in tuple(self.joined):
+            if group in self.local.groups:
+                # also renews the backend's own group membership expiry
+                await self.backend.group_add(group, self.inbox)
+                await self._announce(group, reply=False)
+            else:
+                # members expired locally (LocalChannelLayer._forget) without a discard
+                await self._leave(group)
+
+    async def _handle(self, message: Dict[str, Any]):
+        kind = message.get("type")
+        group = message.get("group")
+        worker = message.get("worker")
+        if kind == "hybrid.deliver":
+            try:
+                await self.local.send(message["channel"], message["message"])
+            except ChannelFull:
+                pass
+        elif kind == "hybrid.group":
+            if message.get("origin") != self.worker_id:
+                await self.local.group_send(group, message["message"])
+        elif worker == self.worker_id:
+            return
+        elif kind in ("hybrid.join", "hybrid.here"):
+            self.remote.setdefault(group, {})[worker] = time.monotonic()
+            if kind == "hybrid.join" and message.get("reply") and group in self.local.groups:
+                await self.backend.send(
+                    "hybrid.worker.%s" % worker, {"type": "hybrid.here", "group": group, "worker": self.worker_id}
+                )
+        elif kind == "hybrid.leave":
+            workers = self.remote.get(group)
+            if workers is not None:
+                workers.pop(worker, None)
+                if not workers:
+                    del self.remote[group]
@@ -0,0 +1,248 @@
+# backend/realtime/management/commands/realtime_bench.py
+"""
+Websocket load generator / latency benchmark for ProjectConsumer and GameConsumer.
+
+    # in-process (WebsocketCommunicator against config.asgi.application)
+    python manage.py realtime_bench --rooms 4 --peers 5 --games 2 --players 6 --duration 20
+
+    # real sockets against a local daphne (same settings / DB as the server)
+    python manage.py realtime_bench --url ws://127.0.0.1:8000 --server-pid $(pgrep -f daphne)
+
+    # same load over the binary subprotocol (compare the wire totals with the JSON run)
+    python manage.py realtime_bench --codec msgpack
+
+Simulates R project rooms x P peers sending cursor / node_move / text_edit / chat and
+G game sessions x N players sending move / place_block, then reports per-type
+throughput, p50/p99 end-to-end fan-out latency and worker CPU.
+"""
+import asyncio
+import json
+import time
+from uuid import uuid4
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from projects.models import Project
+from realtime.bench import LatencyStats, cpu_seconds, every, make_client
+from realtime.codec import CODECS
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Load-test the realtime websocket consumers and report throughput / latency / CPU."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rooms", type=int, default=2, help="Project rooms (R)")
+        parser.add_argument("--peers", type=int, default=5, help="Peers per project room (P)")
+        parser.add_argument("--games", type=int, default=1, help="Game sessions (G)")
+        parser.add_argument("--players", type=int, default=4, help="Players per game session")
+        parser.add_argument("--duration", type=float, default=10.0, help="Seconds of traffic")
+        parser.add_argument("--url", default="", help="ws://host:port of a running server; in-process if omitted")
+        parser.add_argument("--server-pid", type=int, default=None, help="Server PID to sample CPU from (--url mode)")
+        parser.add_argument("--cursor-hz", type=float, default=20.0)
+        parser.add_argument("--node-move-hz", type=float, default=10.0)
+        parser.add_argument("--text-edit-hz", type=float, default=1.0)
+        parser.add_argument("--chat-hz", type=float, default=0.2)
+        parser.add_argument("--game-move-hz", type=float, default=20.0)
+        parser.add_argument("--place-hz", type=float, default=2.0)
+        parser.add_argument("--codec", choices=["json", "msgpack", "cbor"], default="json",
+                            help="Wire format (binary codecs are negotiated as a websocket subprotocol)")
+        parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+        parser.add_argument("--keep", action="store_true", help="Keep the bench users/projects afterwards")
+
+    # ---------- fixtures ----------
+    def _make_rooms(self, rooms, peers):
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        tag = uuid4().hex[:6]
+        out = []
+        for r in range(rooms):
+            members = []
+            for p in range(peers):
+                user = User.objects.create(username=f"bench_{tag}_{r}_{p}")
+                user.set_unusable_password()
+                user.save(update_fields=["password"])
+                members.append((user.id, str(AccessToken.for_user(user))))
+            owner = User.objects.get(id=members[0][0])
+            project = Project.objects.create(user=owner, name=f"bench-{tag}-{r}")
+            others = [uid for uid, _ in members[1:]]
+            project.editors.add(*others)
+            project.shared_with.add(*others)
+            out.append((project.id, members))
+        return tag, out
+
+    def _cleanup(self, tag):
+        User.objects.filter(username__startswith=f"bench_{tag}_").delete()
+
+    # ---------- simulated clients ----------
+    async def _project_peer(self, opts, app, stats, stop, project_id, uid, token, idx):
+        client = make_client(opts["url"], app, f"/ws/projects/{project_id}/?token={token}", codec=opts["codec_obj"])
+        if not await client.connect():
+            stats.mark_received("connect_failed", idx)
+            return
+        path = f"bench/{uid}.py"
+        counter = {"n": 0}
+
+        async def reader():
+            while True:
+                msg = await client.recv()
+                if msg is None:
+                    return
+                t, d = msg.get("type"), msg.get("data") or {}
+                if t == "cursor" and msg.get("peer_id") != uid:
+                    stats.mark_received("cursor", (msg.get("peer_id"), d.get("x")))
+                elif t == "node_move" and d.get("by") != uid:
+                    stats.mark_received("node_move", (d.get("path"), d.get("x")))
+                elif t == "text_edit" and d.get("by") != uid:
+                    stats.mark_received("text_edit", (d.get("path"), d.get("content")))
+                elif t == "chat" and (d.get("user") or {}).get("id") != uid:
+                    stats.mark_received("chat", d.get("text"))
+
+        def nxt():
+            counter["n"] += 1
+            return counter["n"]
+
+        async def cursor():
+            x = float(nxt())
+            stats.mark_sent("cursor", (uid, x))
+            await client.send({"type": "cursor", "x": x, "y": 0.0})
+
+        async def node_move():
+            x = float(nxt())
+            stats.mark_sent("node_move", (path, x))
+            await client.send({"type": "node_move", "path": path, "x": x, "y": 0.0})
+
+        async def text_edit():
+            content = f"# rev {nxt()}\n" + "x = 1\n" * 40
+            stats.mark_sent("text_edit", (path, content))
+            await client.send({"type": "text_edit", "path": path, "content": content})
+
+        async def chat():
+            text = f"bench {uid} {nxt()}"
+            stats.mark_sent("chat", text)
+            await client.send({"type": "chat", "text": text})
+
+        read_task = asyncio.ensure_future(reader())
+        await asyncio.gather(
+            every(opts["cursor_hz"], stop, cursor),
+            every(opts["node_move_hz"], stop, node_move),
+            every(opts["text_edit_hz"], stop, text_edit),
+            every(opts["chat_hz"], stop, chat),
+        )
+        await asyncio.sleep(0.5)  # let in-flight frames land
+        read_task.cancel()
+        await client.close()
+        stats.add_wire(client)
+
+    async def _game_player(self, opts, app, stats, stop, session, idx):
+        client = make_client(opts["url"], app, f"/ws/game/{session}/", codec=opts["codec_obj"])
+        if not await client.connect():
+            stats.mark_received("connect_failed", idx)
+            return
+        welcome = await client.recv()
+        if not welcome or welcome.get("type") != "welcome":
+            stats.mark_received("connect_failed", idx)
+            return
+        me = welcome["you"]["id"]
+        state = {"n": 0}
+
+        async def reader():
+            while True:
+                msg = await client.recv()
+                if msg is None:
+                    return
+                t = (msg.get("type") or "").replace(".", "_")
+                if t == "player_move" and msg["player"]["id"] != me:
+                    pos = msg.get("pos") or {}
+                    stats.mark_received("move", (msg["player"]["id"], pos.get("x"), pos.get("z")))
+                elif t == "block_place" and msg["player"]["id"] != me:
+                    b = msg.get("block") or {}
+                    stats.mark_received("place_block", (b.get("x"), b.get("y"), b.get("z")))
+
+        async def move():
+            state["n"] += 1
+            x, z = (state["n"] % 4000) * 0.25, float(idx)
+            stats.mark_sent("move", (me, x, z))
+            await client.send({"type": "move", "x": x, "y": 40.0, "z": z})
+
+        async def place():
+            state["n"] += 1
+            x, y, z = state["n"] % 64, 40 + idx, idx
+            stats.mark_sent("place_block", (x, y, z))
+            await client.send({"type": "place_block", "x": x, "y": y, "z": z, "block": 3})
+
+        read_task = asyncio.ensure_future(reader())
+        await asyncio.gather(every(opts["game_move_hz"], stop, move), every(opts["place_hz"], stop, place))
+        await asyncio.sleep(0.5)
+        read_task.cancel()
+        await client.close()
+        stats.add_wire(client)
+
+    async def _run(self, opts, rooms):
+        app = None
+        if not opts["url"]:
+            from config.asgi import application as app
+
+        stats, stop = LatencyStats(), asyncio.Event()
+        tasks = []
+        for project_id, members in rooms:
+            for i, (uid, token) in enumerate(members):
+                tasks.append(self._project_peer(opts, app, stats, stop, project_id, uid, token, i))
+        for g in range(opts["games"]):
+            session = f"bench-{uuid4().hex[:6]}-{g}"
+            for i in range(opts["players"]):
+                tasks.append(self._game_player(opts, app, stats, stop, session, i))
+
+        # Rates and CPU cover the traffic window only, not connect / teardown
+        runner = asyncio.gather(*tasks)
+        cpu0, wall0 = cpu_seconds(opts["server_pid"]), time.perf_counter()
+        await asyncio.sleep(opts["duration"])
+        stop.set()
+        wall = time.perf_counter() - wall0
+        cpu = cpu_seconds(opts["server_pid"]) - cpu0
+        await runner
+        return stats, wall, cpu
+
+    def handle(self, *args, **opts):
+        opts["codec_obj"] = None
+        if opts["codec"] != "json":
+            opts["codec_obj"] = CODECS.get(f"rt.{opts['codec']}.v1")
+            if opts["codec_obj"] is None:
+                self.stderr.write(f"{opts['codec']} is not installed")
+                return
+        tag, rooms = self._make_rooms(opts["rooms"], opts["peers"]) if opts["rooms"] else ("", [])
+        try:
+            stats, wall, cpu = asyncio.run(self._run(opts, rooms))
+        finally:
+            if tag and not opts["keep"]:
+                self._cleanup(tag)
+
+        report = {
+            "mode": "socket" if opts["url"] else "in-process",
+            "codec": opts["codec"],
+            "duration_s": round(wall, 2),
+            "cpu_s": round(cpu, 2),
+            # in-process mode: CPU includes the simulated clients themselves
+            "cpu_pct": round(100.0 * cpu / wall, 1) if wall else 0,
+            "types": stats.summary(wall),
+            # client-side totals over the whole run (handshake snapshots included)
+            "wire_kb_in": round(stats.bytes_in / 1024, 1),
+            "wire_kb_out": round(stats.bytes_out / 1024, 1),
+        }
+        if opts["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(
+            f"{report['mode']} ({report['codec']}): {report['duration_s']}s, "
+            f"worker CPU {report['cpu_s']}s ({report['cpu_pct']}%), "
+            f"wire in {report['wire_kb_in']} KiB / out {report['wire_kb_out']} KiB"
+        )
+        self.stdout.write(f"{'type':<14}{'sent':>8}{'recv':>9}{'recv/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+        for kind, row in report["types"].items():
+            self.stdout.write(
+                f"{kind:<14}{row['sent']:>8}{row['received']:>9}{row['recv_per_sec']:>10}"
+                f"{str(row['p50_ms']):>10}{str(row['p99_ms']):>10}"
+            )
@@ -0,0 +1,170 @@
+# /backend/realtime/metrics.py
+"""
+Tiny in-process metrics registry for the websocket tier, rendered in the Prometheus
+text format by realtime.views.metrics_view (no client library needed).
+
+Values are per process, like the rest of the realtime state: scrape every ASGI worker.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Tuple
+
+LabelValues = Tuple[str, ...]
+
+_LOCK = threading.Lock()
+REGISTRY: List["_Metric"] = []
+
+# Latency buckets (seconds) and size buckets (sockets / frames)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, doc: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.doc = doc
+        self.labels = tuple(labels)
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(n, "")) for n in self.labels)
+
+    def render(self) -> List[str]:
+        out = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+        out.extend(self._samples())
+        return out
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with _LOCK:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self):
+        with _LOCK:
+            items = list(self._values.items())
+        return [f"{self.name}{_fmt_labels(self.labels, k)} {v}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """Gauge whose samples come from a callback at scrape time: fn() -> {label values: value}."""
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._callbacks: List[Callable[[], Dict[LabelValues, float]]] = []
+
+    def set_function(self, fn: Callable[[], Dict[LabelValues, float]]):
+        self._callbacks.append(fn)
+
+    def _samples(self):
+        out = []
+        for fn in self._callbacks:
+            try:
+                values = fn()
+            except Exception:
+                continue
+            out.extend(f"{self.name}{_fmt_labels(self.labels, k)} {v}" for k, v in values.items())
+        return out
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, doc, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, doc, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [bucket counts..., +Inf count, sum]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with _LOCK:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+            row[-2] += 1
+            row[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self):
+        with _LOCK:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        out = []
+        for key, row in items:
+            for bound, count in zip(self.buckets, row):
+                le = 'le="%s"' % bound
+                out.append(f"{self.name}_bucket{_fmt_labels(self.labels, key, le)} {count}")
+            le = 'le="+Inf"'
+            out.append(f"{self.name}_bucket{_fmt_labels(self.labels, key, le)} {row[-2]}")
+            out.append(f"{self.name}_count{_fmt_labels(self.labels, key)} {row[-2]}")
+            out.append(f"{self.name}_sum{_fmt_labels(self.labels, key)} {row[-1]}")
+        return out
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ---------- Websocket tier metrics (consumer = "project" | "game") ----------
+CONNECTS = Counter("realtime_connects_total", "Accepted websocket connections.", ("consumer",))
+REJECTS = Counter("realtime_rejects_total", "Connections refused at connect, by close code.", ("consumer", "code"))
+DISCONNECTS = Counter("realtime_disconnects_total", "Websocket disconnects, by close code.", ("consumer", "code"))
+MESSAGES = Counter("realtime_messages_total", "Client messages received, by type.", ("consumer", "type"))
+RATE_LIMITED = Counter("realtime_rate_limited_total", "Client messages dropped by rate limiting.", ("consumer", "type"))
+MOVES_REJECTED = Counter("realtime_moves_rejected_total", "Game moves refused by the server-side checks, by reason.",
+                         ("consumer", "reason"))
+FANOUT = Histogram("realtime_group_send_fanout", "Local sockets in the group at group_send time.",
+                   ("consumer",), buckets=SIZE_BUCKETS)
+GROUP_SEND_SECONDS = Histogram("realtime_group_send_seconds", "Time spent in channel_layer.group_send.", ("consumer",))
+SEND_SECONDS = Histogram("realtime_send_seconds", "Time one outbound frame spent in the socket's send().",
+                         ("consumer",))
+SEND_QUEUE_DEPTH = Histogram("realtime_send_queue_depth", "Per-socket outbound queue depth after each enqueue.",
+                             ("consumer",), buckets=SIZE_BUCKETS)
+SEND_COALESCED = Counter("realtime_send_coalesced_total", "Outbound frames replaced by a newer latest-wins frame.",
+                         ("consumer",))
+ROOMS = Gauge("realtime_rooms", "Rooms / sessions with at least one local socket.", ("consumer",))
+PEERS = Gauge("realtime_peers", "Peers (users / players) present in local rooms.", ("consumer",))
+SPECTATORS = Gauge("realtime_spectators", "Read-only spectator sockets in local rooms.", ("consumer",))
+
+
+def message_label(kind, known: Iterable[str]) -> str:
+    """Bound label cardinality: client-supplied types outside `known` become "other"."""
+    return kind if kind in known else "other"
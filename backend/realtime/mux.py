@@ -0,0 +1,227 @@
+# /backend/realtime/mux.py
+"""
+Multiplexed project socket: many project rooms over one websocket.
+
+    ws://<host>/ws/projects/mux/?token=<JWT>[&rooms=12,15]
+
+The socket is authenticated once and counts once against REALTIME_MAX_CONN_PER_USER.
+Rooms are joined / left with control frames and every room frame carries a "room" key
+(the per-room envelope):
+
+  client -> {"type": "join", "room": 12, "epoch"?: "...", "last_seq"?: N, "snapshot"?: 1, "mode"?: "spectate"}
+            {"type": "leave", "room": 12}
+            {"type": "<any ProjectConsumer type>", "room": 12, ...}
+  server -> {"type": "mux_ready", "max_rooms": N}
+            {"type": "<any ProjectConsumer frame>", "room": 12, ...}
+            {"type": "room_closed", "room": 12, "code": 4403}   (rejected, left, ...)
+
+Each joined room runs the regular ProjectConsumer logic (access check, presence, caps,
+resume) through MuxRoom, with its socket I/O redirected to the mux socket. Rate limits
+are per socket: all rooms draw on the same buckets.
+"""
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, urlencode
+
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+
+from . import metrics
+from .codec import CodecMixin
+from .consumers import (
+    REALTIME_MAX_CONN_PER_USER, REALTIME_RATE_LIMITS, USER_CONN_COUNTS, USER_CONN_LOCK, ProjectConsumer,
+)
+from .ratelimit import CLOSE_RATE_LIMITED, RateLimitMixin
+from .sendqueue import CLOSE_LAGGING, OutboxMixin
+
+REALTIME_MUX_MAX_ROOMS = getattr(settings, "REALTIME_MUX_MAX_ROOMS", 16)
+
+
+class MuxRoom(ProjectConsumer):
+    """One project room inside a ProjectMuxConsumer. Not an ASGI app of its own."""
+
+    def __init__(self, mux: "ProjectMuxConsumer", project_id: int, join: Dict[str, Any]):
+        self.mux = mux
+        self.room_id = project_id
+        self.groups = []
+        self.channel_layer = mux.channel_layer
+        self.channel_name = mux.channel_name
+        self.closed = False
+        resume = {k: join[k] for k in ("epoch", "last_seq", "snapshot", "mode") if join.get(k) is not None}
+        self.scope = dict(
+            mux.scope,
+            url_route={"args": (), "kwargs": {"project_id": str(project_id)}},
+            query_string=urlencode(resume).encode("utf-8"),
+        )
+
+    # The mux socket is already accepted, owns the outbox and the per-user slot
+    async def accept(self, subprotocol=None, headers=None):
+        pass
+
+    def start_outbox(self):
+        pass
+
+    async def stop_outbox(self):
+        pass
+
+    async def _claim_user_slot(self) -> bool:
+        return True
+
+    # One budget per socket, however many rooms it has joined
+    async def allow_message(self, kind) -> bool:
+        return await self.mux.allow_message(kind)
+
+    async def send_json(self, content, close=False):
+        await self.mux.send_json({**content, "room": self.room_id})
+
+    async def enqueue(self, frame, key=None):
+        await self.mux.enqueue({**frame, "room": self.room_id}, None if key is None else (self.room_id, key))
+
+    async def close(self, code=None, reason=None):
+        if code in (CLOSE_RATE_LIMITED, CLOSE_LAGGING):
+            # socket-level conditions: drop the whole connection
+            await self.mux.close(code=code)
+            return
+        await self.mux.drop_room(self, code)
+
+
+class ProjectMuxConsumer(CodecMixin, RateLimitMixin, OutboxMixin, AsyncJsonWebsocketConsumer):
+    rate_limits = REALTIME_RATE_LIMITS
+    metrics_label = "mux"
+    # Room frames are rate limited here too (MuxRoom.allow_message)
+    message_types = frozenset({"join", "leave"}) | ProjectConsumer.message_types
+
+    _conn_counted: bool = False
+
+    async def connect(self):
+        user = self.scope.get("user", AnonymousUser())
+        self.rooms: Dict[int, MuxRoom] = {}
+        self.rooms_by_group: Dict[str, MuxRoom] = {}
+
+        if not user or isinstance(user, AnonymousUser) or not user.is_authenticated:
+            await self.accept()
+            await self.send_json({"type": "error", "code": "unauthorized", "message": "Authentication required."})
+            metrics.REJECTS.inc(consumer="mux", code=4401)
+            await self.close(code=4401)
+            return
+        self.uid = int(user.id)
+
+        async with USER_CONN_LOCK:
+            current = USER_CONN_COUNTS.get(self.uid, 0)
+            if current >= REALTIME_MAX_CONN_PER_USER:
+                await self.accept()
+                await self.send_json({
+                    "type": "error",
+                    "code": "too_many_tabs",
+                    "message": "Too many concurrent connections.",
+                    "limit": REALTIME_MAX_CONN_PER_USER,
+                })
+                metrics.REJECTS.inc(consumer="mux", code=4002)
+                await self.close(code=4002)
+                return
+            USER_CONN_COUNTS[self.uid] = current + 1
+            self._conn_counted = True
+
+        await self.accept()
+        self.start_outbox()
+        metrics.CONNECTS.inc(consumer="mux")
+        await self.enqueue({"type": "mux_ready", "max_rooms": REALTIME_MUX_MAX_ROOMS})
+
+        # Rooms requested in the URL are joined right away (no extra round-trip)
+        qs = parse_qs(self.scope.get("query_string", b"").decode("utf-8"))
+        for raw in ",".join(qs.get("rooms", [])).split(","):
+            if raw.strip():
+                await self._join({"type": "join", "room": raw.strip()})
+
+    async def disconnect(self, code):
+        await self.stop_outbox()
+        metrics.DISCONNECTS.inc(consumer="mux", code=code)
+        for room in list(getattr(self, "rooms", {}).values()):
+            room.closed = True
+            try:
+                await room.disconnect(code)
+            except Exception:
+                pass
+        self.rooms, self.rooms_by_group = {}, {}
+
+        try:
+            if self._conn_counted:
+                async with USER_CONN_LOCK:
+                    if self.uid in USER_CONN_COUNTS:
+                        USER_CONN_COUNTS[self.uid] = max(0, USER_CONN_COUNTS[self.uid] - 1)
+                        if USER_CONN_COUNTS[self.uid] == 0:
+                            USER_CONN_COUNTS.pop(self.uid, None)
+        except Exception:
+            pass
+
+    # ---------- Frontend -> Server ----------
+    async def receive_json(self, content, **kwargs):
+        t = content.get("type")
+        if t == "join":
+            if await self.allow_message(t):
+                metrics.MESSAGES.inc(consumer="mux", type=t)
+                await self._join(content)
+            return
+        if t == "leave":
+            if await self.allow_message(t):
+                metrics.MESSAGES.inc(consumer="mux", type=t)
+                room = self.rooms.get(self._room_id(content))
+                if room is not None:
+                    await self.drop_room(room, 1000)
+            return
+
+        # Room traffic: handled by MuxRoom / ProjectConsumer, against this socket's rate limits
+        room_id = self._room_id(content)
+        room = self.rooms.get(room_id)
+        if room is None:
+            await self.enqueue({"type": "error", "code": "not_joined", "room": room_id,
+                                  "message": "Join the room first."})
+            return
+        await room.receive_json(content)
+
+    async def _join(self, content: Dict[str, Any]):
+        room_id = self._room_id(content)
+        if room_id is None:
+            return
+        if room_id in self.rooms:
+            return
+        if len(self.rooms) >= REALTIME_MUX_MAX_ROOMS:
+            await self.enqueue({
+                "type": "error",
+                "code": "too_many_rooms",
+                "room": room_id,
+                "message": "Too many rooms on one connection.",
+                "limit": REALTIME_MUX_MAX_ROOMS,
+            })
+            return
+        room = MuxRoom(self, room_id, content)
+        self.rooms[room_id] = room
+        self.rooms_by_group[f"proj_{room_id}"] = room
+        await room.connect()
+
+    async def drop_room(self, room: MuxRoom, code: Optional[int]):
+        if room.closed:
+            return
+        room.closed = True
+        self.rooms.pop(room.room_id, None)
+        self.rooms_by_group.pop(f"proj_{room.room_id}", None)
+        await room.disconnect(code)
+        await self.enqueue({"type": "room_closed", "room": room.room_id, "code": code})
+
+    @staticmethod
+    def _room_id(content: Dict[str, Any]) -> Optional[int]:
+        try:
+            return int(content.get("room"))
+        except (TypeError, ValueError):
+            return None
+
+    # ---------- Server -> Clients ----------
+    async def broadcast(self, event):
+        room = self.rooms_by_group.get(event.get("group"))
+        if room is not None:
+            await room.broadcast(event)
+
+    async def spectate_batch(self, event):
+        room = self.rooms_by_group.get(event.get("group"))
+        if room is not None and room.spectator:
+            await room.spectate_batch(event)
@@ -0,0 +1,123 @@
+# /backend/realtime/ratelimit.py
+"""
+Per-socket, per-message-type token buckets for the websocket consumers.
+
+Each socket gets its own buckets, configured as {type: (rate_per_sec, burst)} with an
+optional "*" entry for every other type. Types the consumer knows (`message_types`) get a
+"*" bucket each; anything else the client makes up shares a single one, so the bucket
+count stays bounded. Messages over budget are dropped silently.
+Drops are tallied per window: past `warn_after` the client gets one
+{"type": "warning", "code": "rate_limited"} frame, past `close_after` the socket is
+closed with 4429.
+"""
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.conf import settings
+
+from . import metrics
+
+REALTIME_RATE_LIMIT_WINDOW = getattr(settings, "REALTIME_RATE_LIMIT_WINDOW", 10)
+REALTIME_RATE_LIMIT_WARN_AFTER = getattr(settings, "REALTIME_RATE_LIMIT_WARN_AFTER", 50)
+REALTIME_RATE_LIMIT_CLOSE_AFTER = getattr(settings, "REALTIME_RATE_LIMIT_CLOSE_AFTER", 200)
+
+# Close code for sustained abuse
+CLOSE_RATE_LIMITED = 4429
+
+OK, DROP, WARN, CLOSE = "ok", "drop", "warn", "close"
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "stamp")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = self.burst
+        self.stamp = time.monotonic()
+
+    def take(self, n: float = 1.0) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if self.tokens >= n:
+            self.tokens -= n
+            return True
+        return False
+
+
+class RateLimiter:
+    def __init__(self, limits: Dict[str, Tuple[float, float]],
+                 window: float = REALTIME_RATE_LIMIT_WINDOW,
+                 warn_after: int = REALTIME_RATE_LIMIT_WARN_AFTER,
+                 close_after: int = REALTIME_RATE_LIMIT_CLOSE_AFTER,
+                 known: Iterable[str] = ()):
+        self.limits = limits
+        self.known = frozenset(known)
+        self.window = float(window)
+        self.warn_after = int(warn_after)
+        self.close_after = int(close_after)
+        self._buckets: Dict[str, Optional[TokenBucket]] = {}
+        self._window_start = time.monotonic()
+        self._drops = 0
+        self._warned = False
+
+    def _bucket(self, kind: str) -> Optional[TokenBucket]:
+        if kind not in self.limits and kind not in self.known:
+            kind = "*"
+        if kind not in self._buckets:
+            spec = self.limits.get(kind, self.limits.get("*"))
+            self._buckets[kind] = TokenBucket(*spec) if spec else None
+        return self._buckets[kind]
+
+    def check(self, kind: str) -> str:
+        """OK to process; DROP silently; WARN (drop + tell client once); CLOSE (sustained abuse)."""
+        bucket = self._bucket(kind)
+        if bucket is None or bucket.take():
+            return OK
+
+        now = time.monotonic()
+        if now - self._window_start > self.window:
+            self._window_start, self._drops, self._warned = now, 0, False
+        self._drops += 1
+        if self._drops >= self.close_after:
+            return CLOSE
+        if self._drops >= self.warn_after and not self._warned:
+            self._warned = True
+            return WARN
+        return DROP
+
+
+class RateLimitMixin:
+    """
+    For AsyncJsonWebsocketConsumer subclasses: set `rate_limits`, then at the top of
+    receive_json do `if not await self.allow_message(kind): return`.
+    """
+    rate_limits: Dict[str, Tuple[float, float]] = {}
+    _limiter: Optional[RateLimiter] = None
+    _rate_closed: bool = False
+
+    async def allow_message(self, kind) -> bool:
+        if self._rate_closed:
+            return False
+        if self._limiter is None:
+            self._limiter = RateLimiter(self.rate_limits, known=getattr(self, "message_types", ()))
+        verdict = self._limiter.check(str(kind))
+        if verdict == OK:
+            return True
+        metrics.RATE_LIMITED.inc(
+            consumer=getattr(self, "metrics_label", ""),
+            type=metrics.message_label(kind, getattr(self, "message_types", ())),
+        )
+        if verdict == WARN:
+            # Behind the frames already queued for this socket, if it has an outbox
+            notify = getattr(self, "enqueue", self.send_json)
+            await notify({
+                "type": "warning",
+                "code": "rate_limited",
+                "message": "Too many messages; some were dropped.",
+            })
+        elif verdict == CLOSE:
+            self._rate_closed = True
+            await self.close(code=CLOSE_RATE_LIMITED)
+        return False
@@ -0,0 +1,115 @@
+# /backend/realtime/replay.py
+"""
+Per-room event sequencing so dropped sockets can resume instead of reloading.
+
+Every durable room event gets the next `seq` of its room and is kept in a bounded
+ring buffer. A reconnecting client presents the room `epoch` and its `last_seq`;
+if nothing it missed has been evicted (by size or age) it gets just the missed
+events, otherwise the caller falls back to a full snapshot.
+
+State is per process, like PRESENCE / CHAT_HISTORY in consumers.py: each worker numbers the
+events it broadcasts on its own, so every stamped payload also carries the `epoch` of the
+buffer that numbered it. A seq only means something next to its epoch.
+
+Events stamped by other workers reach this one through the channel layer while it has
+members in the room; record() keeps them in the same ring, in arrival order, so a resume
+replays them too (clients drop the ones they already had: seqs only grow per epoch).
+While the worker has no member in the room it receives nothing (blind()), so a resume
+whose gap covers such a stretch falls back to the snapshot, as does a reconnect that
+lands on another worker (another epoch).
+"""
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+# Ephemeral events are fanned out without a seq and never replayed:
+# a stale cursor or WebRTC handshake is useless (or harmful) after a reconnect.
+EPHEMERAL_TYPES = frozenset({"cursor", "rtc_offer", "rtc_answer", "rtc_ice", "rtc_hangup"})
+
+# Other workers' epochs whose highest recorded seq we remember (per room)
+MAX_FOREIGN_EPOCHS = 64
+
+
+class ReplayBuffer:
+    def __init__(self, maxlen: int, max_age: float):
+        self.epoch = uuid4().hex[:12]  # changes whenever the buffer is recreated
+        self.seq = 0
+        self.maxlen = max(1, int(maxlen))
+        self.max_age = float(max_age)
+        self.last_activity = time.monotonic()
+        # (position, monotonic ts, payload, our seq or 0 for other workers' events)
+        self._events: Deque[Tuple[int, float, Dict[str, Any], int]] = deque()
+        self._pos = 0  # position of the newest event recorded, ours or not
+        # Position (and our seq, 0 if not ours) of the newest event no longer available
+        self._floor = 0
+        self._floor_seq = 0
+        # Position when the worker last stopped receiving the room's events (None = never)
+        self._blind_from: Optional[int] = None
+        # epoch -> highest seq of that worker recorded here
+        self._foreign: "OrderedDict[str, int]" = OrderedDict()
+
+    def _append(self, payload: Dict[str, Any], seq: int):
+        now = time.monotonic()
+        self.last_activity = now
+        self._pos += 1
+        if len(self._events) >= self.maxlen:
+            self._evict()
+        self._events.append((self._pos, now, payload, seq))
+
+    def stamp(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Return the payload with the next seq (and our epoch) attached, and remember it for replay."""
+        self.last_activity = time.monotonic()
+        if payload.get("type") in EPHEMERAL_TYPES:
+            return payload
+
+        self.seq += 1
+        stamped = {**payload, "seq": self.seq, "epoch": self.epoch}
+        self._append(stamped, self.seq)
+        return stamped
+
+    def record(self, payload: Dict[str, Any]):
+        """Keep a stamped event of another worker delivered here (each one once, whichever socket saw it)."""
+        epoch, seq = payload.get("epoch"), payload.get("seq")
+        if not seq or not epoch or epoch == self.epoch or seq <= self._foreign.get(epoch, 0):
+            return
+        self._foreign[epoch] = seq
+        self._foreign.move_to_end(epoch)
+        while len(self._foreign) > MAX_FOREIGN_EPOCHS:
+            self._foreign.popitem(last=False)
+        self._append(payload, 0)
+
+    def blind(self):
+        """The worker's last member left the room: other workers' events stop arriving here."""
+        self._blind_from = self._pos
+
+    def since(self, epoch: Optional[str], last_seq: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Events recorded after our event `last_seq`, oldest first (other workers' ones included).
+        None if the client is from another epoch, ahead of us, or part of the gap is missing.
+        """
+        if epoch != self.epoch or last_seq < 0 or last_seq > self.seq:
+            return None
+        self._expire()
+        if last_seq == 0:
+            start = 0
+        elif last_seq == self._floor_seq:
+            start = self._floor  # the client has everything evicted so far
+        else:
+            start = next((pos for pos, _, _, seq in self._events if seq == last_seq), -1)
+        if start < self._floor:
+            return None
+        if self._blind_from is not None and self._blind_from >= start:
+            return None
+        return [p for pos, _, p, _ in self._events if pos > start]
+
+    def idle_for(self) -> float:
+        return time.monotonic() - self.last_activity
+
+    def _evict(self):
+        self._floor, _, _, self._floor_seq = self._events.popleft()
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.max_age
+        while self._events and self._events[0][1] < cutoff:
+            self._evict()
@@ -0,0 +1,75 @@
+# /backend/realtime/roomcache.py
+"""
+Per-room cache for the project join path.
+
+Warmed by the first peer that joins a room, then kept current by the room's own events,
+so later joins need no database round-trip:
+  - acl:    who may join (one load per REALTIME_ROOM_ACL_TTL seconds, dropped early by
+            realtime.signals when the project or its sharing changes)
+  - shapes: the live shapes list; shape_op / shape_ops / shape_commit are applied to it
+            and bump `shapes_version`. `shapes_token` names the copy last published to
+            (or adopted from) the other workers, see _cached_shapes in consumers.py
+"""
+import time
+from typing import Any, Dict, List, Optional
+
+ROLE_OWNER, ROLE_EDITOR, ROLE_VIEWER = "owner", "editor", "viewer"
+
+
+class RoomAcl:
+    __slots__ = ("exists", "open", "members", "loaded_at")
+
+    def __init__(self, exists: bool, open_: bool, members: Dict[int, str]):
+        self.exists = exists
+        self.open = open_            # membership could not be determined: anyone may join
+        self.members = members       # uid -> role
+        self.loaded_at = time.monotonic()
+
+    def role(self, uid: int) -> Optional[str]:
+        if not self.exists:
+            return None
+        if uid in self.members:
+            return self.members[uid]
+        return ROLE_EDITOR if self.open else None
+
+
+class RoomCache:
+    def __init__(self):
+        self.acl: Optional[RoomAcl] = None
+        self.shapes: Optional[List[Dict[str, Any]]] = None   # None = not loaded yet
+        self.shapes_version = 0
+        self.shapes_token: Optional[str] = None
+        self.touched = time.monotonic()
+
+    def acl_fresh(self, ttl: float) -> Optional[RoomAcl]:
+        acl = self.acl
+        if acl is None or time.monotonic() - acl.loaded_at > ttl:
+            return None
+        return acl
+
+    def idle_for(self) -> float:
+        return time.monotonic() - self.touched
+
+    def set_shapes(self, shapes: List[Dict[str, Any]]):
+        self.shapes = list(shapes)
+        self.shapes_version += 1
+
+    def apply_shape_ops(self, ops: List[Dict[str, Any]]):
+        """Same semantics as the graph page: add / remove / patch / replace_all."""
+        if self.shapes is None:
+            return
+        shapes = self.shapes
+        for op in ops:
+            if not isinstance(op, dict):
+                continue
+            kind = op.get("op")
+            if kind == "add" and isinstance(op.get("shape"), dict):
+                shapes.append(op["shape"])
+            elif kind == "remove":
+                shapes = [s for s in shapes if s.get("id") != op.get("id")]
+            elif kind == "patch" and isinstance(op.get("fields"), dict):
+                shapes = [{**s, **op["fields"]} if s.get("id") == op.get("id") else s for s in shapes]
+            elif kind == "replace_all" and isinstance(op.get("shapes"), list):
+                shapes = list(op["shapes"])
+        self.shapes = shapes
+        self.shapes_version += 1
@@ -1,6 +1,8 @@
 from django.urls import re_path
 from .consumers import ProjectConsumer
+from .mux import ProjectMuxConsumer
 
 websocket_urlpatterns = [
+    re_path(r"^ws/projects/mux/$", ProjectMuxConsumer.as_asgi()),
     re_path(r"^ws/projects/(?P<project_id>\d+)/$", ProjectConsumer.as_asgi()),
 ]
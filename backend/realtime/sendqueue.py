@@ -0,0 +1,145 @@
+# /backend/realtime/sendqueue.py
+"""
+Per-socket outbound queue.
+
+Group events are handed to the socket's own queue and written by a background task,
+so a slow client never backs up the channel layer (whose capacity limit would
+otherwise drop messages at random, chat included).
+
+Policies, chosen by the consumer per frame:
+  - key=None      lossless: kept in order, never dropped (chat, shapes, text, ...)
+  - key=<hashable> latest-wins: drops a pending frame with the same key and queues the new
+                   one at the tail (cursor per peer, viewport, node_move per path, player_move
+                   per player). Moving it back keeps seq-stamped frames in seq order: a newer
+                   node_move never overtakes older lossless frames still waiting.
+
+Consumers send every frame after accept() through enqueue(), so replies (pong, shapes_full,
+warnings) cannot jump ahead of room events queued before them.
+
+A socket is reported as lagging (so the consumer can disconnect it with 4408) when its queue
+grows past `max_pending` frames, its oldest pending frame is older than `max_lag` seconds, or
+the frame being written has been stuck in send() for `max_lag` seconds.
+
+Those checks only see backpressure that the ASGI server passes back to send(). Daphne, which
+this project runs, does not: it hands every write to Twisted's transport buffer and returns at
+once, so the queue drains as fast as the event loop runs and a slow reader's backlog grows in
+daphne's memory instead. Under daphne the 4408 close is effectively inert; the queue is there
+for ordering and coalescing and to keep the channel layer from dropping messages. The lag
+checks only take effect under servers whose send() waits for the transport to drain.
+"""
+import asyncio
+import itertools
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from django.conf import settings
+
+from . import metrics
+
+REALTIME_SEND_QUEUE_MAX = getattr(settings, "REALTIME_SEND_QUEUE_MAX", 1000)
+REALTIME_SEND_LAG_SECONDS = getattr(settings, "REALTIME_SEND_LAG_SECONDS", 10)
+
+# Close code for sockets that cannot keep up (clients may reconnect and resume)
+CLOSE_LAGGING = 4408
+
+
+class SendQueue:
+    def __init__(self, send: Callable[[Dict[str, Any]], Awaitable[None]], max_pending: int, max_lag: float,
+                 on_lag: Optional[Callable[[], Awaitable[None]]] = None, label: str = ""):
+        self._send = send
+        self.label = label  # metrics "consumer" label
+        self.on_lag = on_lag  # awaited by run() once a send leaves the socket lagging
+        self.max_pending = int(max_pending)
+        self.max_lag = float(max_lag)
+        # key -> (enqueued_at, frame); insertion order is send order
+        self._pending: "OrderedDict[Hashable, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._ready = asyncio.Event()
+        self._ids = itertools.count()
+        self.coalesced = 0
+        self._sending_since: Optional[float] = None  # start of the send() in flight
+
+    def __len__(self):
+        return len(self._pending)
+
+    def put(self, frame: Dict[str, Any], key: Optional[Hashable] = None) -> bool:
+        """Queue a frame. Returns False once the socket is lagging past the thresholds."""
+        if key is not None and self._pending.pop(key, None) is not None:
+            self.coalesced += 1
+        self._pending[key if key is not None else next(self._ids)] = (time.monotonic(), frame)
+        self._ready.set()
+        return not self.lagging()
+
+    def lagging(self) -> bool:
+        if len(self._pending) > self.max_pending:
+            return True
+        now = time.monotonic()
+        if self._sending_since is not None and now - self._sending_since > self.max_lag:
+            return True  # the transport is not taking our writes
+        if not self._pending:
+            return False
+        oldest, _ = next(iter(self._pending.values()))
+        return now - oldest > self.max_lag
+
+    async def run(self):
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            while self._pending:
+                _, (_, frame) = self._pending.popitem(last=False)
+                self._sending_since = started = time.monotonic()
+                try:
+                    await self._send(frame)
+                finally:
+                    self._sending_since = None
+                metrics.SEND_SECONDS.observe(time.monotonic() - started, consumer=self.label)
+                if self.on_lag is not None and (self.lagging() or time.monotonic() - started > self.max_lag):
+                    await self.on_lag()
+                    return
+
+
+class OutboxMixin:
+    """
+    Gives an AsyncJsonWebsocketConsumer a SendQueue drained by a background task.
+    Call start_outbox() after accept() and stop_outbox() in disconnect().
+    """
+    _outbox: Optional[SendQueue] = None
+    _outbox_task: Optional[asyncio.Task] = None
+    _lagged: bool = False
+
+    def start_outbox(self):
+        self._outbox = SendQueue(self.send_json, REALTIME_SEND_QUEUE_MAX, REALTIME_SEND_LAG_SECONDS,
+                                 on_lag=self._outbox_lagging, label=getattr(self, "metrics_label", ""))
+        self._outbox_task = asyncio.ensure_future(self._outbox.run())
+
+    async def stop_outbox(self):
+        task, self._outbox_task = self._outbox_task, None
+        if task:
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    async def enqueue(self, frame: Dict[str, Any], key: Optional[Hashable] = None):
+        if self._lagged:
+            return
+        if self._outbox is None:
+            await self.send_json(frame)
+            return
+        coalesced = self._outbox.coalesced
+        ok = self._outbox.put(frame, key)
+        label = getattr(self, "metrics_label", "")
+        metrics.SEND_QUEUE_DEPTH.observe(len(self._outbox), consumer=label)
+        if self._outbox.coalesced != coalesced:
+            metrics.SEND_COALESCED.inc(consumer=label)
+        if not ok:
+            await self.stop_outbox()
+            await self._outbox_lagging()
+
+    async def _outbox_lagging(self):
+        # Stuck socket: cut it loose rather than let it degrade the room
+        if self._lagged:
+            return
+        self._lagged = True
+        await self.close(code=CLOSE_LAGGING)
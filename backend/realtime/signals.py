@@ -0,0 +1,23 @@
+# /backend/realtime/signals.py
+"""Keep the websocket room cache (realtime/roomcache.py) in line with project edits."""
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .consumers import Project, invalidate_room
+
+if Project is not None:
+    @receiver(post_save, sender=Project)
+    @receiver(post_delete, sender=Project)
+    def invalidate_room_on_project_change(sender, instance, **kwargs):
+        invalidate_room(instance.pk, shapes=True)
+
+    @receiver(m2m_changed)
+    def invalidate_room_on_sharing_change(sender, instance, action, reverse, model, pk_set, **kwargs):
+        if not action.startswith("post_"):
+            return
+        if isinstance(instance, Project):
+            invalidate_room(instance.pk)
+        elif model is Project:
+            # user.shared_projects.add(...) style: the changed projects are in pk_set
+            for pk in pk_set or ():
+                invalidate_room(pk)
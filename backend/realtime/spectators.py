@@ -0,0 +1,84 @@
+# /backend/realtime/spectators.py
+"""
+Down-sampled event stream for read-only spectators of a project room.
+
+Editors' room events are pushed into the room's SpectatorFeed, which costs a dict write
+on the editor path. Every 1/REALTIME_SPECTATOR_HZ seconds the feed sends what accumulated
+to the spectator group ("proj_<id>_spec") as a single group_send, so the audience size
+never adds work to editor broadcasts. A room has a feed only while it has spectators
+(consumers.py drops it when the last one leaves; an idle feed also removes itself).
+
+While buffering, cursors (per peer), viewport, and node_move / text_edit / popup_resize
+(per path) are latest-wins; WebRTC signaling is not forwarded at all; everything else
+(presence, chat, shapes, ...) is kept in order.
+"""
+import asyncio
+import itertools
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+# Never shown to spectators
+SPECTATOR_DROP_TYPES = frozenset({"rtc_offer", "rtc_answer", "rtc_ice", "rtc_hangup"})
+
+# Stop a feed's flush task after this long without events (restarted on the next push)
+FEED_IDLE_SECONDS = 5.0
+
+
+def spectator_group(group_name: str) -> str:
+    return f"{group_name}_spec"
+
+
+def _spectator_key(payload: Dict[str, Any]) -> Optional[Hashable]:
+    t = payload.get("type")
+    if t == "cursor":
+        return ("cursor", payload.get("peer_id"))
+    if t == "viewport":
+        return ("viewport",)
+    if t in ("node_move", "text_edit", "popup_resize"):
+        return (t, (payload.get("data") or {}).get("path"))
+    return None
+
+
+class SpectatorFeed:
+    def __init__(self, channel_layer, group_name: str, hz: float, on_idle: Optional[Callable[["SpectatorFeed"], None]] = None):
+        self.channel_layer = channel_layer
+        self.group_name = group_name
+        self.on_idle = on_idle  # called when the flush task stops for lack of events
+        self.interval = 1.0 / max(0.1, float(hz))
+        self._pending: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
+        self._ids = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+
+    def push(self, payload: Dict[str, Any]):
+        if payload.get("type") in SPECTATOR_DROP_TYPES:
+            return
+        key = _spectator_key(payload)
+        # Replacing an existing key keeps its position (same as the per-socket SendQueue)
+        self._pending[key if key is not None else next(self._ids)] = payload
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self):
+        idle = 0.0
+        while idle < FEED_IDLE_SECONDS:
+            await asyncio.sleep(self.interval)
+            if not self._pending:
+                idle += self.interval
+                continue
+            idle = 0.0
+            events, self._pending = list(self._pending.values()), OrderedDict()
+            try:
+                await self.channel_layer.group_send(
+                    spectator_group(self.group_name),
+                    {"type": "spectate_batch", "group": self.group_name, "events": events},
+                )
+            except Exception:
+                pass  # a full layer drops this batch; the next one carries newer state
+        self._task = None
+        if self.on_idle is not None:
+            self.on_idle(self)
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
@@ -0,0 +1,53 @@
+from django.test import SimpleTestCase
+
+from realtime.codec import CODECS, negotiate, pack_client, pack_server, unpack_client, unpack_server
+
+
+class CodecRoundTripTests(SimpleTestCase):
+    server_frames = [
+        {"type": "cursor", "peer_id": 3, "data": {"x": 12.3, "y": -4.5}},
+        {"type": "node_move", "seq": 9, "epoch": "3f2a9c01b7de",
+         "data": {"path": "a/b.py", "x": 1.5, "y": 2.0, "by": 3}},
+        {"type": "node_move", "data": {"path": "a/b.py", "x": 1.5, "y": 2.0, "by": 3}},  # not stamped
+        {"type": "player.move", "player": {"id": "p1"}, "pos": {"x": 1.25, "y": 64.5, "z": -3.75},
+         "time": "2024-01-02T03:04:05.678000+00:00"},
+        {"type": "block.place", "player": {"id": "p1"}, "block": {"x": 1, "y": 2, "z": 3, "kind": 4},
+         "time": "2024-01-02T03:04:05.678000+00:00"},
+        {"type": "block.remove", "player": {"id": "p1"}, "x": 1, "y": 2, "z": 3,
+         "time": "2024-01-02T03:04:05.678000+00:00"},
+    ]
+    client_frames = [
+        {"type": "cursor", "x": 1.5, "y": 2.5},
+        {"type": "node_move", "path": "a", "x": -1.0, "y": 0.0},
+        {"type": "move", "x": 1.25, "y": 2.5, "z": -3.75},
+        {"type": "place_block", "x": 1, "y": 2, "z": 3, "block": 5},
+        {"type": "remove_block", "x": 1, "y": 2, "z": 3},
+    ]
+
+    def test_server_frames(self):
+        for codec in CODECS.values():
+            for frame in self.server_frames:
+                with self.subTest(codec=codec.subprotocol, type=frame["type"]):
+                    packed = codec.encode(frame)
+                    self.assertIsInstance(packed, bytes)
+                    self.assertEqual(unpack_server(codec.loads(packed)), frame)
+
+    def test_client_frames(self):
+        for codec in CODECS.values():
+            for frame in self.client_frames:
+                with self.subTest(codec=codec.subprotocol, type=frame["type"]):
+                    self.assertEqual(codec.decode(codec.dumps(pack_client(frame))), frame)
+
+    def test_other_frames_stay_maps(self):
+        frame = {"type": "chat", "data": {"text": "hi"}, "seq": 1}
+        self.assertIs(pack_server(frame), frame)
+        self.assertIs(pack_server({**frame, "room": "proj_1"})["room"], "proj_1")
+
+    def test_malformed_client_frames(self):
+        for obj in ([], [1, 2], [99, 1], "x", None):
+            self.assertEqual(unpack_client(obj), {}, obj)
+
+    def test_negotiate(self):
+        self.assertIsNone(negotiate(["json", "rt.unknown"]))
+        for name in CODECS:
+            self.assertEqual(negotiate(["x", name]).subprotocol, name)
@@ -0,0 +1,113 @@
+import asyncio
+
+from channels.layers import InMemoryChannelLayer
+from django.test import SimpleTestCase
+
+from realtime.layers import LocalChannelLayer, RoomAffinityChannelLayer
+
+
+def _workers(n=2):
+    """n hybrid layers (one per simulated worker) sharing one backend."""
+    backend = InMemoryChannelLayer()
+    return backend, [RoomAffinityChannelLayer(backend=backend) for _ in range(n)]
+
+
+async def _settle():
+    # let the pumps exchange join / here announcements
+    await asyncio.sleep(0.05)
+
+
+async def _receive(layer, channel, timeout=0.5):
+    return await asyncio.wait_for(layer.receive(channel), timeout)
+
+
+async def _close(*layers):
+    for layer in layers:
+        await layer.close()
+
+
+class RoomAffinityFanoutTests(SimpleTestCase):
+    async def test_remote_member_gets_group_send(self):
+        _, (a, b) = _workers()
+        ca, cb = await a.new_channel(), await b.new_channel()
+        await a.group_add("proj_1", ca)
+        await b.group_add("proj_1", cb)
+        await _settle()
+        await a.group_send("proj_1", {"type": "broadcast", "n": 1})
+        self.assertEqual((await _receive(a, ca))["n"], 1)
+        self.assertEqual((await _receive(b, cb))["n"], 1)
+        await _close(a, b)
+
+    async def test_leave_sent_after_last_local_member_left(self):
+        # ProjectConsumer's presence_leave / GameConsumer's player.leave from a worker whose
+        # last local member of the room just went away
+        for group in ("proj_1", "game_s1"):
+            with self.subTest(group=group):
+                _, (a, b) = _workers()
+                ca, cb = await a.new_channel(), await b.new_channel()
+                await a.group_add(group, ca)
+                await b.group_add(group, cb)
+                await _settle()
+                await a.group_discard(group, ca)
+                await a.group_send(group, {"type": "leave"})
+                self.assertEqual((await _receive(b, cb))["type"], "leave")
+                await _close(a, b)
+
+    async def test_send_to_group_with_no_local_member(self):
+        # Spectator batches: the editor's worker has nobody in proj_<id>_spec
+        _, (a, b) = _workers()
+        editor, spectator = await a.new_channel(), await b.new_channel()
+        await a.group_add("proj_1", editor)
+        await b.group_add("proj_1_spec", spectator)
+        await _settle()
+        await a.group_send("proj_1_spec", {"type": "spectate_batch", "events": []})
+        self.assertEqual((await _receive(b, spectator))["type"], "spectate_batch")
+        await _close(a, b)
+
+    async def test_local_only_group_skips_backend(self):
+        backend, (a, b) = _workers()
+        ca = await a.new_channel()
+        await a.group_add("proj_1", ca)
+        await _settle()
+        sent = []
+        original = backend.group_send
+
+        async def spy(group, message):
+            sent.append(group)
+            await original(group, message)
+
+        backend.group_send = spy
+        await a.group_send("proj_1", {"type": "broadcast"})
+        self.assertEqual((await _receive(a, ca))["type"], "broadcast")
+        self.assertEqual(sent, [])
+        await _close(a, b)
+
+
+class LocalChannelLayerTests(SimpleTestCase):
+    async def test_group_send_shares_one_message(self):
+        layer = LocalChannelLayer()
+        c1, c2 = await layer.new_channel(), await layer.new_channel()
+        await layer.group_add("g", c1)
+        await layer.group_add("g", c2)
+        message = {"type": "x"}
+        await layer.group_send("g", message)
+        self.assertIs(await layer.receive(c1), message)
+        self.assertIs(await layer.receive(c2), message)
+
+    async def test_unread_queues_are_swept(self):
+        layer = LocalChannelLayer(expiry=0.01)
+        dead, live = await layer.new_channel(), await layer.new_channel()
+        await layer.send(dead, {"type": "leave"})
+        await asyncio.sleep(0.02)
+        await layer.send(live, {"type": "x"})
+        self.assertNotIn(dead, layer.channels)
+        self.assertEqual((await layer.receive(live))["type"], "x")
+
+    async def test_full_channel_raises(self):
+        from channels.exceptions import ChannelFull
+
+        layer = LocalChannelLayer(capacity=1)
+        channel = await layer.new_channel()
+        await layer.send(channel, {"type": "a"})
+        with self.assertRaises(ChannelFull):
+            await layer.send(channel, {"type": "b"})
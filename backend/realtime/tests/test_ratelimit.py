@@ -0,0 +1,77 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from realtime.mux import MuxRoom, ProjectMuxConsumer
+from realtime.ratelimit import CLOSE, DROP, OK, WARN, RateLimiter, TokenBucket
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TokenBucketTests(SimpleTestCase):
+    def test_burst_then_refill(self):
+        clock = _Clock()
+        with mock.patch("realtime.ratelimit.time.monotonic", clock):
+            bucket = TokenBucket(rate=2, burst=3)
+            self.assertEqual([bucket.take() for _ in range(4)], [True, True, True, False])
+            clock.now += 0.5  # one token back
+            self.assertTrue(bucket.take())
+            self.assertFalse(bucket.take())
+            clock.now += 60  # never above burst
+            self.assertEqual(sum(bucket.take() for _ in range(10)), 3)
+
+
+class RateLimiterTests(SimpleTestCase):
+    def test_per_type_and_default(self):
+        clock = _Clock()
+        with mock.patch("realtime.ratelimit.time.monotonic", clock):
+            limiter = RateLimiter({"chat": (1, 1), "*": (1, 2)}, window=10, warn_after=100, close_after=200,
+                                  known={"chat", "cursor", "node_move"})
+            self.assertEqual(limiter.check("chat"), OK)
+            self.assertEqual(limiter.check("chat"), DROP)
+            self.assertEqual([limiter.check("cursor") for _ in range(3)], [OK, OK, DROP])
+            self.assertEqual(limiter.check("node_move"), OK)  # its own "*" bucket
+
+    def test_unknown_types_share_one_bucket(self):
+        clock = _Clock()
+        with mock.patch("realtime.ratelimit.time.monotonic", clock):
+            limiter = RateLimiter({"*": (1, 2)}, window=10, warn_after=100, close_after=200, known={"cursor"})
+            self.assertEqual([limiter.check(f"made_up_{i}") for i in range(3)], [OK, OK, DROP])
+            self.assertEqual(limiter.check("cursor"), OK)
+            self.assertEqual(set(limiter._buckets), {"*", "cursor"})
+
+    def test_unlimited_without_default(self):
+        limiter = RateLimiter({"chat": (1, 1)})
+        self.assertEqual({limiter.check("cursor") for _ in range(50)}, {OK})
+
+    def test_warn_once_then_close(self):
+        clock = _Clock()
+        with mock.patch("realtime.ratelimit.time.monotonic", clock):
+            limiter = RateLimiter({"*": (1, 1)}, window=10, warn_after=2, close_after=4)
+            limiter.check("x")
+            self.assertEqual([limiter.check("x") for _ in range(4)], [DROP, WARN, DROP, CLOSE])
+
+    def test_window_resets_drops(self):
+        clock = _Clock()
+        with mock.patch("realtime.ratelimit.time.monotonic", clock):
+            limiter = RateLimiter({"*": (0.001, 1)}, window=10, warn_after=2, close_after=3)
+            limiter.check("x")
+            self.assertEqual([limiter.check("x") for _ in range(2)], [DROP, WARN])
+            clock.now += 11
+            self.assertEqual([limiter.check("x") for _ in range(2)], [DROP, WARN])
+
+
+class MuxRateLimitTests(SimpleTestCase):
+    async def test_rooms_share_the_socket_budget(self):
+        mux = ProjectMuxConsumer()
+        mux.channel_layer, mux.channel_name, mux.scope = None, "mux.test", {}
+        mux.rate_limits = {"chat": (0.001, 2)}
+        rooms = [MuxRoom(mux, 1, {}), MuxRoom(mux, 2, {})]
+        allowed = [await room.allow_message("chat") for room in rooms + rooms]
+        self.assertEqual(allowed, [True, True, False, False])
@@ -0,0 +1,102 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from realtime.consumers import ProjectConsumer
+from realtime.replay import ReplayBuffer
+
+
+class ReplayBufferTests(SimpleTestCase):
+    def test_stamps_seq_and_epoch(self):
+        buf = ReplayBuffer(10, 60)
+        a = buf.stamp({"type": "chat", "text": "a"})
+        self.assertEqual((a["seq"], a["epoch"]), (1, buf.epoch))
+        cursor = buf.stamp({"type": "cursor"})
+        self.assertNotIn("seq", cursor)
+        self.assertEqual(buf.seq, 1)
+
+    def test_since(self):
+        buf = ReplayBuffer(10, 60)
+        for i in range(3):
+            buf.stamp({"type": "chat", "i": i})
+        self.assertEqual([p["i"] for p in buf.since(buf.epoch, 1)], [1, 2])
+        self.assertEqual(buf.since(buf.epoch, 3), [])
+        self.assertIsNone(buf.since("other", 1))
+        self.assertIsNone(buf.since(buf.epoch, 4))
+
+    def test_evicted_gap_falls_back(self):
+        buf = ReplayBuffer(2, 60)
+        for i in range(4):
+            buf.stamp({"type": "chat", "i": i})
+        self.assertIsNone(buf.since(buf.epoch, 1))
+        self.assertEqual([p["seq"] for p in buf.since(buf.epoch, 2)], [3, 4])
+
+    def test_aged_out_gap_falls_back(self):
+        buf = ReplayBuffer(10, 0.5)
+        with mock.patch("realtime.replay.time.monotonic", return_value=100.0):
+            buf.stamp({"type": "chat"})
+            buf.stamp({"type": "chat"})
+        with mock.patch("realtime.replay.time.monotonic", return_value=101.0):
+            self.assertIsNone(buf.since(buf.epoch, 1))
+
+    def test_records_other_workers_events_once(self):
+        buf = ReplayBuffer(10, 60)
+        buf.stamp({"type": "chat", "i": 0})
+        theirs = {"type": "chat", "i": 1, "seq": 7, "epoch": "theirs"}
+        buf.record(theirs)
+        buf.record(dict(theirs))  # the same event, delivered to a second socket here
+        buf.record({"type": "chat", "seq": 1, "epoch": buf.epoch})  # our own, already kept
+        buf.stamp({"type": "chat", "i": 2})
+        self.assertEqual([p["i"] for p in buf.since(buf.epoch, 0)], [0, 1, 2])
+        self.assertEqual([p["i"] for p in buf.since(buf.epoch, 1)], [1, 2])
+
+    def test_evicted_foreign_event_falls_back(self):
+        buf = ReplayBuffer(2, 60)
+        buf.stamp({"type": "chat"})
+        buf.record({"type": "chat", "seq": 1, "epoch": "theirs"})
+        buf.stamp({"type": "chat"})
+        buf.stamp({"type": "chat"})  # evicts ours (1), then theirs
+        self.assertIsNone(buf.since(buf.epoch, 0))
+        self.assertIsNone(buf.since(buf.epoch, 1))
+        self.assertEqual([p["seq"] for p in buf.since(buf.epoch, 2)], [3])
+
+    def test_blind_gap_falls_back(self):
+        buf = ReplayBuffer(10, 60)
+        buf.stamp({"type": "chat"})
+        buf.blind()  # last member here left; other workers' events no longer arrive
+        self.assertIsNone(buf.since(buf.epoch, 1))
+        self.assertIsNone(buf.since(buf.epoch, 0))
+        buf.stamp({"type": "chat"})  # members back
+        self.assertEqual(buf.since(buf.epoch, 2), [])
+
+
+class ResumeDedupeTests(SimpleTestCase):
+    async def _delivered(self, payloads, replayed):
+        consumer = ProjectConsumer()
+        consumer.group_name = "proj_replay_dedupe"
+        consumer._replayed = replayed
+        sent = []
+
+        async def enqueue(payload, key=None):
+            sent.append(payload)
+
+        consumer.enqueue = enqueue
+        for payload in payloads:
+            await consumer.broadcast({"type": "broadcast", "payload": payload})
+        return sent
+
+    async def test_skips_replayed_seqs_per_epoch(self):
+        payloads = [
+            {"type": "chat", "seq": 3, "epoch": "mine"},    # already replayed
+            {"type": "chat", "seq": 4, "epoch": "mine"},
+            {"type": "chat", "seq": 2, "epoch": "theirs"},  # replayed from another worker
+            {"type": "chat", "seq": 3, "epoch": "theirs"},
+            {"type": "chat", "seq": 1, "epoch": "other"},   # a worker not in the replay
+            {"type": "cursor"},
+        ]
+        sent = await self._delivered(payloads, {"mine": 3, "theirs": 2})
+        self.assertEqual(sent, [payloads[1], payloads[3], payloads[4], payloads[5]])
+
+    async def test_fresh_join_skips_nothing(self):
+        payloads = [{"type": "chat", "seq": 1, "epoch": "mine"}]
+        self.assertEqual(await self._delivered(payloads, None), payloads)
@@ -0,0 +1,81 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from realtime import consumers
+from realtime.consumers import ProjectConsumer, invalidate_room
+from realtime.roomcache import RoomCache
+
+
+class SharedShapesTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.db = [{"id": "s1"}]
+        self.fetches = 0
+        self.workers = [{}, {}]  # ROOM_CACHES of two workers
+
+    def tearDown(self):
+        cache.clear()
+
+    def _consumer(self):
+        consumer = ProjectConsumer()
+        consumer.project_id, consumer.group_name = "7", "proj_7"
+
+        async def fetch():
+            self.fetches += 1
+            return list(self.db)
+
+        consumer._fetch_shapes = fetch
+        return consumer
+
+    async def _shapes(self, worker):
+        with mock.patch.object(consumers, "ROOM_CACHES", self.workers[worker]):
+            return [s["id"] for s in await self._consumer()._cached_shapes()]
+
+    async def _apply(self, worker, ops):
+        with mock.patch.object(consumers, "ROOM_CACHES", self.workers[worker]):
+            consumer = self._consumer()
+            await consumer._cached_shapes()
+            room = consumers._room_cache("proj_7")
+            room.apply_shape_ops(ops)
+            await consumers._publish_shapes("7", room)
+
+    async def test_other_worker_sees_live_ops(self):
+        self.assertEqual(await self._shapes(0), ["s1"])
+        self.assertEqual(await self._shapes(1), ["s1"])
+        await self._apply(0, [{"op": "add", "shape": {"id": "s2"}}])
+        self.assertEqual(await self._shapes(1), ["s1", "s2"])
+        self.assertEqual(self.fetches, 1)
+
+    async def test_save_elsewhere_reloads_from_database(self):
+        self.assertEqual(await self._shapes(0), ["s1"])
+        self.db = [{"id": "saved"}]
+        invalidate_room(7, shapes=True)  # REST save in another process
+        self.workers[0]["proj_7"].shapes = [{"id": "stale"}]  # not this process's cache
+        self.assertEqual(await self._shapes(0), ["saved"])
+        self.assertEqual(await self._shapes(1), ["saved"])
+        self.assertEqual(self.fetches, 2)
+
+    async def test_expired_entry_keeps_unsaved_edits(self):
+        await self._apply(0, [{"op": "add", "shape": {"id": "s2"}}])
+        cache.clear()
+        self.assertEqual(await self._shapes(0), ["s1", "s2"])
+        self.assertEqual(await self._shapes(1), ["s1", "s2"])
+        self.assertEqual(self.fetches, 1)
+
+
+class ApplyShapeOpsTests(SimpleTestCase):
+    def test_ops(self):
+        room = RoomCache()
+        room.set_shapes([{"id": 1, "c": "red"}])
+        room.apply_shape_ops([
+            {"op": "add", "shape": {"id": 2}},
+            {"op": "patch", "id": 1, "fields": {"c": "blue"}},
+            {"op": "remove", "id": 2},
+            "junk",
+        ])
+        self.assertEqual(room.shapes, [{"id": 1, "c": "blue"}])
+        self.assertEqual(room.shapes_version, 2)
+        room.apply_shape_ops([{"op": "replace_all", "shapes": []}])
+        self.assertEqual(room.shapes, [])
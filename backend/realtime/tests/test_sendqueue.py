@@ -0,0 +1,71 @@
+import asyncio
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from realtime.sendqueue import SendQueue
+
+
+class SendQueueTests(SimpleTestCase):
+    def test_coalesced_frame_moves_to_tail(self):
+        q = SendQueue(None, max_pending=10, max_lag=10)
+        q.put({"n": 1}, ("cursor", 1))
+        q.put({"n": 2})
+        q.put({"n": 3}, ("cursor", 1))
+        self.assertEqual([f for _, f in q._pending.values()], [{"n": 2}, {"n": 3}])
+        self.assertEqual(q.coalesced, 1)
+
+    def test_stamped_frames_stay_in_seq_order(self):
+        q = SendQueue(None, max_pending=10, max_lag=10)
+        q.put({"type": "node_move", "seq": 1}, ("node_move", "a"))
+        q.put({"type": "chat", "seq": 2})
+        q.put({"type": "node_move", "seq": 3}, ("node_move", "a"))
+        self.assertEqual([f["seq"] for _, f in q._pending.values()], [2, 3])
+
+    def test_lagging_by_depth_and_age(self):
+        q = SendQueue(None, max_pending=2, max_lag=5)
+        with mock.patch("realtime.sendqueue.time.monotonic", return_value=100.0):
+            self.assertTrue(q.put({"n": 1}))
+            self.assertTrue(q.put({"n": 2}))
+            self.assertFalse(q.put({"n": 3}))
+        q = SendQueue(None, max_pending=10, max_lag=5)
+        with mock.patch("realtime.sendqueue.time.monotonic", return_value=100.0):
+            q.put({"n": 1})
+        with mock.patch("realtime.sendqueue.time.monotonic", return_value=106.0):
+            self.assertFalse(q.put({"n": 2}, "k"))
+
+    async def test_sends_in_order(self):
+        sent = []
+
+        async def send(frame):
+            sent.append(frame["n"])
+
+        q = SendQueue(send, max_pending=10, max_lag=10)
+        task = asyncio.ensure_future(q.run())
+        for n in range(3):
+            q.put({"n": n})
+        await asyncio.sleep(0.01)
+        self.assertEqual(sent, [0, 1, 2])
+        task.cancel()
+
+    async def test_stuck_send_is_lagging(self):
+        release = asyncio.Event()
+        lagged = []
+
+        async def send(frame):
+            await release.wait()
+
+        async def on_lag():
+            lagged.append(True)
+
+        q = SendQueue(send, max_pending=10, max_lag=0.05, on_lag=on_lag)
+        task = asyncio.ensure_future(q.run())
+        q.put({"n": 1})
+        await asyncio.sleep(0.1)
+        # Nothing queued, but the frame in flight is stuck: a put now would report it
+        self.assertTrue(q.lagging())
+        # The run loop reports it once the send returns, without any new frame
+        release.set()
+        await asyncio.wait_for(task, 1)
+        self.assertEqual(lagged, [True])
+
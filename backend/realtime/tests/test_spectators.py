@@ -0,0 +1,82 @@
+import asyncio
+from unittest import mock
+
+from channels.layers import InMemoryChannelLayer
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from realtime import consumers, spectators
+from realtime.consumers import ProjectConsumer
+from realtime.layers import RoomAffinityChannelLayer
+from realtime.spectators import SpectatorFeed
+
+
+class SpectatorFeedLifecycleTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        for d in (consumers.SPECTATOR_FEEDS, consumers.SPECTATOR_COUNTS, consumers.AUDIENCE_SEEN):
+            d.clear()
+
+    def tearDown(self):
+        for feed in list(consumers.SPECTATOR_FEEDS.values()):
+            feed.stop()
+        self.setUp()
+
+    def _editor(self, layer):
+        consumer = ProjectConsumer()
+        consumer.channel_layer, consumer.group_name = layer, "proj_1"
+        return consumer
+
+    async def test_no_feed_without_spectators(self):
+        layer = RoomAffinityChannelLayer(backend=InMemoryChannelLayer())
+        await self._editor(layer)._broadcast({"type": "chat", "data": {}})
+        self.assertEqual(consumers.SPECTATOR_FEEDS, {})
+        await layer.close()
+
+    async def test_spectator_on_other_worker_gets_batches(self):
+        backend = InMemoryChannelLayer()
+        editors, audience = RoomAffinityChannelLayer(backend=backend), RoomAffinityChannelLayer(backend=backend)
+        spectator = await audience.new_channel()
+        await audience.group_add("proj_1_spec", spectator)
+        await consumers._count_spectator("proj_1", 1)  # as counted by the audience's worker
+        await asyncio.sleep(0.05)
+
+        editor = self._editor(editors)
+        await editor._broadcast({"type": "chat", "data": {"text": "hi"}})
+        batch = await asyncio.wait_for(audience.receive(spectator), 1)
+        self.assertEqual(batch["type"], "spectate_batch")
+        self.assertEqual([e["type"] for e in batch["events"]], ["chat"])
+
+        # Last spectator gone: the next broadcast drops the feed
+        await consumers._count_spectator("proj_1", -1)
+        await editor._broadcast({"type": "chat", "data": {}})
+        self.assertEqual(consumers.SPECTATOR_FEEDS, {})
+        self.assertIsNone(cache.get("rt:spectators:proj_1"))
+        await editors.close()
+        await audience.close()
+
+    async def test_idle_feed_removes_itself(self):
+        layer = RoomAffinityChannelLayer(backend=InMemoryChannelLayer())
+        with mock.patch.object(spectators, "FEED_IDLE_SECONDS", 0.05):
+            feed = consumers._spectator_feed(layer, "proj_1")
+            feed.interval = 0.01
+            feed.push({"type": "chat"})
+            await asyncio.sleep(0.2)
+        self.assertNotIn("proj_1", consumers.SPECTATOR_FEEDS)
+        await layer.close()
+
+
+class SpectatorFeedTests(SimpleTestCase):
+    async def test_coalesces_and_drops_signaling(self):
+        layer = RoomAffinityChannelLayer(backend=InMemoryChannelLayer())
+        channel = await layer.new_channel()
+        await layer.group_add("proj_2_spec", channel)
+        feed = SpectatorFeed(layer, "proj_2", hz=100)
+        feed.push({"type": "cursor", "peer_id": 1, "x": 1})
+        feed.push({"type": "chat", "n": 1})
+        feed.push({"type": "rtc_offer"})
+        feed.push({"type": "cursor", "peer_id": 1, "x": 2})
+        batch = await asyncio.wait_for(layer.receive(channel), 1)
+        self.assertEqual(batch["events"], [{"type": "cursor", "peer_id": 1, "x": 2}, {"type": "chat", "n": 1}])
+        feed.stop()
+        await layer.close()
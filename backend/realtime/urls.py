@@ -0,0 +1,9 @@
+# backend/realtime/urls.py
+from django.urls import path
+from .views import metrics_view
+
+app_name = "realtime"
+
+urlpatterns = [
+    path("metrics/", metrics_view, name="metrics"),  # matches /api/realtime/metrics/
+]
@@ -0,0 +1,23 @@
+# backend/realtime/views.py
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from . import metrics
+
+
+def metrics_view(request):
+    """
+    Prometheus text exposition of the websocket tier metrics (this process only).
+    If REALTIME_METRICS_TOKEN is set, requires "Authorization: Bearer <token>";
+    otherwise it is only served with DEBUG on.
+    """
+    token = getattr(settings, "REALTIME_METRICS_TOKEN", "")
+    if token:
+        auth = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(auth, f"Bearer {token}"):
+            return HttpResponseForbidden("forbidden")
+    elif not settings.DEBUG:
+        return HttpResponseForbidden("forbidden")
+    return HttpResponse(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
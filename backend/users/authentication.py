@@ -0,0 +1,65 @@
+# users/authentication.py
+"""
+JWT authentication with a short-lived token -> user cache.
+
+SimpleJWT's JWTAuthentication loads the user row on every request / websocket connect.
+Here the resolved user is cached under (user id, token jti) for AUTH_USER_CACHE_TTL
+seconds (never past the token's own expiry). Each user also has a generation key that
+users.signals bumps on every save / delete, so profile, password or is_active changes
+take effect on the next request. A generation key that is missing (evicted) is replaced
+by a fresh one, so entries cached before the eviction never match again.
+"""
+import time
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+AUTH_USER_CACHE_TTL = getattr(settings, "AUTH_USER_CACHE_TTL", 60)
+
+
+def _gen_key(user_id) -> str:
+    return f"jwtuser:gen:{user_id}"
+
+
+def _entry_key(user_id, jti) -> str:
+    return f"jwtuser:{user_id}:{jti}"
+
+
+def _token_ids(validated_token):
+    return validated_token.get(api_settings.USER_ID_CLAIM), validated_token.get(api_settings.JTI_CLAIM)
+
+
+def invalidate_user(user_id):
+    """Drop every cached token -> user entry of this user (called from users.signals)."""
+    cache.set(_gen_key(user_id), uuid4().hex, None)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        user_id, jti = _token_ids(validated_token)
+        if AUTH_USER_CACHE_TTL <= 0 or user_id is None or jti is None:
+            return super().get_user(validated_token)
+
+        entry_key, gen_key = _entry_key(user_id, jti), _gen_key(user_id)
+        # One cache round-trip for both the entry and the user's current generation
+        found = cache.get_many([entry_key, gen_key])
+        gen = found.get(gen_key)
+        entry = found.get(entry_key)
+        if gen is None:
+            # Evicted (or never set): start a new generation, so no entry cached before counts
+            cache.add(gen_key, uuid4().hex, None)
+            gen = cache.get(gen_key)
+        elif entry is not None and entry[0] == gen:
+            return entry[1]
+
+        user = super().get_user(validated_token)
+        ttl = AUTH_USER_CACHE_TTL
+        exp = validated_token.get("exp")
+        if exp:
+            ttl = min(ttl, int(exp - time.time()))
+        if ttl > 0:
+            cache.set(entry_key, (gen, user), ttl)
+        return user
@@ -0,0 +1,211 @@
+"""
+Inbox bookkeeping: ConversationSummary rows for DMs and group chats.
+
+Every view that writes or deletes a message calls one of these inside its transaction,
+so a user's inbox is one indexed read of their summary rows ordered by (last_at, id)
+instead of a scan over recent messages.
+
+Read state: DMs keep Message.is_read plus a high-water mark on the reader's summary row,
+groups a high-water mark on the membership (last_read_message_id). unread_count is
+maintained on every send / delete and recounted when a conversation is marked read.
+
+Cursors for keyset pages are "<microseconds since epoch>_<id>" strings (URL-safe).
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import BigIntegerField, Case, F, Q, Value, When
+from django.db.models.functions import Greatest
+
+from .models import ConversationSummary, GroupMessage, Message, MessageGroupMembership
+
+PREVIEW_CHARS = 200
+# Largest message id the database can hold (BigAutoField)
+MAX_MESSAGE_ID = (1 << 63) - 1
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def encode_cursor(at: datetime, pk: int) -> str:
+    delta = at - _EPOCH
+    return f"{(delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds}_{pk}"
+
+
+def decode_cursor(raw: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    """(timestamp, id) of a cursor string, or None if it is missing or malformed."""
+    try:
+        micros, pk = str(raw).split("_")
+        return _EPOCH + timedelta(microseconds=int(micros)), int(pk)
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def keyset_slice(qs, before=None, after=None, limit: int = 50) -> list:
+    """
+    Up to `limit` rows of qs on the (created_at, id) keyset: newer than `after` (oldest
+    first), else older than `before` / the newest ones (newest first). Each is one range
+    scan of a created_at index, however deep the page.
+    """
+    if after is not None:
+        at, pk = after
+        qs = qs.filter(Q(created_at__gt=at) | Q(created_at=at, id__gt=pk), created_at__gte=at)
+        return list(qs.order_by("created_at", "id")[:limit])
+    if before is not None:
+        at, pk = before
+        qs = qs.filter(Q(created_at__lt=at) | Q(created_at=at, id__lt=pk), created_at__lte=at)
+    return list(qs.order_by("-created_at", "-id")[:limit])
+
+
+def _last_fields(msg) -> dict:
+    return {
+        "last_message_id": msg.id,
+        "last_sender_id": msg.sender_id,
+        "last_at": msg.created_at,
+        "preview": msg.body[:PREVIEW_CHARS],
+    }
+
+
+def _cleared_fields(prev) -> dict:
+    if prev is None:
+        return {"last_message_id": None, "last_sender_id": None, "preview": ""}
+    return _last_fields(prev)
+
+
+# --- DMs ---
+
+def _pair(a_id: int, b_id: int) -> Q:
+    return Q(sender_id=a_id, recipient_id=b_id) | Q(sender_id=b_id, recipient_id=a_id)
+
+
+def _upsert_dm(user_id: int, peer_id: int, msg: Message, unread: int):
+    fields = _last_fields(msg)
+    rows = ConversationSummary.objects.filter(user_id=user_id, peer_id=peer_id)
+    if rows.update(unread_count=F("unread_count") + unread, **fields):
+        return
+    try:
+        with transaction.atomic():
+            ConversationSummary.objects.create(user_id=user_id, peer_id=peer_id, unread_count=unread, **fields)
+    except IntegrityError:
+        # Created by a concurrent send in between
+        rows.update(unread_count=F("unread_count") + unread, **fields)
+
+
+def record_dm(msg: Message):
+    """A DM was sent: both sides now end with it; the recipient has one more unread."""
+    _upsert_dm(msg.sender_id, msg.recipient_id, msg, unread=0)
+    _upsert_dm(msg.recipient_id, msg.sender_id, msg, unread=0 if msg.is_read else 1)
+
+
+def forget_dm(msg: Message):
+    """A DM is about to be deleted: step both sides back to the previous message of the pair."""
+    if not msg.is_read:
+        ConversationSummary.objects.filter(
+            user_id=msg.recipient_id, peer_id=msg.sender_id, unread_count__gt=0
+        ).update(unread_count=F("unread_count") - 1)
+    rows = ConversationSummary.objects.filter(
+        Q(user_id=msg.sender_id, peer_id=msg.recipient_id) | Q(user_id=msg.recipient_id, peer_id=msg.sender_id),
+        last_message_id=msg.id,
+    )
+    if not rows.exists():
+        return
+    prev = (
+        Message.objects.filter(_pair(msg.sender_id, msg.recipient_id))
+        .exclude(pk=msg.pk)
+        .order_by("-created_at", "-id")
+        .first()
+    )
+    if prev is None:
+        rows.delete()  # nothing left to show for this pair
+    else:
+        rows.update(**_last_fields(prev))
+
+
+def mark_dm_read(user_id: int, peer_id: int, up_to: Optional[int] = None) -> int:
+    """
+    Mark the peer's messages up to `up_to` (default: all; clamped to the newest) read, in
+    one UPDATE. Returns the unread count left.
+    """
+    incoming = Message.objects.filter(sender_id=peer_id, recipient_id=user_id)
+    latest = incoming.order_by("-id").values_list("id", flat=True).first() or 0
+    # Never past the newest message: a mark beyond it would swallow messages not sent yet
+    up_to = latest if up_to is None else min(up_to, latest)
+    incoming.filter(is_read=False, id__lte=up_to).update(is_read=True)
+    unread = incoming.filter(is_read=False).count()
+    ConversationSummary.objects.filter(user_id=user_id, peer_id=peer_id).update(
+        unread_count=unread,
+        last_read_message_id=Greatest("last_read_message_id", Value(up_to, output_field=BigIntegerField())),
+    )
+    return unread
+
+
+# --- Groups ---
+
+def join_group(group, user_ids: Iterable[int]):
+    """
+    Inbox rows for new members, showing the group's latest message (if any). What was
+    written before they joined counts as read.
+    """
+    user_ids = list(user_ids)
+    last = group.messages.order_by("-created_at", "-id").first()
+    fields = _last_fields(last) if last is not None else {"last_at": group.created_at}
+    if last is not None:
+        MessageGroupMembership.objects.filter(group_id=group.id, user_id__in=user_ids).update(
+            last_read_message_id=last.id
+        )
+    ConversationSummary.objects.bulk_create(
+        [ConversationSummary(user_id=uid, group_id=group.id, **fields) for uid in user_ids],
+        ignore_conflicts=True,
+    )
+
+
+def leave_group(group, user_ids: Iterable[int]):
+    ConversationSummary.objects.filter(group_id=group.id, user_id__in=list(user_ids)).delete()
+
+
+def record_group_message(msg: GroupMessage):
+    """A group message was sent: every member's row now ends with it, one more unread for the others."""
+    ConversationSummary.objects.filter(group_id=msg.group_id).update(
+        unread_count=Case(When(user_id=msg.sender_id, then=F("unread_count")), default=F("unread_count") + 1),
+        **_last_fields(msg),
+    )
+
+
+def forget_group_message(msg: GroupMessage):
+    """A group message is about to be deleted: rows ending with it step back to the previous one."""
+    not_read_yet = (
+        MessageGroupMembership.objects
+        .filter(group_id=msg.group_id, last_read_message_id__lt=msg.id)
+        .exclude(user_id=msg.sender_id)
+        .values("user_id")
+    )
+    ConversationSummary.objects.filter(
+        group_id=msg.group_id, user_id__in=not_read_yet, unread_count__gt=0
+    ).update(unread_count=F("unread_count") - 1)
+
+    rows = ConversationSummary.objects.filter(group_id=msg.group_id, last_message_id=msg.id)
+    if not rows.exists():
+        return
+    prev = (
+        GroupMessage.objects.filter(group_id=msg.group_id)
+        .exclude(pk=msg.pk)
+        .order_by("-created_at", "-id")
+        .first()
+    )
+    rows.update(**_cleared_fields(prev))
+
+
+def mark_group_read(user_id: int, group_id: int, up_to: Optional[int] = None) -> int:
+    """
+    Move the member's read mark up to `up_to` (default and cap: the latest message); it
+    never moves back. Returns the unread count left.
+    """
+    messages = GroupMessage.objects.filter(group_id=group_id)
+    latest = messages.order_by("-id").values_list("id", flat=True).first() or 0
+    up_to = latest if up_to is None else min(up_to, latest)
+    membership = MessageGroupMembership.objects.filter(group_id=group_id, user_id=user_id)
+    membership.filter(last_read_message_id__lt=up_to).update(last_read_message_id=up_to)
+    last_read = membership.values_list("last_read_message_id", flat=True).first() or 0
+    unread = messages.filter(id__gt=last_read).exclude(sender_id=user_id).count()
+    ConversationSummary.objects.filter(user_id=user_id, group_id=group_id).update(unread_count=unread)
+    return unread
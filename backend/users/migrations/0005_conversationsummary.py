@@ -0,0 +1,80 @@
+# Generated by Django 5.0.6 on 2026-10-19 00:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+PREVIEW_CHARS = 200
+
+
+def backfill(apps, schema_editor):
+    """One summary row per DM pair side and per group membership, from the existing messages."""
+    Message = apps.get_model("users", "Message")
+    GroupMessage = apps.get_model("users", "GroupMessage")
+    MessageGroup = apps.get_model("users", "MessageGroup")
+    Membership = apps.get_model("users", "MessageGroupMembership")
+    Summary = apps.get_model("users", "ConversationSummary")
+
+    def last_fields(m):
+        return {"last_message_id": m.id, "last_sender_id": m.sender_id, "last_at": m.created_at, "preview": m.body[:PREVIEW_CHARS]}
+
+    last, unread = {}, {}
+    for m in Message.objects.order_by("created_at", "id").iterator():
+        last[(m.sender_id, m.recipient_id)] = last[(m.recipient_id, m.sender_id)] = m
+        if not m.is_read:
+            unread[(m.recipient_id, m.sender_id)] = unread.get((m.recipient_id, m.sender_id), 0) + 1
+    rows = [
+        Summary(user_id=u, peer_id=p, unread_count=unread.get((u, p), 0), **last_fields(m))
+        for (u, p), m in last.items()
+        if u != p
+    ]
+
+    for g in MessageGroup.objects.all().iterator():
+        m = GroupMessage.objects.filter(group_id=g.id).order_by("-created_at", "-id").first()
+        fields = last_fields(m) if m is not None else {"last_at": g.created_at}
+        for uid in Membership.objects.filter(group_id=g.id).values_list("user_id", flat=True):
+            rows.append(Summary(user_id=uid, group_id=g.id, **fields))
+
+    Summary.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_messagegroup_messagegroupmembership_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConversationSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_message_id', models.BigIntegerField(blank=True, null=True)),
+                ('last_at', models.DateTimeField()),
+                ('preview', models.CharField(blank=True, default='', max_length=200)),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('group', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='summaries', to='users.messagegroup')),
+                ('last_sender', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('peer', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversation_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-last_at', '-id'], name='summary_inbox_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='conversationsummary',
+            constraint=models.UniqueConstraint(condition=models.Q(('peer__isnull', False)), fields=('user', 'peer'), name='uniq_summary_user_peer'),
+        ),
+        migrations.AddConstraint(
+            model_name='conversationsummary',
+            constraint=models.UniqueConstraint(condition=models.Q(('group__isnull', False)), fields=('user', 'group'), name='uniq_summary_user_group'),
+        ),
+        migrations.AddConstraint(
+            model_name='conversationsummary',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('group__isnull', True), ('peer__isnull', False)), models.Q(('group__isnull', False), ('peer__isnull', True)), _connector='OR'), name='summary_peer_xor_group'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
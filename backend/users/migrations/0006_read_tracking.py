@@ -0,0 +1,42 @@
+# Generated by Django 5.0.6 on 2026-10-19 00:37
+
+from django.db import migrations, models
+
+
+def backfill(apps, schema_editor):
+    """Existing group history counts as read (group badges were always 0); DMs keep is_read."""
+    GroupMessage = apps.get_model("users", "GroupMessage")
+    Message = apps.get_model("users", "Message")
+    Membership = apps.get_model("users", "MessageGroupMembership")
+    Summary = apps.get_model("users", "ConversationSummary")
+
+    latest = GroupMessage.objects.values("group_id").annotate(last=models.Max("id"))
+    for row in latest:
+        Membership.objects.filter(group_id=row["group_id"]).update(last_read_message_id=row["last"])
+
+    read = Message.objects.filter(is_read=True).values("recipient_id", "sender_id").annotate(last=models.Max("id"))
+    for row in read:
+        Summary.objects.filter(user_id=row["recipient_id"], peer_id=row["sender_id"]).update(
+            last_read_message_id=row["last"]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_conversationsummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversationsummary',
+            name='last_read_message_id',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='messagegroupmembership',
+            name='last_read_message_id',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
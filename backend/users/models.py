@@ -79,6 +79,8 @@ class MessageGroupMembership(models.Model):
     group = models.ForeignKey(MessageGroup, on_delete=models.CASCADE)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     added_at = models.DateTimeField(auto_now_add=True)
+    # Highest GroupMessage.id this member has read (0 = none)
+    last_read_message_id = models.BigIntegerField(default=0)
 
     class Meta:
         unique_together = ("group", "user")
@@ -97,3 +99,36 @@ class GroupMessage(models.Model):
 
     def __str__(self):
         return f"GMsg<{self.id}> g:{self.group_id} from:{self.sender_id}"
+
+
+class ConversationSummary(models.Model):
+    """
+    One inbox row per (user, DM peer) or (user, group), kept up to date by the send / delete
+    views (users/conversations.py) so the inbox is a single indexed read.
+    Exactly one of peer / group is set.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="conversation_summaries")
+    peer = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name="+")
+    group = models.ForeignKey(MessageGroup, on_delete=models.CASCADE, null=True, blank=True, related_name="summaries")
+    # Message.id or GroupMessage.id; null for a group nobody has written in yet
+    last_message_id = models.BigIntegerField(null=True, blank=True)
+    last_sender = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    last_at = models.DateTimeField()
+    preview = models.CharField(max_length=200, blank=True, default="")
+    unread_count = models.PositiveIntegerField(default=0)
+    # DMs: highest Message.id from the peer this user has read (groups keep theirs on the membership)
+    last_read_message_id = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "peer"], condition=models.Q(peer__isnull=False), name="uniq_summary_user_peer"),
+            models.UniqueConstraint(fields=["user", "group"], condition=models.Q(group__isnull=False), name="uniq_summary_user_group"),
+            models.CheckConstraint(
+                check=models.Q(peer__isnull=False, group__isnull=True) | models.Q(peer__isnull=True, group__isnull=False),
+                name="summary_peer_xor_group",
+            ),
+        ]
+        indexes = [models.Index(fields=["user", "-last_at", "-id"], name="summary_inbox_idx")]
+
+    def __str__(self):
+        return f"Summary<{self.user_id}> {'dm:' + str(self.peer_id) if self.peer_id else 'g:' + str(self.group_id)}"
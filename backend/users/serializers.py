@@ -162,8 +162,8 @@ class MessageGroupSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         request = self.context.get("request")
-        self.fields["participants"].context["request"] = request
-        self.fields["messages"].context["request"] = request
-        self.fields["created_by"].context["request"] = request
+        for name in ("participants", "messages", "created_by"):
+            if name in self.fields:  # views may drop "messages" to page them separately
+                self.fields[name].context["request"] = request
         return super().to_representation(instance)
 
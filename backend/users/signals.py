@@ -1,5 +1,7 @@
-from django.db.models.signals import pre_save, post_delete
+from django.contrib.auth.models import User
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
+from .authentication import invalidate_user
 from .models import Profile
 
 def _delete_file(f):
@@ -28,3 +30,9 @@ def delete_avatar_file_on_delete(sender, instance: Profile, **kwargs):
     f = getattr(instance, "avatar", None)
     if f and f.name:
         _delete_file(f)
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_token_user(sender, instance: User, **kwargs):
+    # Cached JWT -> user resolutions (users/authentication.py) must see the new row
+    invalidate_user(instance.pk)
@@ -0,0 +1,32 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.authentication import CachedJWTAuthentication, _gen_key, invalidate_user
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("alice", password="x")
+        self.token = AccessToken.for_user(self.user)
+        self.auth = CachedJWTAuthentication()
+
+    def _rename(self, username):
+        User.objects.filter(pk=self.user.pk).update(username=username)  # no signal
+
+    def test_cached_until_invalidated(self):
+        self.assertEqual(self.auth.get_user(self.token).username, "alice")
+        self._rename("alicia")
+        self.assertEqual(self.auth.get_user(self.token).username, "alice")
+        invalidate_user(self.user.pk)
+        self.assertEqual(self.auth.get_user(self.token).username, "alicia")
+
+    def test_evicted_generation_is_a_miss(self):
+        self.auth.get_user(self.token)
+        self._rename("alicia")
+        invalidate_user(self.user.pk)
+        cache.delete(_gen_key(self.user.pk))  # evicted before any request saw the new generation
+        self.assertEqual(self.auth.get_user(self.token).username, "alicia")
+        self.assertIsNotNone(cache.get(_gen_key(self.user.pk)))
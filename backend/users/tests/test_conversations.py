@@ -0,0 +1,107 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from users import conversations
+from users.models import ConversationSummary, GroupMessage, Message, MessageGroup, MessageGroupMembership
+
+
+class DmReadTests(TestCase):
+    def setUp(self):
+        self.a = User.objects.create_user("alice", password="x")
+        self.b = User.objects.create_user("bob", password="x")
+
+    def _send(self, sender, recipient, body):
+        msg = Message.objects.create(sender=sender, recipient=recipient, body=body)
+        conversations.record_dm(msg)
+        return msg
+
+    def _row(self, user, peer):
+        return ConversationSummary.objects.get(user=user, peer=peer)
+
+    def test_mark_read(self):
+        first = self._send(self.a, self.b, "one")
+        self._send(self.a, self.b, "two")
+        self.assertEqual(conversations.mark_dm_read(self.b.id, self.a.id, first.id), 1)
+        self.assertEqual(self._row(self.b, self.a).last_read_message_id, first.id)
+        self.assertEqual(conversations.mark_dm_read(self.b.id, self.a.id), 0)
+
+    def test_mark_read_is_clamped(self):
+        msg = self._send(self.a, self.b, "one")
+        self.assertEqual(conversations.mark_dm_read(self.b.id, self.a.id, 10 ** 12), 0)
+        self.assertEqual(self._row(self.b, self.a).last_read_message_id, msg.id)
+        self._send(self.a, self.b, "later")
+        self.assertEqual(self._row(self.b, self.a).unread_count, 1)
+
+
+class GroupReadTests(TestCase):
+    def setUp(self):
+        self.a = User.objects.create_user("alice", password="x")
+        self.b = User.objects.create_user("bob", password="x")
+        self.group = MessageGroup.objects.create(title="g", created_by=self.a)
+        for u in (self.a, self.b):
+            MessageGroupMembership.objects.create(group=self.group, user=u)
+        conversations.join_group(self.group, [self.a.id, self.b.id])
+
+    def _send(self, sender, body):
+        msg = GroupMessage.objects.create(group=self.group, sender=sender, body=body)
+        conversations.record_group_message(msg)
+        return msg
+
+    def _unread(self, user):
+        return ConversationSummary.objects.get(user=user, group=self.group).unread_count
+
+    def test_unread_counts(self):
+        first = self._send(self.a, "one")
+        self._send(self.a, "two")
+        self.assertEqual((self._unread(self.a), self._unread(self.b)), (0, 2))
+        self.assertEqual(conversations.mark_group_read(self.b.id, self.group.id, first.id), 1)
+        # The mark never moves back
+        self.assertEqual(conversations.mark_group_read(self.b.id, self.group.id, 0), 1)
+        self.assertEqual(conversations.mark_group_read(self.b.id, self.group.id), 0)
+
+    def test_forget_unread_message(self):
+        msg = self._send(self.a, "one")
+        conversations.forget_group_message(msg)
+        msg.delete()
+        self.assertEqual(self._unread(self.b), 0)
+        self.assertEqual(ConversationSummary.objects.get(user=self.b, group=self.group).preview, "")
+
+    def test_mark_read_is_clamped(self):
+        msg = self._send(self.a, "one")
+        conversations.mark_group_read(self.b.id, self.group.id, 10 ** 12)
+        membership = MessageGroupMembership.objects.get(group=self.group, user=self.b)
+        self.assertEqual(membership.last_read_message_id, msg.id)
+        self._send(self.a, "later")
+        self.assertEqual(conversations.mark_group_read(self.b.id, self.group.id, msg.id), 1)
+
+    def test_late_joiner_has_read_history(self):
+        self._send(self.a, "before")
+        c = User.objects.create_user("carol", password="x")
+        MessageGroupMembership.objects.create(group=self.group, user=c)
+        conversations.join_group(self.group, [c.id])
+        self.assertEqual(self._unread(c), 0)
+        self._send(self.a, "after")
+        self.assertEqual(self._unread(c), 1)
+
+
+class MarkReadViewTests(TestCase):
+    def setUp(self):
+        self.a = User.objects.create_user("alice", password="x")
+        self.b = User.objects.create_user("bob", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.b)
+
+    def test_out_of_range_up_to(self):
+        for up_to in (10 ** 20, -1, "abc", True):
+            with self.subTest(up_to=up_to):
+                res = self.client.post(reverse("messages_read"), {"user": "alice", "up_to": up_to}, format="json")
+                self.assertEqual(res.status_code, 400)
+
+    def test_marks_read(self):
+        msg = Message.objects.create(sender=self.a, recipient=self.b, body="hi")
+        conversations.record_dm(msg)
+        res = self.client.post(reverse("messages_read"), {"user": "alice", "up_to": msg.id}, format="json")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json(), {"unread_count": 0})
@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta, timezone
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from users.conversations import decode_cursor, keyset_slice
+from users.models import Message
+
+
+class KeysetSliceTests(TestCase):
+    def setUp(self):
+        self.a = User.objects.create_user("alice", password="x")
+        self.b = User.objects.create_user("bob", password="x")
+        base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self.ids = []
+        for i in range(6):
+            msg = Message.objects.create(sender=self.a, recipient=self.b, body=str(i))
+            # Two messages per timestamp: ties are broken by id
+            Message.objects.filter(pk=msg.pk).update(created_at=base + timedelta(seconds=i // 2))
+            self.ids.append(msg.pk)
+        self.qs = Message.objects.all()
+
+    def _key(self, i):
+        msg = Message.objects.get(pk=self.ids[i])
+        return msg.created_at, msg.pk
+
+    def test_newest_first_then_before(self):
+        page = keyset_slice(self.qs, limit=4)
+        self.assertEqual([m.pk for m in page], self.ids[::-1][:4])
+        older = keyset_slice(self.qs, before=(page[-1].created_at, page[-1].pk), limit=4)
+        self.assertEqual([m.pk for m in older], [self.ids[1], self.ids[0]])
+
+    def test_after_is_oldest_first(self):
+        newer = keyset_slice(self.qs, after=self._key(2), limit=2)
+        self.assertEqual([m.pk for m in newer], [self.ids[3], self.ids[4]])
+
+    def test_thread_view_cursors(self):
+        client = APIClient()
+        client.force_authenticate(self.b)
+        url = reverse("messages_thread", args=["alice"])
+        first = client.get(url, {"page_size": 4}).json()
+        self.assertEqual([m["id"] for m in first["results"]], self.ids[2:])
+        self.assertIsNotNone(decode_cursor(first["before"]))
+        rest = client.get(url, {"page_size": 4, "before": first["before"]}).json()
+        self.assertEqual([m["id"] for m in rest["results"]], self.ids[:2])
@@ -0,0 +1,47 @@
+from datetime import datetime, timezone
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from users import conversations
+from users.models import ConversationSummary, Message
+
+
+class CursorTests(TestCase):
+    def test_round_trip(self):
+        at = datetime(2024, 5, 6, 7, 8, 9, 123456, tzinfo=timezone.utc)
+        self.assertEqual(conversations.decode_cursor(conversations.encode_cursor(at, 42)), (at, 42))
+
+    def test_malformed(self):
+        for raw in (None, "", "abc", "1_2_3", "x_1", f"{10 ** 30}_1"):
+            self.assertIsNone(conversations.decode_cursor(raw), raw)
+
+
+class DmSummaryTests(TestCase):
+    def setUp(self):
+        self.a = User.objects.create_user("alice", password="x")
+        self.b = User.objects.create_user("bob", password="x")
+
+    def _send(self, sender, recipient, body):
+        msg = Message.objects.create(sender=sender, recipient=recipient, body=body)
+        conversations.record_dm(msg)
+        return msg
+
+    def _row(self, user, peer):
+        return ConversationSummary.objects.get(user=user, peer=peer)
+
+    def test_record_and_forget(self):
+        first = self._send(self.a, self.b, "one")
+        last = self._send(self.a, self.b, "two")
+        self.assertEqual(self._row(self.b, self.a).unread_count, 2)
+        self.assertEqual(self._row(self.a, self.b).unread_count, 0)
+        self.assertEqual(self._row(self.a, self.b).preview, "two")
+
+        conversations.forget_dm(last)
+        last.delete()
+        self.assertEqual(self._row(self.b, self.a).unread_count, 1)
+        self.assertEqual(self._row(self.a, self.b).last_message_id, first.id)
+
+        conversations.forget_dm(first)
+        first.delete()
+        self.assertFalse(ConversationSummary.objects.filter(peer__in=[self.a, self.b]).exists())
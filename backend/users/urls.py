@@ -9,6 +9,7 @@ from .views import (
     MessageThreadView,
     MessageSendView,
     ConversationsView,
+    MarkReadView,
     MessageDeleteView,
     BlockView,
     BlocksListView,
@@ -34,6 +35,7 @@ urlpatterns = [
     # messages — specific first
     path("messages/send/", MessageSendView.as_view(), name="messages_send"),
     path("messages/conversations/", ConversationsView.as_view(), name="messages_conversations"),
+    path("messages/read/", MarkReadView.as_view(), name="messages_read"),
     path("messages/<int:pk>/", MessageDeleteView.as_view(), name="messages_delete"),
     path("messages/thread/<str:username>/", MessageThreadView.as_view(), name="messages_thread"),
 
@@ -6,7 +6,6 @@ from django.shortcuts import get_object_or_404
 from rest_framework import generics, permissions, parsers, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.pagination import PageNumberPagination
 
 from .models import (
     Profile,
@@ -17,7 +16,9 @@ from .models import (
     MessageGroup,
     MessageGroupMembership,
     GroupMessage,
+    ConversationSummary,
 )
+from . import conversations
 from .serializers import (
     RegisterSerializer,
     UserSerializer,
@@ -163,7 +164,40 @@ class BlocksListView(APIView):
 
 # --- Messages (DM) ---
 
+def _keyset_page(request, querysets, default_size: int = 50, max_size: int = 200):
+    """
+    One page over the union of `querysets` on (created_at, id), driven by ?before= / ?after=
+    cursors (users/conversations.py) and ?page_size=. Returns (rows oldest first, cursors)
+    where cursors = {"before": older page or None, "after": poll for newer}.
+    """
+    try:
+        size = min(max(int(request.GET.get("page_size", default_size)), 1), max_size)
+    except ValueError:
+        size = default_size
+    before = conversations.decode_cursor(request.GET.get("before"))
+    after = conversations.decode_cursor(request.GET.get("after"))
+
+    rows = []
+    for qs in querysets:
+        rows += conversations.keyset_slice(qs, before, after, size + 1)
+    rows.sort(key=lambda m: (m.created_at, m.id), reverse=after is None)
+    more = len(rows) > size
+    rows = sorted(rows[:size], key=lambda m: (m.created_at, m.id))
+
+    # Going back, `more` says whether older rows exist; going forward from `after` they always do
+    has_older = more if after is None else bool(rows)
+    return rows, {
+        "before": conversations.encode_cursor(rows[0].created_at, rows[0].id) if has_older else None,
+        "after": conversations.encode_cursor(rows[-1].created_at, rows[-1].id) if rows else request.GET.get("after"),
+    }
+
+
 class MessageThreadView(APIView):
+    """
+    Keyset-paged DM thread: the newest page_size messages (default 50, at most 200), oldest
+    first; ?before=<cursor> for older ones, ?after=<cursor> for newer ones.
+    Returns {results, before, after}; before is null once the start is reached.
+    """
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, username: str):
@@ -174,16 +208,13 @@ class MessageThreadView(APIView):
            Block.objects.filter(blocker=other, blocked=request.user).exists():
             return Response({"detail": "You cannot view this conversation."}, status=403)
 
-        qs = Message.objects.filter(
-            Q(sender=request.user, recipient=other)
-            | Q(sender=other, recipient=request.user)
-        ).order_by("created_at")
-
-        paginator = PageNumberPagination()
-        paginator.page_size = int(request.GET.get("page_size", 50))
-        page = paginator.paginate_queryset(qs, request)
-        ser = MessageSerializer(page, many=True, context={"request": request})
-        return paginator.get_paginated_response(ser.data)
+        # One query per direction, each a range scan of (sender, recipient, created_at)
+        rows, cursors = _keyset_page(request, [
+            Message.objects.filter(sender=request.user, recipient=other).select_related("sender__profile", "recipient__profile"),
+            Message.objects.filter(sender=other, recipient=request.user).select_related("sender__profile", "recipient__profile"),
+        ])
+        ser = MessageSerializer(rows, many=True, context={"request": request})
+        return Response({"results": ser.data, **cursors})
 
 
 class MessageSendView(APIView):
@@ -206,7 +237,9 @@ class MessageSendView(APIView):
            Block.objects.filter(blocker=recipient, blocked=request.user).exists():
             return Response({"detail": "Messaging is not allowed because one of you has blocked the other."}, status=403)
 
-        msg = Message.objects.create(sender=request.user, recipient=recipient, body=body)
+        with transaction.atomic():
+            msg = Message.objects.create(sender=request.user, recipient=recipient, body=body)
+            conversations.record_dm(msg)
         ser = MessageSerializer(msg, context={"request": request})
         return Response(ser.data, status=201)
 
@@ -215,112 +248,123 @@ class MessageSendView(APIView):
 
 class ConversationsView(APIView):
     """
-    Unified conversations feed:
-      - DM items:   { type:'dm',    user: PublicUser, last_message:{...}, unread_count:int }
-      - Group items:{ type:'group', group:{id,title,participants:[...]}, last_message:{...}, unread_count:int }
-    Sorted by last activity (last_message.created_at desc). Group unread_count is 0 unless you add read-tracking.
+    Unified conversations feed, one keyset page of the user's ConversationSummary rows:
+      - DM items:   { type:'dm',    user: PublicUser, last_message:{...}, unread_count:int, cursor }
+      - Group items:{ type:'group', group:{id,title,participants:[...]}, last_message:{...}|null, unread_count:int, cursor }
+    Sorted by last activity, newest first. ?limit=N (default 50, at most MAX_LIMIT);
+    ?before=<cursor of the last item> for the next page. last_message.body is a preview.
+    unread_count is cleared with MarkReadView.
     """
     permission_classes = [permissions.IsAuthenticated]
+    MAX_LIMIT = 200
 
     def get(self, request):
-        limit = int(request.GET.get("limit", "50"))
-
-        # ===== DMs =====
-        blocked_ids = set(Block.objects.filter(blocker=request.user).values_list("blocked_id", flat=True))
-        blocked_me_ids = set(Block.objects.filter(blocked=request.user).values_list("blocker_id", flat=True))
-
-        dm_qs = (
-            Message.objects
-            .filter(Q(sender=request.user) | Q(recipient=request.user))
-            .select_related("sender", "recipient")
-            .order_by("-created_at")[:1000]
+        try:
+            limit = min(max(int(request.GET.get("limit", "50")), 1), self.MAX_LIMIT)
+        except ValueError:
+            limit = 50
+
+        me = request.user
+        qs = (
+            ConversationSummary.objects
+            .filter(user=me)
+            # DMs with someone blocked either way stay hidden
+            .exclude(peer_id__in=Block.objects.filter(blocker=me).values("blocked_id"))
+            .exclude(peer_id__in=Block.objects.filter(blocked=me).values("blocker_id"))
+            .select_related("peer__profile", "group", "last_sender__profile")
+            .order_by("-last_at", "-id")
         )
-
-        # Unread counts keyed by other user id
-        dm_unread = {}
-        for m in dm_qs:
-            if m.recipient_id == request.user.id and not m.is_read:
-                dm_unread[m.sender_id] = dm_unread.get(m.sender_id, 0) + 1
-
-        dm_items = []
-        dm_seen = set()
-        for m in dm_qs:
-            other = m.recipient if m.sender_id == request.user.id else m.sender
-            if other.id in dm_seen:
-                continue
-            if other.id in blocked_ids or other.id in blocked_me_ids:
-                continue
-            dm_seen.add(other.id)
-            dm_items.append({
-                "type": "dm",
-                "user": PublicUserSerializer(other, context={"request": request}).data,
-                "last_message": {
-                    "id": m.id,
-                    "body": m.body,
-                    "created_at": m.created_at.isoformat(),
-                    "from_me": (m.sender_id == request.user.id),
-                },
-                "unread_count": dm_unread.get(other.id, 0),
-            })
-
-        # ===== Groups =====
-        # Requires the group models from earlier: MessageGroup, MessageGroupMembership, GroupMessage
-        groups = (
-            MessageGroup.objects
-            .filter(participants=request.user)
-            .prefetch_related("participants")
-            .only("id", "title")
-        )
-
-        # Gather latest message per group (in one pass)
-        latest_msgs = (
-            GroupMessage.objects
-            .filter(group__in=groups)
-            .select_related("group", "sender")
-            .order_by("-created_at")[:2000]
-        )
-        group_last = {}
-        for gm in latest_msgs:
-            gid = gm.group_id
-            if gid not in group_last:
-                group_last[gid] = gm
-            # stop once we captured a latest for many groups
-            if len(group_last) >= groups.count():
-                break
-
-        group_items = []
-        for g in groups:
-            participants_ser = PublicUserSerializer(list(g.participants.all()), many=True, context={"request": request}).data
-            lm = group_last.get(g.id)
-            last_payload = None
-            if lm:
-                last_payload = {
-                    "id": lm.id,
-                    "body": lm.body,
-                    "created_at": lm.created_at.isoformat(),
-                    "from_me": (lm.sender_id == request.user.id),
-                    "sender": PublicUserSerializer(lm.sender, context={"request": request}).data,
+        before = conversations.decode_cursor(request.GET.get("before"))
+        if before is not None:
+            at, pk = before
+            qs = qs.filter(Q(last_at__lt=at) | Q(last_at=at, id__lt=pk))
+        rows = list(qs[:limit])
+
+        # Participants only for the groups on this page, in one query
+        group_ids = [r.group_id for r in rows if r.group_id]
+        participants = {}
+        for m in (
+            MessageGroupMembership.objects
+            .filter(group_id__in=group_ids)
+            .select_related("user__profile")
+            .order_by("id")
+        ):
+            participants.setdefault(m.group_id, []).append(m.user)
+
+        items = []
+        for r in rows:
+            last = None
+            if r.last_message_id is not None:
+                last = {
+                    "id": r.last_message_id,
+                    "body": r.preview,
+                    "created_at": r.last_at.isoformat(),
+                    "from_me": r.last_sender_id == me.id,
+                }
+            if r.peer_id:
+                item = {
+                    "type": "dm",
+                    "user": PublicUserSerializer(r.peer, context={"request": request}).data,
+                    "last_message": last,
+                }
+            else:
+                if last is not None:
+                    last["sender"] = (
+                        PublicUserSerializer(r.last_sender, context={"request": request}).data
+                        if r.last_sender else None
+                    )
+                item = {
+                    "type": "group",
+                    "group": {
+                        "id": r.group_id,
+                        "title": r.group.title or "",
+                        "participants": PublicUserSerializer(
+                            participants.get(r.group_id, []), many=True, context={"request": request}
+                        ).data,
+                    },
+                    "last_message": last,
                 }
-            group_items.append({
-                "type": "group",
-                "group": { "id": g.id, "title": g.title or "", "participants": participants_ser },
-                "last_message": last_payload,
-                "unread_count": 0,  # add real read-tracking later if desired
-            })
+            item["unread_count"] = r.unread_count
+            item["cursor"] = conversations.encode_cursor(r.last_at, r.id)
+            items.append(item)
 
-        # ===== Merge + sort by last activity =====
-        def last_ts(item):
-            lm = item.get("last_message") or {}
-            return lm.get("created_at") or ""
+        return Response(items)
 
-        merged = dm_items + group_items
-        merged.sort(key=last_ts, reverse=True)
 
-        # Apply limit
-        if limit and limit > 0:
-            merged = merged[:limit]
+# --- Read tracking ---
 
-        return Response(merged)
+class MarkReadView(APIView):
+    """
+    POST {user: username} or {group_id: id}, optional up_to: message id (default: everything).
+    Marks the conversation read in one UPDATE; returns {unread_count}.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        up_to = request.data.get("up_to")
+        if up_to is not None:
+            try:
+                up_to = int(up_to)
+            except (TypeError, ValueError, OverflowError):
+                up_to = -1
+            if isinstance(request.data.get("up_to"), bool) or not 0 <= up_to <= conversations.MAX_MESSAGE_ID:
+                return Response({"detail": "up_to must be a message id."}, status=400)
+
+        username = request.data.get("user")
+        group_id = request.data.get("group_id")
+        if username:
+            other = get_object_or_404(User, username__iexact=str(username).lstrip("@"))
+            with transaction.atomic():
+                unread = conversations.mark_dm_read(request.user.id, other.id, up_to)
+        elif group_id:
+            group = get_object_or_404(MessageGroup, pk=group_id)
+            if not group.participants.filter(pk=request.user.pk).exists():
+                return Response({"detail": "Not a participant."}, status=403)
+            with transaction.atomic():
+                unread = conversations.mark_group_read(request.user.id, group.id, up_to)
+        else:
+            return Response({"detail": "Provide 'user' or 'group_id'."}, status=400)
+        return Response({"unread_count": unread}, status=200)
 
 
 # --- Delete a message (sender only) ---
@@ -332,7 +376,9 @@ class MessageDeleteView(APIView):
         msg = get_object_or_404(Message, pk=pk)
         if msg.sender_id != request.user.id:
             return Response({"detail": "You can only delete your own messages."}, status=status.HTTP_403_FORBIDDEN)
-        msg.delete()
+        with transaction.atomic():
+            conversations.forget_dm(msg)
+            msg.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -361,15 +407,22 @@ class CreateGroupView(APIView):
         if len(uniq) < 2:
             return Response({"detail": "Need at least two participants."}, status=400)
 
-        group = MessageGroup.objects.create(title=title, created_by=request.user)
-        for u in users:
-            MessageGroupMembership.objects.get_or_create(group=group, user=u)
+        with transaction.atomic():
+            group = MessageGroup.objects.create(title=title, created_by=request.user)
+            for u in users:
+                MessageGroupMembership.objects.get_or_create(group=group, user=u)
+            conversations.join_group(group, [u.id for u in users])
 
         data = MessageGroupSerializer(group, context={"request": request}).data
         return Response(data, status=status.HTTP_201_CREATED)
 
 
 class GroupDetailView(APIView):
+    """
+    Group with one keyset page of its messages, newest first (page_size default 200);
+    ?before=<cursor> / ?after=<cursor> and the returned before / after work as in
+    MessageThreadView.
+    """
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, pk: int):
@@ -378,10 +431,15 @@ class GroupDetailView(APIView):
         if not group.participants.filter(pk=request.user.pk).exists():
             return Response({"detail": "Not a participant."}, status=403)
 
-        page_size = int(request.query_params.get("page_size") or 200)
-        msgs = group.messages.select_related("sender").order_by("-created_at")[:page_size]
-        data = MessageGroupSerializer(group, context={"request": request}).data
-        data["messages"] = GroupMessageSerializer(msgs, many=True, context={"request": request}).data
+        # Keyset page on (group, -created_at); newest first, as before
+        rows, cursors = _keyset_page(
+            request, [group.messages.select_related("sender__profile")], default_size=200
+        )
+        ser = MessageGroupSerializer(group, context={"request": request})
+        del ser.fields["messages"]  # the page below, not the whole history
+        data = ser.data
+        data["messages"] = GroupMessageSerializer(rows[::-1], many=True, context={"request": request}).data
+        data.update(cursors)
         return Response(data, status=200)
 
 
@@ -404,7 +462,9 @@ class GroupSendView(APIView):
            Block.objects.filter(blocker_id__in=other_ids, blocked=request.user).exists():
             return Response({"detail": "Messaging not allowed due to blocking."}, status=403)
 
-        msg = GroupMessage.objects.create(group=group, sender=request.user, body=body)
+        with transaction.atomic():
+            msg = GroupMessage.objects.create(group=group, sender=request.user, body=body)
+            conversations.record_group_message(msg)
         return Response(GroupMessageSerializer(msg, context={"request": request}).data, status=201)
 
 class GroupMessageDeleteView(APIView):
@@ -414,7 +474,9 @@ class GroupMessageDeleteView(APIView):
         msg = get_object_or_404(GroupMessage, pk=pk)
         if msg.sender_id != request.user.id:
             return Response({"detail": "You can only delete your own messages."}, status=403)
-        msg.delete()
+        with transaction.atomic():
+            conversations.forget_group_message(msg)
+            msg.delete()
         return Response(status=204)
 
 
@@ -439,8 +501,11 @@ class GroupAddMembersView(APIView):
             return Response({"detail": "No matching users."}, status=404)
 
         with transaction.atomic():
-            for u in users:
-                MessageGroupMembership.objects.get_or_create(group=group, user=u)
+            joined = [
+                u.id for u in users
+                if MessageGroupMembership.objects.get_or_create(group=group, user=u)[1]
+            ]
+            conversations.join_group(group, joined)
 
         return Response({"added": [u.username for u in users]}, status=200)
 
@@ -467,6 +532,7 @@ class GroupRemoveMembersView(APIView):
         users = list(User.objects.filter(username__in=cleaned))
         with transaction.atomic():
             MessageGroupMembership.objects.filter(group=group, user__in=users).delete()
+            conversations.leave_group(group, [u.id for u in users])
 
         return Response({"removed": [u.username for u in users]}, status=200)
 
@@ -484,6 +550,7 @@ class GroupLeaveView(APIView):
         # If creator leaves, transfer ownership to oldest remaining member (if any)
         with transaction.atomic():
             MessageGroupMembership.objects.filter(group=group, user=request.user).delete()
+            conversations.leave_group(group, [request.user.id])
 
             remaining = group.participants.all()
             if group.created_by_id == request.user.id:
@@ -1,22 +1,71 @@
 // lib/ws.ts
 type Vec3 = { x: number; y: number; z: number };
+// Inclusive block area, min corner first: [x0, y0, z0, x1, y1, z1]
+export type BlockBox = [number, number, number, number, number, number];
+// n blocks from (x, y, z) along +x
+export type BlockRun = [number, number, number, number];
 
 export type GameInbound =
-  | { type: "welcome"; session: string; you: { id: string; username: string }; players: Record<string, { username: string; last_seen: string }>; time: string }
+  | { type: "welcome"; session: string; you: { id: string; username: string; pos?: { x: number; y: number; z: number } }; players: Record<string, { username: string; last_seen: string }>; time: string; moves?: { format: "delta"; scale: number } }
   | { type: "player_join"; player: { id: string; username?: string }; time: string }
   | { type: "player_leave"; player: { id: string }; time: string }
   | { type: "player_move"; player: { id: string }; pos: Vec3; time: string }
   | { type: "block_place"; player: { id: string }; block: { x: number; y: number; z: number; kind: any }; time: string }
   | { type: "block_remove"; player: { id: string }; x: number; y: number; z: number; time: string }
   | { type: "chat"; player: { id: string; username?: string }; message: string; time: string }
+  // One frame per server tick (connect with ?tick=1): changed positions and block edits (kind null = removed)
+  // near you; entered / left = players that came into / went out of range
+  // batches: place_blocks / remove_blocks as [player, kind (null = removed), boxes]; apply them before edits
+  // With ?moves=delta: no time, empty lists left out, moves as MoveRow (decode with MoveDecoder)
+  | { type: "tick"; tick: number; time?: string; moves?: [string, number, number, number][] | MoveRow[]; edits: [string, number, number, number, any][]; batches: [string, any, BlockBox[]][]; entered: string[]; left: string[] }
+  // Stored edits of chunks that came into range (kind null = removed)
+  | { type: "chunk_edits"; chunks: { cx: number; cz: number; edits: [number, number, number, any][] }[] }
+  // Your last move was rejected (too_fast / blocked): go back to pos, the last position the server accepted
+  | { type: "correction"; reason: "too_fast" | "blocked" | string; pos: Vec3 }
   // NEW: server-side errors before/after accept()
   | { type: "error"; code: "room_full" | "too_many_tabs" | "unauthorized" | "forbidden" | string; message: string; limit?: number };
 
+// Compact move rows (?moves=delta), positions in 1/256 block:
+//   [handle, cx, cy, cz, ox, oy, oz, playerId]  key row: 16x16x16 cell + offset in it
+//   [handle, dx, dy, dz]                        delta against the handle's previous row
+// Offsets and deltas fit an int16; cell coordinates can reach 2^20 (plain numbers here).
+export type MoveRow = [number, number, number, number, number, number, number, string] | [number, number, number, number];
+
+export class MoveDecoder {
+  private players = new Map<number, string>();
+  private last = new Map<number, [number, number, number]>();
+
+  constructor(private scale = 256) {}
+
+  decode(rows: MoveRow[]): [string, number, number, number][] {
+    const out: [string, number, number, number][] = [];
+    const cell = 16 * this.scale;
+    for (const row of rows) {
+      const h = row[0];
+      let q: [number, number, number];
+      if (row.length === 8) {
+        this.players.set(h, row[7]);
+        q = [row[1] * cell + row[4], row[2] * cell + row[5], row[3] * cell + row[6]];
+      } else {
+        const prev = this.last.get(h);
+        if (!prev) continue;
+        q = [prev[0] + row[1], prev[1] + row[2], prev[2] + row[3]];
+      }
+      this.last.set(h, q);
+      out.push([this.players.get(h)!, q[0] / this.scale, q[1] / this.scale, q[2] / this.scale]);
+    }
+    return out;
+  }
+}
+
 export type GameOutbound =
   | { type: "join"; name?: string }
   | { type: "move"; x: number; y: number; z: number }
   | { type: "place_block"; x: number; y: number; z: number; block: any }
   | { type: "remove_block"; x: number; y: number; z: number }
+  // Whole areas in one message (at most GAME_MAX_BATCH_CELLS cells, else rejected with a warning)
+  | { type: "place_blocks"; block: any; boxes?: BlockBox[]; runs?: BlockRun[] }
+  | { type: "remove_blocks"; boxes?: BlockBox[]; runs?: BlockRun[] }
   | { type: "chat"; message: string }
   | { type: "ping" };
 
@@ -18,7 +18,7 @@ import InventoryOverlay from "./components/InventoryOverlay";
 import { useInfiniteWorld } from "./hooks/useInfiniteWorld";
 import { blockOverlapsPlayer } from "./lib/physics";
 import type { BlockId } from "./lib/types";
-import { GameSocket } from "./lib/ws";
+import { GameSocket, MoveDecoder } from "./lib/ws";
 
 // 👇 tool helpers
 import { isToolItemId, type ToolItemId } from "./lib/items";
@@ -45,6 +45,18 @@ function SendInitialMove({ sendMove }: { sendMove: (x: number, y: number, z: num
   return null;
 }
 
+// Snap the camera back when the server rejects a move
+function Corrector({ pending }: { pending: React.MutableRefObject<{ x: number; y: number; z: number } | null> }) {
+  const { camera } = useThree();
+  useFrame(() => {
+    const pos = pending.current;
+    if (!pos) return;
+    pending.current = null;
+    camera.position.set(pos.x, pos.y, pos.z);
+  });
+  return null;
+}
+
 function MovementEmitter({ sendMove }: { sendMove: (x: number, y: number, z: number) => void }) {
   const { camera } = useThree();
   const sentFirst = useRef(false);
@@ -194,6 +206,7 @@ export default function GamePage() {
   const youRef = useRef<{ id: string } | null>(null);
   const othersRef = useRef<Map<string, { x: number; y: number; z: number }>>(new Map());
   const peersRef = useRef<Set<string>>(new Set());
+  const correctionRef = useRef<{ x: number; y: number; z: number } | null>(null);
   const [connected, setConnected] = useState(false);
   const [, forceTick] = useState(0);
   const bump = () => forceTick((n) => (n + 1) % 1_000_000);
@@ -205,7 +218,8 @@ export default function GamePage() {
       : "ws";
   const wsBase =
     (process.env.NEXT_PUBLIC_DJANGO_WS_BASE as string | undefined) ||
-    `${proto}://${window.location.host}`;    const url = `${wsBase}/ws/game/${encodeURIComponent(sessionId)}/`;
+    `${proto}://${window.location.host}`;    const url = `${wsBase}/ws/game/${encodeURIComponent(sessionId)}/?tick=1&moves=delta`;
+    let moves = new MoveDecoder();
 
     const onMsg = (raw: any) => {
       const msg = { ...raw, type: typeof raw?.type === "string" ? raw.type.replaceAll(".", "_") : raw?.type };
@@ -214,6 +228,9 @@ export default function GamePage() {
       switch (msg.type) {
         case "welcome": {
           youRef.current = { id: msg.you.id };
+          // Back where the session snapshot left us (the server checks our moves from there)
+          if (msg.you.pos) correctionRef.current = msg.you.pos;
+          moves = new MoveDecoder(msg.moves?.scale);
           othersRef.current.clear();
           peersRef.current.clear();
           for (const pid of Object.keys(msg.players || {})) {
@@ -252,6 +269,50 @@ export default function GamePage() {
           wrappedRemove(msg.x, msg.y, msg.z, false);
           break;
         }
+        case "correction": {
+          correctionRef.current = msg.pos;
+          break;
+        }
+        case "chunk_edits": {
+          // Edits already stored on the server for chunks that came into range
+          for (const chunk of msg.chunks || []) {
+            for (const [x, y, z, kind] of chunk.edits) {
+              if (kind == null) wrappedRemove(x, y, z, false);
+              else wrappedPlace(x, y, z, kind as BlockId, false);
+            }
+          }
+          break;
+        }
+        case "tick": {
+          const me = youRef.current?.id;
+          let moved = false;
+          for (const [pid, x, y, z] of moves.decode(msg.moves || [])) {
+            if (pid === me) continue;
+            peersRef.current.add(pid);
+            othersRef.current.set(pid, { x, y, z });
+            moved = true;
+          }
+          for (const pid of msg.left || []) {
+            // out of range (still in the session)
+            if (othersRef.current.delete(pid)) moved = true;
+          }
+          for (const [, kind, boxes] of msg.batches || []) {
+            for (const [x0, y0, z0, x1, y1, z1] of boxes) {
+              for (let y = y0; y <= y1; y++)
+                for (let z = z0; z <= z1; z++)
+                  for (let x = x0; x <= x1; x++) {
+                    if (kind == null) wrappedRemove(x, y, z, false);
+                    else wrappedPlace(x, y, z, kind as BlockId, false);
+                  }
+            }
+          }
+          for (const [, x, y, z, kind] of msg.edits || []) {
+            if (kind == null) wrappedRemove(x, y, z, false);
+            else wrappedPlace(x, y, z, kind as BlockId, false);
+          }
+          if (moved) bump();
+          break;
+        }
       }
     };
 
@@ -408,6 +469,7 @@ export default function GamePage() {
 
         {/* Player & mouse-look */}
         <Player hasBlock={hasBlock} paused={inventoryOpen} />
+        <Corrector pending={correctionRef} />
         {!inventoryOpen && (
           <PointerLockControls
             ref={lockRef as any}
@@ -552,22 +552,15 @@ const setLocalAudioEnabled = (on: boolean) => {
 
     const proto = (typeof location !== "undefined" && location.protocol === "https:") ? "wss" : "ws";
     const base = (process.env.NEXT_PUBLIC_DJANGO_WS_BASE as string | undefined) || `${proto}://${location.host}`;
-    const url = `${base}/ws/projects/${projectId}/`;
-    const ws = new WebSocket(url);
-    wsRef.current = ws;
-
-    ws.onopen = () => {
-      wsReadyRef.current = true;
-      // ask backend for shapes snapshot (server may also push it automatically)
-      ws.send(JSON.stringify({ type: "shape_request_full", client_id: shapesClientId }));
-    };
-
-    ws.onclose = () => { wsReadyRef.current = false; peersRef.current.clear(); setPeers([]); };
-    ws.onerror = () => { /* noop */ };
-    ws.onmessage = (ev) => {
-      try {
-        const msg = JSON.parse(ev.data);
-
+    // Resume cursor: the epoch of the worker that numbered our events and the last seq seen.
+    // Seqs of other epochs (events relayed from another worker) are not ours to track.
+    let resume: { epoch: string; seq: number } | null = null;
+    // Highest seq applied per epoch: a resume replays other workers' events we may already have
+    let seen: Record<string, number> = {};
+    let stopped = false;
+    let attempt = 0;
+    let retryTimer: number | undefined;
+    const handleMsg = (msg: any) => {
         if (msg.type === "presence_state") {
           const map = new Map<number, Peer>();
           for (const p of msg.peers as Peer[]) map.set(p.id, p);
@@ -808,14 +801,67 @@ const setLocalAudioEnabled = (on: boolean) => {
             requestAnimationFrame(() => { applyingRemoteViewportRef.current = false; });
           });
         }
-        
-
-      } catch (err) { /* ignore parse/socket errors */ }
     };
 
+    const connect = () => {
+      // snapshot=1: the server sends presence/chat/shapes/viewport as one room_snapshot frame;
+      // epoch/last_seq: replay only what we missed instead, if the server still has it
+      const params = new URLSearchParams({ snapshot: "1" });
+      if (resume) { params.set("epoch", resume.epoch); params.set("last_seq", String(resume.seq)); }
+      const ws = new WebSocket(`${base}/ws/projects/${projectId}/?${params}`);
+      wsRef.current = ws;
+
+      ws.onopen = () => {
+        wsReadyRef.current = true;
+        attempt = 0;
+      };
 
+      ws.onclose = (ev) => {
+        if (wsRef.current === ws) { wsRef.current = null; wsReadyRef.current = false; }
+        // Refused (auth, access, room full, too many tabs, flooding): do not retry
+        const final = stopped || [4001, 4002, 4401, 4403, 4429].includes(ev.code);
+        if (final) { peersRef.current.clear(); setPeers([]); return; }
+        // Peers stay until the resume replay (or the snapshot's presence_state) updates them
+        const delay = Math.min(15000, 500 * 2 ** attempt++);
+        retryTimer = window.setTimeout(connect, delay);
+      };
+      ws.onerror = () => { /* noop */ };
+
+      ws.onmessage = (ev) => {
+        try {
+          const msg = JSON.parse(ev.data);
+          if (msg.type === "session") {
+            resume = { epoch: msg.epoch, seq: msg.seq };
+            if (!msg.resumed) seen = { [msg.epoch]: msg.seq };
+            return;
+          }
+          if (msg.type === "room_snapshot") {
+            resume = { epoch: msg.epoch, seq: msg.seq };
+            seen = { [msg.epoch]: msg.seq };
+            // one frame on join: apply it as the individual snapshot messages
+            handleMsg({ type: "presence_state", peers: msg.peers || [] });
+            handleMsg({ type: "chat_history", messages: msg.chat || [] });
+            handleMsg({ type: "shapes_full", shapes: msg.shapes || [] });
+            if (msg.viewport) handleMsg({ type: "viewport", data: msg.viewport });
+            return;
+          }
+          if (typeof msg.seq === "number" && msg.epoch) {
+            if (msg.seq <= (seen[msg.epoch] ?? 0)) return;
+            seen[msg.epoch] = msg.seq;
+            if (resume && msg.epoch === resume.epoch && msg.seq > resume.seq) resume.seq = msg.seq;
+          }
+          handleMsg(msg);
+        } catch (err) { /* ignore parse/socket errors */ }
+      };
+    };
+    connect();
 
-    return () => { try { ws.close(); } catch {}; wsRef.current = null; wsReadyRef.current = false; };
+    return () => {
+      stopped = true;
+      if (retryTimer !== undefined) window.clearTimeout(retryTimer);
+      try { wsRef.current?.close(); } catch {};
+      wsRef.current = null; wsReadyRef.current = false;
+    };
   }, [authed, projectId, me?.id]);
 
   // Create cy once (strict-mode safe)
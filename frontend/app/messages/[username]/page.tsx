@@ -74,6 +74,16 @@ async function getThread(withUser: string): Promise<Msg[]> {
   return Array.isArray(j) ? j : (j?.results ?? []);
 }
 
+// Everything up to the newest message shown counts as read
+async function markRead(withUser: string, upTo?: number) {
+  await fetch(`${process.env.DJANGO_API_BASE}/api/auth/messages/read/`, {
+    method: "POST",
+    headers: { ...authHeader(), "Content-Type": "application/json" },
+    body: JSON.stringify({ user: withUser, up_to: upTo }),
+    cache: "no-store",
+  }).catch(() => null);
+}
+
 export default async function MessagesThreadPage({ params }: { params: { username: string } }) {
   const me = await getMe();
 
@@ -87,6 +97,8 @@ export default async function MessagesThreadPage({ params }: { params: { usernam
     getThread(params.username),
   ]);
 
+  if (msgs.length) await markRead(params.username, msgs[msgs.length - 1].id);
+
   const meAvatar = toMediaProxy(me?.avatar_url);
   const otherAvatar = toMediaProxy(otherUser?.avatar_url);
 
@@ -66,6 +66,16 @@ async function getGroup(id: string): Promise<Group | null> {
   return r.json();
 }
 
+// Everything up to the newest message shown counts as read
+async function markRead(groupId: number | string, upTo?: number) {
+  await fetch(`${process.env.DJANGO_API_BASE}/api/auth/messages/read/`, {
+    method: "POST",
+    headers: { ...authHeader(), "Content-Type": "application/json" },
+    body: JSON.stringify({ group_id: groupId, up_to: upTo }),
+    cache: "no-store",
+  }).catch(() => null);
+}
+
 export default async function GroupChatPage({ params }: { params: { id: string } }) {
   const [me, group] = await Promise.all([getMe(), getGroup(params.id)]);
 
@@ -78,6 +88,9 @@ export default async function GroupChatPage({ params }: { params: { id: string }
     );
   }
 
+  // messages come newest first
+  if (group.messages?.length) await markRead(group.id, group.messages[0].id);
+
   const title = group.title || `Group #${group.id}`;
   const participants = group.participants || [];
 